@@ -0,0 +1,74 @@
+"""
+Benchmark: entity discovery over the WebSocket vs the /data cache.
+
+Serves a registry of N entities (half of them KNX sensors) from the HA
+simulator and times the bulk fetch + index build, the cached restart and
+resolve() lookups.
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_autoconfig [entities]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from knx_sentinel.autoconfig import AutoConfigurator
+from knx_sentinel.ha_client import HAWebSocketClient
+from knx_sentinel.simulator import HASimulator
+
+
+def registry(count):
+    entries = []
+    states = []
+    for i in range(count):
+        knx = i % 2 == 0
+        entity_id = f"sensor.entity_{i}"
+        address = f"{i // 2048 % 32}/{i // 256 % 8}/{i % 256}"
+        entries.append({"entity_id": entity_id, "platform": "knx" if knx else "zha",
+                        "unique_id": address if knx else f"zha-{i}", "name": None, "area_id": None})
+        states.append({"entity_id": entity_id, "state": "21.0",
+                       "attributes": {"device_class": "temperature", "unit_of_measurement": "°C"}})
+    return entries, states
+
+
+async def main(count):
+    entries, states = registry(count)
+    simulator = HASimulator(count=0, states=states, entity_registry=entries)
+    await simulator.start()
+    client = HAWebSocketClient(simulator.url, token="bench")
+    client.set_callback(lambda telegram: None)
+    client_task = asyncio.create_task(client.start())
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cache_path = os.path.join(workdir, "autoconfig.json")
+        start = time.perf_counter()
+        autoconfig = AutoConfigurator(client, cache_path)
+        await autoconfig.discover_entities()
+        fetched = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cached = AutoConfigurator(client, cache_path)
+        await cached.discover_entities()
+        loaded = time.perf_counter() - start
+
+        addresses = list(cached.index)
+        start = time.perf_counter()
+        for _ in range(10):
+            for address in addresses:
+                cached.resolve(address)
+        lookup_ns = (time.perf_counter() - start) / (10 * len(addresses)) * 1e9
+
+        print(f"{count} registry entries, {len(cached.entities)} KNX, {len(addresses)} group addresses")
+        print(f"bulk fetch + index : {fetched * 1000:8.1f} ms")
+        print(f"cache load + index : {loaded * 1000:8.1f} ms ({os.path.getsize(cache_path) / 1024:.0f} KiB)")
+        print(f"resolve()          : {lookup_ns:8.0f} ns")
+
+    await client.stop()
+    await client_task
+    await simulator.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
@@ -0,0 +1,81 @@
+"""
+Benchmark: telegram capture size and replay speed.
+
+Writes synthetic telegrams with CaptureWriter, compares the file size with
+the knx_event JSON frames they came from, then measures mmap replay alone and
+through the full EventPipeline (bus load and anomaly detection).
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_capture
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from knx_sentinel.anomaly_engine import AnomalyEngine
+from knx_sentinel.bus_monitor import BusLoadMonitor
+from knx_sentinel.capture import CaptureWriter, read_capture, replay_capture
+from knx_sentinel.egress import EgressProvider
+from knx_sentinel.pipeline import EventPipeline
+from knx_sentinel.simulator import KNX_EVENT_TEMPLATE, TelegramGenerator
+from knx_sentinel.telegram import FrameDecoder
+
+TELEGRAMS = 1_000_000
+
+
+class NullEgress(EgressProvider):
+    async def send_metric(self, measurement, tags, fields, timestamp=None):
+        pass
+
+
+def record(directory):
+    generator = TelegramGenerator(group_addresses=2000)
+    decode = FrameDecoder().decode
+    writer = CaptureWriter(directory, segment_bytes=64 * 2**20, quota_bytes=2**40)
+    json_bytes = 0
+    start = time.perf_counter()
+    for seq in range(TELEGRAMS):
+        destination, source, value = generator.next()
+        frame = KNX_EVENT_TEMPLATE.format(id=1, seq=seq % 1000000, destination=destination, source=source,
+                                          value=value, payload=f"[12,{seq % 256}]",
+                                          time_fired="2024-03-20T12:00:00+00:00")
+        json_bytes += len(frame)
+        writer.write(decode(frame)[2], now=1_700_000_000 + seq / 50)
+    writer.close()
+    capture_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f"  json frames: {json_bytes / TELEGRAMS:6.1f} bytes/telegram")
+    print(f"  capture    : {capture_bytes / TELEGRAMS:6.1f} bytes/telegram "
+          f"({json_bytes / capture_bytes:.1f}x smaller, decode+write {time.perf_counter() - start:.1f}s)")
+
+
+async def replay_pipeline(directory):
+    clock = [0.0]
+    engine = AnomalyEngine({})
+    pipeline = EventPipeline(BusLoadMonitor(clock=lambda: clock[0]), engine, NullEgress(), {"site_id": "bench"})
+
+    def on_time(timestamp):
+        clock[0] = timestamp
+
+    return await replay_capture(directory, pipeline.handle_telegram, on_time=on_time)
+
+
+def main():
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        record(directory)
+
+        start = time.perf_counter()
+        count = sum(1 for _ in read_capture(directory))
+        elapsed = time.perf_counter() - start
+        print(f"  read       : {count / elapsed:>10,.0f} telegrams/s")
+
+        start = time.perf_counter()
+        count = asyncio.run(replay_pipeline(directory))
+        elapsed = time.perf_counter() - start
+        print(f"  pipeline   : {count / elapsed:>10,.0f} telegrams/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark: write volume and CPU of raw value compression.
+
+Simulates temperature sensors resent every 10 s for a day (slow daily
+curve, 0.05 K sensor noise and 0.1 K quantisation) and counts how many
+values each filter forwards.
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_compression
+"""
+import math
+import random
+import time
+
+from knx_sentinel.compression import DeadbandFilter, SwingingDoorFilter
+
+SENSORS = 100
+PERIOD = 10
+DAY = 86_400
+
+
+def series(seed):
+    rnd = random.Random(seed)
+    base = 19 + rnd.random() * 4
+    return [(t, round(base + 1.5 * math.sin(2 * math.pi * t / DAY) + rnd.gauss(0, 0.05), 1))
+            for t in range(0, DAY, PERIOD)]
+
+
+def main():
+    data = [series(i) for i in range(SENSORS)]
+    total = sum(len(s) for s in data)
+    for label, make in (("deadband 0.2", lambda: DeadbandFilter(0.2, max_interval=900)),
+                        ("swinging_door 0.2", lambda: SwingingDoorFilter(0.2, max_interval=900))):
+        forwarded = 0
+        start = time.perf_counter()
+        for values in data:
+            value_filter = make()
+            for t, v in values:
+                forwarded += len(value_filter.offer(t, v))
+        elapsed = time.perf_counter() - start
+        print(f"{label:>18}: {forwarded:>7} of {total} values forwarded "
+              f"({100 - forwarded / total * 100:.1f}% fewer writes), {elapsed / total * 1e9:.0f} ns/value")
+
+
+if __name__ == "__main__":
+    main()
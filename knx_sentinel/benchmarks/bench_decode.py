@@ -0,0 +1,79 @@
+"""
+Microbenchmark: decoding knx_event WebSocket frames.
+
+"baseline" is the previous json.loads of the whole frame followed by a walk
+to event.data; the other rows use FrameDecoder with each installed backend.
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_decode
+"""
+import json
+import time
+
+from knx_sentinel import telegram as telegram_module
+from knx_sentinel.telegram import FrameDecoder
+
+FRAMES = 200_000
+
+
+def make_frames():
+    frames = []
+    for i in range(1000):
+        frames.append(json.dumps({
+            "id": 1,
+            "type": "event",
+            "event": {
+                "event_type": "knx_event",
+                "data": {
+                    "data": [12, i % 256],
+                    "destination": f"1/2/{i % 256}",
+                    "direction": "Incoming",
+                    "source": f"1.1.{i % 200}",
+                    "telegramtype": "GroupValueWrite",
+                    "value": 20.0 + i / 100
+                },
+                "origin": "LOCAL",
+                "time_fired": "2024-03-20T12:00:00.123456+00:00",
+                "context": {"id": "01HSB4Q4ZP6X3M2K6V8N0JQW1E", "parent_id": None, "user_id": None}
+            }
+        }))
+    return (frames * (FRAMES // len(frames)))[:FRAMES]
+
+
+def baseline(frames):
+    for raw in frames:
+        data = json.loads(raw)
+        if data.get("type") == "event":
+            event = data.get("event", {})
+            event.get("data", {}).get("destination")
+
+
+def decoder(backend):
+    decode = FrameDecoder(backend).decode
+
+    def run(frames):
+        for raw in frames:
+            decode(raw)[2].destination
+    return run
+
+
+def measure(label, fn, frames):
+    start = time.perf_counter()
+    fn(frames)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>9}: {len(frames) / elapsed:>10.0f} frames/s ({elapsed / len(frames) * 1e6:.2f} us/frame)")
+
+
+def main():
+    frames = make_frames()
+    measure("baseline", baseline, frames)
+    for backend, module in (("json", json), ("orjson", telegram_module.orjson),
+                            ("msgspec", telegram_module.msgspec)):
+        if module is None:
+            print(f"{backend:>9}: not installed")
+            continue
+        measure(backend, decoder(backend), frames)
+
+
+if __name__ == "__main__":
+    main()
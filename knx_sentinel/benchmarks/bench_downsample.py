@@ -0,0 +1,54 @@
+"""
+Benchmark: downsampling 10k entities and flushing them as one batch.
+
+Measures the per-value cost of Downsampler.add() and the time of one
+interval flush through InfluxDBProvider.send_batch (line formatting and gzip;
+the HTTP request itself is stubbed out).
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_downsample
+"""
+import asyncio
+import gzip
+import random
+import time
+
+from knx_sentinel.downsample import Downsampler
+from knx_sentinel.egress import InfluxDBProvider
+
+ENTITIES = 10_000
+VALUES = 1_000_000
+
+
+class StubInfluxDB(InfluxDBProvider):
+    async def _write(self, lines):
+        body = gzip.compress("\n".join(lines).encode("utf-8"), compresslevel=6)
+        self.requests = getattr(self, "requests", 0) + 1
+        self.wire_bytes = len(body)
+        return True
+
+
+async def main():
+    egress = StubInfluxDB("http://localhost", "token", "org", "bucket")
+    sampler = Downsampler(egress, interval=60)
+    entities = [(f"sensor.knx_{i}", {"client_id": "bench", "site_id": "bench", "entity_id": f"sensor.knx_{i}"})
+                for i in range(ENTITIES)]
+    rnd = random.Random(0)
+    stream = [(entities[rnd.randrange(ENTITIES)], rnd.gauss(21, 1)) for _ in range(VALUES)]
+
+    add = sampler.add
+    start = time.perf_counter()
+    for (entity_id, tags), value in stream:
+        add(entity_id, tags, value)
+    elapsed = time.perf_counter() - start
+    print(f"add  : {VALUES / elapsed:>12,.0f} values/s ({elapsed / VALUES * 1e9:.0f} ns/value)")
+
+    start = time.perf_counter()
+    await sampler.flush()
+    elapsed = time.perf_counter() - start
+    print(f"flush: {sampler.flushed} entities in {elapsed * 1e3:.0f} ms, "
+          f"{egress.requests} request, {egress.wire_bytes / 1024:.0f} KiB gzip")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
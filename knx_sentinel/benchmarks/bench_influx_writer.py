@@ -0,0 +1,87 @@
+"""
+Throughput benchmark: InfluxDB writer against a local stub HTTP server.
+
+"before" reproduces the previous behaviour (one ClientSession and one POST
+per line), "after" uses the buffered, pooled and gzip-compressed
+InfluxDBProvider.
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_influx_writer
+"""
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from knx_sentinel.egress import InfluxDBProvider
+
+HOST = "127.0.0.1"
+PORT = 18086
+BEFORE_LINES = 2_000
+AFTER_LINES = 200_000
+
+
+class StubInflux:
+    """Accepts /api/v2/write and counts received lines and wire bytes."""
+    def __init__(self):
+        self.lines = 0
+        self.requests = 0
+        self.wire_bytes = 0
+
+    async def handle_write(self, request):
+        self.wire_bytes += request.content_length or 0
+        # aiohttp transparently decodes Content-Encoding: gzip
+        body = await request.read()
+        self.lines += body.count(b"\n") + 1
+        self.requests += 1
+        return web.Response(status=204)
+
+
+async def write_before(provider, count):
+    # Previous send_metric: a new session and request per line
+    for i in range(count):
+        line = provider._format_line("knx_metrics", {"site_id": "bench", "metric_type": "bus_load"},
+                                     {"telegrams_per_min": i}, time.time_ns())
+        async with aiohttp.ClientSession() as session:
+            async with session.post(provider.url, data=line, headers=provider.headers) as resp:
+                await resp.read()
+
+
+async def write_after(provider, count):
+    await provider.start()
+    for i in range(count):
+        await provider.send_metric("knx_metrics", {"site_id": "bench", "metric_type": "bus_load"},
+                                   {"telegrams_per_min": i})
+    await provider.stop()
+
+
+async def run(label, writer, provider, count, stub):
+    stub.lines = stub.requests = stub.wire_bytes = 0
+    start = time.perf_counter()
+    await writer(provider, count)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>7}: {count:>7} lines in {elapsed:6.2f}s = {count / elapsed:>10.0f} lines/s "
+          f"({stub.requests} requests, {stub.lines} lines, {stub.wire_bytes / count:.1f} wire bytes/line)")
+
+
+async def main():
+    stub = StubInflux()
+    app = web.Application(client_max_size=64 * 2**20)
+    app.router.add_post("/api/v2/write", stub.handle_write)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, HOST, PORT)
+    await site.start()
+    try:
+        url = f"http://{HOST}:{PORT}"
+        await run("before", write_before,
+                  InfluxDBProvider(url, "token", "org", "bucket", compress=False), BEFORE_LINES, stub)
+        await run("after", write_after,
+                  InfluxDBProvider(url, "token", "org", "bucket"), AFTER_LINES, stub)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Benchmark: MQTT egress throughput, paho vs the native asyncio client.
+
+Publishes the same metrics through each provider to a local broker
+stand-in (MQTTBrokerStub) and reports metrics/s until the broker has
+received everything, plus the payload bytes per metric.
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_mqtt [metrics]
+"""
+import asyncio
+import sys
+import time
+
+from knx_sentinel.egress import MQTTProvider, AsyncMQTTProvider
+from knx_sentinel.simulator import MQTTBrokerStub
+
+TAGS = {"client_id": "customer_001", "site_id": "site_nyc_01", "entity_id": "sensor.office_temperature"}
+
+
+async def run(label, make_provider, count):
+    broker = MQTTBrokerStub()
+    await broker.start()
+    provider = make_provider(broker.port)
+    await provider.start()
+    await asyncio.sleep(0.2) # Connected before timing starts
+
+    start = time.perf_counter()
+    for i in range(count):
+        await provider.send_metric("knx_raw_values", TAGS, {"value": 20.0 + i % 50 / 10}, 1_700_000_000 + i)
+        if i % 1000 == 0:
+            await asyncio.sleep(0) # Let the broker side read
+    await provider.stop()
+    while True:
+        expected = len(broker.messages)
+        await asyncio.sleep(0.05)
+        if len(broker.messages) == expected:
+            break
+    elapsed = time.perf_counter() - start
+
+    payload_bytes = sum(len(m[1]) for m in broker.messages)
+    print(f"{label:<28} {count / elapsed:>10,.0f} metrics/s {len(broker.messages):>7} messages "
+          f"{payload_bytes / count:>6.1f} B/metric")
+    await broker.stop()
+
+
+async def main(count):
+    print(f"{count} metrics to a local broker stand-in")
+    await run("paho, json, qos 0", lambda port: MQTTProvider("127.0.0.1", port, "knx"), count)
+    for qos in (0, 1):
+        await run(f"native, json, qos {qos}",
+                  lambda port: AsyncMQTTProvider("127.0.0.1", port, "knx", qos=qos,
+                                                 max_buffer=count), count)
+    for encoding in ("json", "msgpack", "cbor"):
+        await run(f"native, {encoding}, batch 100",
+                  lambda port: AsyncMQTTProvider("127.0.0.1", port, "knx", encoding=encoding,
+                                                 batch_size=100), count)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
@@ -0,0 +1,155 @@
+"""
+End-to-end benchmark: the full run.main() pipeline against the local HA
+WebSocket simulator and a stub InfluxDB endpoint.
+
+Reports sustained telegrams/sec, end-to-end latency percentiles (from the
+simulator handing a frame to the socket until the pipeline has processed it)
+and process RSS. Use --rate 0 to measure the saturation throughput. The
+simulator shares the event loop with the add-on, so saturation figures are a
+lower bound.
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_pipeline --rate 2000 --duration 20
+    python -m benchmarks.bench_pipeline --rate 0 --group-addresses 5000 --subscription telegrams
+"""
+import argparse
+import asyncio
+import logging
+import resource
+import tempfile
+import time
+
+from aiohttp import web
+
+from knx_sentinel import run
+from knx_sentinel.simulator import DISTRIBUTIONS, HASimulator, TelegramGenerator
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=1000, help="telegrams/s, 0 = as fast as possible")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--burst", type=float, default=1.0, help="send each second's telegrams in 1/burst s")
+    parser.add_argument("--group-addresses", type=int, default=500)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="normal")
+    parser.add_argument("--anomaly-rate", type=float, default=0.001)
+    parser.add_argument("--subscription", choices=("knx_event", "telegrams"), default="knx_event")
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    return parser.parse_args()
+
+
+def rss_mib():
+    """Current and peak resident set size in MiB."""
+    current = 0.0
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return current, max(current, peak)
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+async def start_stub_influx():
+    async def handle_write(request):
+        await request.read()
+        return web.Response(status=204)
+
+    app = web.Application(client_max_size=64 * 2**20)
+    app.router.add_post("/api/v2/write", handle_write)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+async def bench(args, workdir):
+    generator = TelegramGenerator(args.group_addresses, args.distribution, args.anomaly_rate)
+    simulator = HASimulator(generator, rate=args.rate, burst=args.burst)
+    await simulator.start()
+    influx_runner, influx_url = await start_stub_influx()
+
+    config = run.load_config()
+    config.update({
+        "ha_url": simulator.url,
+        "mode": "influxdb",
+        "snapshot": {"path": f"{workdir}/anomaly_state.bin", "interval": 3600},
+        "spool": {"path": f"{workdir}/spool", "quota_mb": 0}
+    })
+    config["influxdb"].update({"host": influx_url, "token": "bench", "org": "bench", "bucket": "bench"})
+    config["autodiscovery"]["cache_path"] = f"{workdir}/autoconfig.json"
+    config["ingest"].update({
+        "queue_size": args.queue_size,
+        "workers": args.workers,
+        "policy": "block",
+        "subscription": args.subscription
+    })
+
+    # Workers take telegrams from a FIFO queue fed in send order, so the
+    # n-th processed telegram is the n-th one the simulator sent
+    latencies = []
+    components = {}
+
+    def on_ready(wired):
+        components.update(wired)
+        client = wired["client"]
+        handler = client.event_callback
+        sent_at = simulator.sent_at
+        clock = time.perf_counter
+
+        async def timed_handler(telegram):
+            n = len(latencies)
+            latencies.append(0.0)
+            await handler(telegram)
+            latencies[n] = clock() - sent_at[n]
+        client.set_callback(timed_handler)
+
+    stop_event = asyncio.Event()
+    main_task = asyncio.create_task(run.main(config, stop_event, on_ready))
+    rss_before, _ = rss_mib()
+
+    # Skip the first second (connection, warm-up) when measuring throughput
+    await asyncio.sleep(1.0)
+    processed_start = len(latencies)
+    start = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    elapsed = time.perf_counter() - start
+    processed = len(latencies) - processed_start
+    rss, peak_rss = rss_mib()
+
+    stop_event.set()
+    await main_task
+    await simulator.stop()
+    await influx_runner.cleanup()
+
+    ordered = sorted(latencies[processed_start:processed_start + processed])
+    queue = components["client"].get_queue_stats()
+    engine = components["anomaly_engine"].get_stats()
+    print(f"offered rate      : {'max' if not args.rate else f'{args.rate:.0f}/s'} (burst {args.burst}), "
+          f"{args.group_addresses} GAs, {args.subscription}")
+    print(f"sustained         : {processed / elapsed:,.0f} telegrams/s ({processed} in {elapsed:.1f}s)")
+    print(f"latency p50/p95/p99: {percentile(ordered, 50) * 1e3:.2f} / {percentile(ordered, 95) * 1e3:.2f} / "
+          f"{percentile(ordered, 99) * 1e3:.2f} ms (max {ordered[-1] * 1e3 if ordered else 0:.2f} ms)")
+    print(f"RSS               : {rss:.1f} MiB (peak {peak_rss:.1f} MiB, {rss - rss_before:+.1f} MiB during run)")
+    print(f"ingest queue      : {queue}")
+    print(f"sensors           : {engine['sensors']}, injected anomalies {generator.anomalies}")
+
+
+def main():
+    args = parse_args()
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(bench(args, workdir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Memory benchmark: per-sensor anomaly state layouts.
+
+Compares the legacy layout (two dicts, a deque of boxed floats per sensor)
+with AnomalyEngine's SensorState records backed by array('d') rings.
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_sensor_memory
+"""
+import gc
+import random
+import tracemalloc
+from collections import deque
+
+from knx_sentinel.anomaly_engine import AnomalyEngine
+
+SENSOR_COUNTS = (1_000, 10_000, 50_000)
+WINDOW = 60
+
+
+def entity_ids(count):
+    return [f"sensor.knx_{i // 4096}_{(i // 256) % 16}_{i % 256}" for i in range(count)]
+
+
+def build_legacy(ids, rng):
+    buffers = {}
+    profiles = {}
+    for entity_id in ids:
+        buffer = deque(maxlen=WINDOW)
+        for _ in range(WINDOW):
+            buffer.append(float(rng.uniform(15.0, 25.0)))
+        buffers[entity_id] = buffer
+        profiles[entity_id] = {"method": "z_score", "threshold": 3.0}
+    return buffers, profiles
+
+
+def build_engine(ids, rng):
+    engine = AnomalyEngine({"max_sensors": len(ids)})
+    engine.default_maxlen = WINDOW
+    for entity_id in ids:
+        engine.register_sensor(entity_id)
+        stats = engine.sensors[entity_id].stats
+        for _ in range(WINDOW):
+            stats.push(rng.uniform(15.0, 25.0))
+    return engine
+
+
+def measure(builder, ids):
+    rng = random.Random(42)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = builder(ids, rng)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del result
+    return used
+
+
+def main():
+    print(f"{'sensors':>8} {'legacy MiB':>11} {'SensorState MiB':>16} {'ratio':>6}")
+    for count in SENSOR_COUNTS:
+        # Entity id strings are shared by both layouts; allocate them up front
+        ids = entity_ids(count)
+        legacy = measure(build_legacy, ids)
+        compact = measure(build_engine, ids)
+        print(f"{count:>8} {legacy / 2**20:>11.1f} {compact / 2**20:>16.1f} {legacy / compact:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
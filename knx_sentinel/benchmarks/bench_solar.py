@@ -0,0 +1,57 @@
+"""
+Benchmark: solar elevation per reading vs cached vs batch evaluation.
+
+Evaluates the elevation for a stream of lux readings spread over one hour
+(as check_solar_sensor would), then a day of minute steps for many sites
+with the batch API, with and without NumPy.
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_solar [readings]
+"""
+import sys
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+from knx_sentinel import math_kernel
+from knx_sentinel.math_kernel import MathKernel, SolarElevationCache
+
+LAT, LON = 48.14, 11.58
+START = datetime(2024, 6, 1, 10, 0, tzinfo=timezone.utc).timestamp()
+
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms {elapsed / count * 1e9:9.0f} ns/elevation")
+
+
+def main(readings):
+    timestamps = [START + i * 3600 / readings for i in range(readings)]
+    datetimes = [datetime.fromtimestamp(t, timezone.utc) for t in timestamps]
+    print(f"{readings} readings over one hour, one site")
+    timed("per reading (datetime)", readings,
+          lambda: [MathKernel.calculate_solar_elevation(LAT, LON, d) for d in datetimes])
+    cache = SolarElevationCache(LAT, LON, step=60)
+    timed("cached, 60 s step", readings, lambda: [cache.elevation(t) for t in timestamps])
+    cache = SolarElevationCache(LAT, LON, step=60)
+    timed("cached batch, 60 s step", readings, lambda: cache.elevations(timestamps))
+
+    sites = 100
+    minutes = [START + 60 * i for i in range(1440)] * sites
+    lats = [LAT + i * 0.1 for i in range(sites) for _ in range(1440)]
+    lons = [LON + i * 0.1 for i in range(sites) for _ in range(1440)]
+    print(f"\n{sites} sites x 1440 minutes")
+    with mock.patch.object(math_kernel, "np", None):
+        timed("batch, pure Python", len(minutes),
+              lambda: MathKernel.calculate_solar_elevations(lats, lons, minutes))
+    if math_kernel.np is not None:
+        timed("batch, NumPy", len(minutes),
+              lambda: MathKernel.calculate_solar_elevations(lats, lons, minutes))
+    else:
+        print("batch, NumPy                       (not installed)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
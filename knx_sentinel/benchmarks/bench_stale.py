@@ -0,0 +1,72 @@
+"""
+Benchmark: stale sensor detection with the deadline heap vs a periodic scan.
+
+Simulates N sensors with cyclic send intervals of 1-10 minutes over six
+hours of virtual time, with 1% of them going silent halfway. Reports the
+cost of seen() per telegram and of the 1 s timer tick, next to a naive
+scan over all sensors per tick.
+
+Usage (from the add-on directory):
+    python -m benchmarks.bench_stale [sensors]
+"""
+import heapq
+import random
+import sys
+import time
+from unittest.mock import AsyncMock
+
+from knx_sentinel.stale import StaleMonitor
+
+HOURS = 6
+
+
+def main(sensors):
+    rnd = random.Random(1)
+    monitor = StaleMonitor(AsyncMock(), {}, factor=3, min_timeout=300)
+    entity_ids = [f"sensor.knx_{i}" for i in range(sensors)]
+    intervals = [rnd.choice((60, 120, 300, 600)) for _ in range(sensors)]
+    dead = set(rnd.sample(range(sensors), sensors // 100))
+    end = HOURS * 3600
+
+    # Telegram schedule: (time, sensor)
+    events = [(rnd.random() * intervals[i], i) for i in range(sensors)]
+    heapq.heapify(events)
+
+    seen_time = 0.0
+    tick_time = 0.0
+    telegrams = 0
+    ticks = 0
+    fired = 0
+    next_tick = 1.0
+    while events:
+        t, i = heapq.heappop(events)
+        if t > end:
+            break
+        while next_tick <= t:
+            start = time.perf_counter()
+            fired += len(monitor.expire(now=next_tick))
+            tick_time += time.perf_counter() - start
+            ticks += 1
+            next_tick += 1.0
+        start = time.perf_counter()
+        monitor.seen(entity_ids[i], now=t)
+        seen_time += time.perf_counter() - start
+        telegrams += 1
+        if not (i in dead and t > end / 2):
+            heapq.heappush(events, (t + intervals[i] * rnd.uniform(0.98, 1.02), i))
+
+    # Naive alternative: look at every sensor once per second
+    arrivals = list(monitor._arrivals.values())
+    start = time.perf_counter()
+    for _ in range(10):
+        stale = [r for r in arrivals if end - r.last > 3 * r.interval]
+    scan = (time.perf_counter() - start) / 10
+
+    print(f"{sensors} sensors, {telegrams} telegrams over {HOURS} h, {len(dead)} went silent")
+    print(f"seen()        : {seen_time / telegrams * 1e9:8.0f} ns/telegram (incl. timing overhead)")
+    print(f"heap tick     : {tick_time / ticks * 1e6:8.1f} us/tick avg ({ticks} ticks), {fired} stale reported")
+    print(f"full scan tick: {scan * 1e6:8.1f} us/tick ({len(stale)} stale)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
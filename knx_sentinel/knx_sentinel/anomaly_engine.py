@@ -1,94 +1,169 @@
-from collections import deque
 import logging
-from knx_sentinel.math_kernel import MathKernel
+import time
+from collections import OrderedDict
+from knx_sentinel.math_kernel import RollingStats
+from knx_sentinel.detectors import resolve_detector
 
 _LOGGER = logging.getLogger(__name__)
 
+DEFAULT_PROFILE = {"method": "z_score", "threshold": 3.0}
+
+class SensorState:
+    """
+    Per-sensor record: profile, rolling window and resolved detector.
+
+    Slotted so that thousands of auto-registered group addresses stay cheap;
+    the window itself is an array('d') ring inside RollingStats and is only
+    allocated for detectors that need it (stats is None otherwise).
+    """
+    __slots__ = ("profile", "stats", "detector", "pinned", "last_seen")
+
+    def __init__(self, profile, stats, detector, pinned=False, last_seen=0.0):
+        self.profile = profile
+        self.stats = stats
+        self.detector = detector
+        self.pinned = pinned
+        self.last_seen = last_seen
+
 class AnomalyEngine:
     def __init__(self, config=None):
         self.config = config or {}
-        self.buffers = {} # entity_id -> deque
-        self.profiles = {} # entity_id -> profile dict
+        self.sensors = {} # entity_id -> SensorState
         self.default_maxlen = 60
 
-    def register_sensor(self, entity_id, profile=None):
-        """Registers a sensor for monitoring."""
-        if entity_id not in self.buffers:
-            self.buffers[entity_id] = deque(maxlen=self.default_maxlen)
-            self.profiles[entity_id] = profile or {"method": "z_score", "threshold": 3.0}
-            _LOGGER.info(f"Registered sensor {entity_id} for anomaly detection")
+        # Auto-registered sensors are bounded; pinned ones are never evicted
+        self.max_sensors = self.config.get("max_sensors", 5000)
+        self.idle_ttl = self.config.get("idle_ttl", 86400)
+        self._lru = OrderedDict() # unpinned entity_id -> SensorState, oldest first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.eviction_listeners = [] # callables taking the evicted entity_id
+
+    def register_sensor(self, entity_id, profile=None, pinned=False, now=None):
+        """
+        Registers a sensor for monitoring.
+
+        Sensors registered with pinned=True (configured or discovered profiles)
+        are exempt from capacity and idle eviction. Registering an existing
+        auto-registered sensor as pinned upgrades it in place, and a changed
+        profile rebinds its detector.
+        Returns the sensor's SensorState.
+        """
+        state = self.sensors.get(entity_id)
+        if state is not None:
+            self.hits += 1
+            if pinned and not state.pinned:
+                self._lru.pop(entity_id, None)
+                state.pinned = True
+            if profile is not None and profile != state.profile:
+                self._bind_detector(state, profile)
+            return state
+
+        self.misses += 1
+        if now is None:
+            now = time.monotonic()
+        profile = profile or DEFAULT_PROFILE
+        state = SensorState(profile, None, None, pinned, now)
+        self._bind_detector(state, profile)
+        self.sensors[entity_id] = state
+        if not pinned:
+            self._lru[entity_id] = state
+            self.evict_idle(now)
+            while len(self._lru) > self.max_sensors:
+                self._evict(next(iter(self._lru)))
+        _LOGGER.debug(f"Registered sensor {entity_id} for anomaly detection")
+        return state
 
-    def process_value(self, entity_id, value):
+    def evict_idle(self, now=None):
+        """
+        Evicts auto-registered sensors not seen for idle_ttl seconds.
+        Returns the number of evicted sensors.
+        """
+        if now is None:
+            now = time.monotonic()
+        deadline = now - self.idle_ttl
+        evicted = 0
+        lru = self._lru
+        # The LRU is ordered by last_seen, so only the idle head is visited
+        while lru:
+            entity_id, state = next(iter(lru.items()))
+            if state.last_seen > deadline:
+                break
+            self._evict(entity_id)
+            evicted += 1
+        return evicted
+
+    def remove_sensor(self, entity_id):
+        """
+        Stops monitoring a sensor, pinned or not (e.g. removed from the
+        entity registry). Eviction listeners are notified as for an eviction.
+        """
+        if self.sensors.pop(entity_id, None) is None:
+            return
+        self._lru.pop(entity_id, None)
+        _LOGGER.debug(f"Removed sensor {entity_id} from anomaly detection")
+        for listener in self.eviction_listeners:
+            listener(entity_id)
+
+    def _evict(self, entity_id):
+        del self._lru[entity_id]
+        del self.sensors[entity_id]
+        self.evictions += 1
+        _LOGGER.debug(f"Evicted sensor {entity_id} from anomaly detection")
+        for listener in self.eviction_listeners:
+            listener(entity_id)
+
+    def get_stats(self):
+        """Returns registry size and cache counters."""
+        return {
+            "sensors": len(self.sensors),
+            "pinned": len(self.sensors) - len(self._lru),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def _bind_detector(self, state, profile):
+        """Resolves the profile to a detector once and sizes the state for it."""
+        detector = resolve_detector(profile)
+        state.profile = profile
+        state.detector = detector
+        if detector is not None and detector.uses_window:
+            if state.stats is None:
+                state.stats = RollingStats(self.default_maxlen)
+        else:
+            state.stats = None
+
+    def process_value(self, entity_id, value, now=None):
         """
         Processes a new value for a sensor.
         Returns an anomaly dict if detected, else None.
         """
-        if entity_id not in self.buffers:
+        state = self.sensors.get(entity_id)
+        if state is None:
             return None
+        return self.process_state(entity_id, state, value, now)
 
+    def process_state(self, entity_id, state, value, now=None):
+        """
+        Like process_value() for callers that already hold the sensor's
+        SensorState (e.g. a cached route), saving the registry lookup.
+        """
         try:
             val = float(value)
         except (ValueError, TypeError):
             return None
 
-        buffer = self.buffers[entity_id]
-        buffer.append(val)
-        
-        profile = self.profiles[entity_id]
-        method = profile.get("method", "z_score")
+        state.last_seen = time.monotonic() if now is None else now
+        if not state.pinned:
+            self._lru.move_to_end(entity_id)
 
-        if method == "z_score":
-            return self._check_z_score(entity_id, val, buffer, profile)
-        elif method == "range":
-            return self._check_range(entity_id, val, profile)
+        stats = state.stats
+        if stats is not None:
+            stats.push(val)
         
-        return None
-
-    def _check_z_score(self, entity_id, value, buffer, profile):
-        if len(buffer) < 30:
-            return None # Insufficient data
-
-        mean = MathKernel.calculate_mean(buffer)
-        std_dev = MathKernel.calculate_std_dev(buffer)
-        
-        if std_dev == 0:
+        detector = state.detector
+        if detector is None:
             return None
-
-        z_score = MathKernel.calculate_z_score(value, mean, std_dev)
-        threshold = profile.get("threshold", 3.0)
-
-        if abs(z_score) > threshold:
-            _LOGGER.warning(f"Anomaly detected for {entity_id}: Value={value}, Z-Score={z_score:.2f}")
-            return {
-                "type": "anomaly",
-                "subtype": "z_score",
-                "entity_id": entity_id,
-                "value": value,
-                "z_score": z_score,
-                "threshold": threshold
-            }
-        return None
-
-    def _check_range(self, entity_id, value, profile):
-        min_val = profile.get("min")
-        max_val = profile.get("max")
-        
-        if min_val is not None and value < min_val:
-            return {
-                "type": "anomaly",
-                "subtype": "range_low",
-                "entity_id": entity_id,
-                "value": value,
-                "limit": min_val
-            }
-        
-        if max_val is not None and value > max_val:
-             return {
-                "type": "anomaly",
-                "subtype": "range_high",
-                "entity_id": entity_id,
-                "value": value,
-                "limit": max_val
-            }
-            
-        return None
+        return detector(entity_id, val, state)
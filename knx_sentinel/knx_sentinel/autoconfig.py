@@ -1,22 +1,303 @@
+import asyncio
+import json
 import logging
+import os
+import re
+import time
+from knx_sentinel.ha_client import HACommandError
+from knx_sentinel.routing import default_resolver
 
 _LOGGER = logging.getLogger(__name__)
 
+# KNX entities configured in YAML use their group addresses as unique_id,
+# e.g. "1/2/3" for a sensor or "1/0/1_1/0/2" for entities with several
+GROUP_ADDRESS = re.compile(r"\d+/\d+/\d+")
+CACHE_VERSION = 1
+
+def group_addresses(unique_id):
+    """Group addresses contained in a KNX entity unique_id."""
+    return GROUP_ADDRESS.findall(unique_id or "")
+
 class AutoConfigurator:
-    def __init__(self, ha_client):
+    """
+    Discovers KNX entities from the Home Assistant entity registry and maps
+    their group addresses to entity ids and profiles.
+
+    discover_entities() fetches the registry and all states once (two bulk
+    commands), keeps only KNX entities and writes them to `cache_path`; a
+    restart within `cache_max_age` seconds reads the cache instead. While
+    running, entity_registry_updated events update single entities without
+    refetching. resolve() is the RoutingTable resolver; `listeners` are
+    called with each group address whose mapping changed. Entities with a
+    profile are kept registered as pinned sensors with `anomaly_engine`,
+    and removed from it when they lose their profile. `profiles` are
+    configured profiles by entity id, which take precedence over discovered
+    ones.
+    """
+    def __init__(self, ha_client, cache_path=None, cache_max_age=86400, exclude_entities=(),
+                 anomaly_engine=None, profiles=None):
         self.ha_client = ha_client
+        self.anomaly_engine = anomaly_engine
+        self.profiles = profiles or {}
+        self.cache_path = cache_path
+        self.cache_max_age = cache_max_age
+        self.exclude_entities = set(exclude_entities)
+        self.entities = {} # entity_id -> compact registry entry (KNX only)
+        self.index = {} # group address -> (entity_id, profile)
+        self._claims = {} # group address -> [entity_id] with that address in their unique_id
+        self.listeners = []
+        self.fetched_at = 0.0
+        self._updates = set()
+
+    async def start(self, retry_interval=30):
+        """
+        Subscribes to registry changes and loads the index, retrying until
+        Home Assistant answers. Meant to run as a task next to the client.
+        """
+        await self.ha_client.subscribe_events("entity_registry_updated", self._on_registry_updated)
+        while True:
+            try:
+                if not self._fresh():
+                    await self.discover_entities()
+                return
+            except (HACommandError, ConnectionError, asyncio.TimeoutError) as e:
+                _LOGGER.warning(f"Entity discovery failed, retrying in {retry_interval}s: {e}")
+                await asyncio.sleep(retry_interval)
+
+    def preload(self):
+        """
+        Restores the index from the cache before Home Assistant is reachable,
+        so discovered sensors are registered before the anomaly snapshot is
+        loaded. Returns True if the cache was fresh.
+        """
+        return self._load_cache()
+
+    def _fresh(self):
+        return bool(self.entities) and time.time() - self.fetched_at <= self.cache_max_age
+
+    async def discover_entities(self, refresh=False):
+        """
+        Builds the group address index, from the cache if it is fresh.
+        Returns the discovered entities as dicts with entity_id, profile and
+        addresses.
+        """
+        if refresh or not self._load_cache():
+            registry = await self.ha_client.call({"type": "config/entity_registry/list"})
+            states = await self.ha_client.call({"type": "get_states"})
+            self._build(registry, states)
+            self.fetched_at = time.time()
+            self._save_cache()
+            _LOGGER.info(f"Discovered {len(self.entities)} KNX entities, {len(self.index)} group addresses")
+
+        return [
+            {
+                "entity_id": entity_id,
+                "profile": self.analyze_entity(entry),
+                "addresses": group_addresses(entry["unique_id"])
+            }
+            for entity_id, entry in self.entities.items()
+        ]
+
+    def resolve(self, destination):
+        """Returns (entity_id, profile) for a group address."""
+        mapping = self.index.get(destination)
+        if mapping is None:
+            return default_resolver(destination)
+        return mapping
+
+    def _build(self, registry, states):
+        attributes = {
+            state["entity_id"]: state.get("attributes") or {}
+            for state in states
+        }
+        entities = {}
+        for entry in registry:
+            if entry.get("platform") != "knx":
+                continue
+            entity_id = entry["entity_id"]
+            attrs = attributes.get(entity_id, {})
+            entities[entity_id] = self._compact(entry, attrs)
+
+        old = set(self.index)
+        old_entities = set(self.entities)
+        self.entities = {}
+        self.index = {}
+        self._claims = {}
+        for entity_id, entry in entities.items():
+            self._add(entity_id, entry)
+        self._sync(old_entities | set(self.entities))
+        self._notify(old | set(self.index))
+
+    @staticmethod
+    def _compact(entry, attributes=None):
+        """The registry fields analyze_entity() needs, as cached."""
+        attributes = attributes or {}
+        return {
+            "entity_id": entry["entity_id"],
+            "platform": entry.get("platform"),
+            "unique_id": entry.get("unique_id"),
+            "device_class": entry.get("device_class") or entry.get("original_device_class")
+                            or attributes.get("device_class"),
+            "unit_of_measurement": attributes.get("unit_of_measurement")
+        }
+
+    def _add(self, entity_id, entry):
+        """Indexes one entity; returns the group addresses it claims."""
+        if entity_id in self.exclude_entities:
+            return []
+        self.entities[entity_id] = entry
+        addresses = group_addresses(entry["unique_id"])
+        for address in addresses:
+            self._claims.setdefault(address, []).append(entity_id)
+            self._assign(address)
+        return addresses
+
+    def _remove(self, entity_id):
+        """Drops one entity; returns the group addresses it claimed."""
+        entry = self.entities.pop(entity_id, None)
+        if entry is None:
+            return []
+        addresses = group_addresses(entry["unique_id"])
+        for address in addresses:
+            claims = self._claims.get(address, [])
+            if entity_id in claims:
+                claims.remove(entity_id)
+            if not claims:
+                self._claims.pop(address, None)
+            self._assign(address)
+        return addresses
+
+    def _assign(self, address):
+        """
+        Maps an address to the entity whose unique_id is exactly that address
+        (a sensor reading it), else to the first entity that uses it.
+        """
+        claims = self._claims.get(address)
+        if not claims:
+            self.index.pop(address, None)
+            return
+        owner = claims[0]
+        for entity_id in claims:
+            if self.entities[entity_id]["unique_id"] == address:
+                owner = entity_id
+                break
+        profile = self.profiles.get(owner) or self.analyze_entity(self.entities[owner])
+        self.index[address] = (owner, profile)
+
+    def profile(self, entity_id):
+        """Profile of an entity that owns at least one indexed group address."""
+        entry = self.entities.get(entity_id)
+        if entry is None:
+            return None
+        for address in group_addresses(entry["unique_id"]):
+            mapping = self.index.get(address)
+            if mapping is not None and mapping[0] == entity_id:
+                return mapping[1]
+        return None
 
-    async def discover_entities(self):
+    def _sync(self, entity_ids):
         """
-        Queries HA Registry and returns a list of entities to monitor.
+        Registers the given entities that have a profile as pinned sensors
+        (rebinding changed profiles) and removes pinned ones without.
         """
-        # In a real implementation, this would call a WebSocket API.
-        # For now, we'll assume we can get a list via REST or WS.
-        # Since we don't have the full WS wrapper for registry yet, 
-        # we will mock the logic of parsing a registry list.
-        
-        # TODO: Implement actual registry fetch via ha_client
-        return []
+        engine = self.anomaly_engine
+        if engine is None:
+            return
+        for entity_id in entity_ids:
+            profile = self.profile(entity_id)
+            if profile is not None:
+                engine.register_sensor(entity_id, profile, pinned=True)
+            elif entity_id not in self.profiles:
+                state = engine.sensors.get(entity_id)
+                if state is not None and state.pinned:
+                    engine.remove_sensor(entity_id)
+
+    def _notify(self, addresses):
+        for address in addresses:
+            for listener in self.listeners:
+                listener(address)
+
+    def _on_registry_updated(self, event):
+        """entity_registry_updated callback; applies the change in the background."""
+        data = (event or {}).get("data") or {}
+        task = asyncio.create_task(self.apply_registry_update(data))
+        self._updates.add(task)
+        task.add_done_callback(self._updates.discard)
+
+    async def apply_registry_update(self, data):
+        """
+        Applies one entity_registry_updated event. Created and updated
+        entities are fetched individually with config/entity_registry/get.
+        """
+        action = data.get("action")
+        entity_id = data.get("entity_id")
+        if not entity_id:
+            return
+        old_entity_id = data.get("old_entity_id") or entity_id
+        previous = self.entities.get(old_entity_id)
+        changed = self._remove(old_entity_id)
+        if action in ("create", "update"):
+            try:
+                entry = await self.ha_client.call({"type": "config/entity_registry/get", "entity_id": entity_id})
+            except (HACommandError, ConnectionError, asyncio.TimeoutError) as e:
+                _LOGGER.warning(f"Could not fetch registry entry for {entity_id}: {e}")
+                entry = None
+            if entry and entry.get("platform") == "knx":
+                # The registry entry has no state attributes; keep the ones from discovery
+                changed = changed + self._add(entity_id, self._compact(entry, previous))
+        if changed:
+            owners = {old_entity_id, entity_id}
+            for address in changed:
+                owners.update(self._claims.get(address, ()))
+            self._sync(owners)
+            self._notify(set(changed))
+            self._save_cache()
+            _LOGGER.debug(f"Registry {action} for {entity_id}: {len(changed)} group addresses")
+
+    def _load_cache(self):
+        """Restores the index from a fresh cache file; returns success."""
+        if not self.cache_path:
+            return False
+        try:
+            with open(self.cache_path, "r") as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            _LOGGER.warning(f"Ignoring discovery cache {self.cache_path}: {e}")
+            return False
+        if cache.get("version") != CACHE_VERSION or time.time() - cache.get("fetched_at", 0) > self.cache_max_age:
+            return False
+
+        old = set(self.index)
+        old_entities = set(self.entities)
+        self.entities = {}
+        self.index = {}
+        self._claims = {}
+        for entry in cache["entities"]:
+            self._add(entry["entity_id"], entry)
+        self.fetched_at = cache["fetched_at"]
+        self._sync(old_entities | set(self.entities))
+        self._notify(old | set(self.index))
+        _LOGGER.info(f"Loaded {len(self.entities)} KNX entities from {self.cache_path}")
+        return True
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        cache = {
+            "version": CACHE_VERSION,
+            "fetched_at": self.fetched_at,
+            "entities": list(self.entities.values())
+        }
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(cache, f, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            _LOGGER.error(f"Failed to write discovery cache: {e}")
 
     @staticmethod
     def analyze_entity(entity_entry):
@@ -38,5 +319,5 @@ class AutoConfigurator:
                 return {"method": "z_score", "threshold": 3.0}
             elif device_class == "illuminance":
                 return {"method": "solar_check"}
-        
+
         return None
@@ -1,21 +1,176 @@
-import asyncio
 import logging
+import math
+import time
+from array import array
+from knx_sentinel.telegram import KnxTelegram
 
 _LOGGER = logging.getLogger(__name__)
 
+class SpaceSaving:
+    """
+    Space-Saving top-K counter (Metwally et al.).
+
+    Keeps at most `capacity` counters regardless of how many distinct keys are
+    seen. When full, a new key replaces the smallest counter and inherits its
+    count, which is recorded as the key's maximum overestimation (error).
+    """
+    def __init__(self, capacity=32):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def add(self, key):
+        counts = self.counts
+        count = counts.get(key)
+        if count is not None:
+            counts[key] = count + 1
+        elif len(counts) < self.capacity:
+            counts[key] = 1
+            self.errors[key] = 0
+        else:
+            victim = min(counts, key=counts.get)
+            floor = counts.pop(victim)
+            del self.errors[victim]
+            counts[key] = floor + 1
+            self.errors[key] = floor
+
+    def top(self, n):
+        """Returns [(key, count, error)] for the n largest counters."""
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+    def reset(self):
+        self.counts = {}
+        self.errors = {}
+
+# KNX TP1 timing, in bit times at 9600 bit/s. Every character is 11 bits
+# (start, 8 data, parity, stop) followed by 2 bit times of pause.
+TP1_BIT_RATE = 9600
+CHAR_BITS = 13
+FRAME_GAP_BITS = 50 # Minimum bus idle before a telegram
+ACK_BITS = 15 + 11 # Gap before the acknowledge character plus the character
+# Control, source (2), destination (2), length, TPCI/APCI (2) and checksum.
+# Payloads of up to 6 bits are carried inside the APCI byte.
+FRAME_BASE_CHARS = 9
+
 class BusLoadMonitor:
-    def __init__(self):
+    """
+    Counts telegrams and their on-wire bit times in a ring of per-second buckets.
+
+    Each bucket remembers which second it belongs to, so stale buckets are
+    reset lazily when reused and no timer is needed. All methods run on the
+    event loop, so no lock is required.
+    """
+    def __init__(self, window=60, clock=time.time, talker_capacity=32, alarm_threshold=60.0):
+        self.window = window
+        self._clock = clock
+        self.alarm_threshold = alarm_threshold # Utilisation % of a second
+        # One extra bucket for the second currently being filled
+        self._size = window + 1
+        self._counts = array("I", [0] * self._size)
+        self._bits = array("I", [0] * self._size)
+        self._seconds = array("q", [-1] * self._size)
+        self._counter = 0
+        # Heaviest source / destination addresses since the last report
+        self.sources = SpaceSaving(talker_capacity)
+        self.destinations = SpaceSaving(talker_capacity)
+
+    @staticmethod
+    def telegram_bit_times(telegram):
+        """
+        Estimates the bus time of a telegram, in bit times: idle gap, frame
+        and acknowledge. Home Assistant does not report repetitions.
+        """
+        payload = telegram.payload
+        if isinstance(payload, list):
+            length = len(payload)
+        elif isinstance(payload, int) or telegram.telegramtype == "GroupValueRead":
+            length = 0
+        else:
+            length = 2 # Unknown payload; assume a typical 2-byte sensor value
+        return FRAME_GAP_BITS + (FRAME_BASE_CHARS + length) * CHAR_BITS + ACK_BITS
+
+    def process_event(self, event, now=None):
+        """Counts one knx_event dict; see process_telegram()."""
+        self.process_telegram(KnxTelegram.from_event(event), now)
+
+    def process_telegram(self, telegram, now=None):
+        """Counts one telegram in the bucket for the current second."""
+        source = telegram.source
+        if source:
+            self.sources.add(source)
+        destination = telegram.destination
+        if destination:
+            self.destinations.add(destination)
+        bits = self.telegram_bit_times(telegram)
+
+        second = int(self._clock() if now is None else now)
+        idx = second % self._size
+        if self._seconds[idx] != second:
+            self._seconds[idx] = second
+            self._counts[idx] = 0
+            self._bits[idx] = 0
+        self._counts[idx] += 1
+        self._bits[idx] += bits
+        self._counter += 1
+
+    def get_and_reset(self):
+        """Returns the count since the last call and resets it to zero."""
+        count = self._counter
         self._counter = 0
-        self._lock = asyncio.Lock()
-
-    async def process_event(self, event):
-        """Increments the telegram counter."""
-        async with self._lock:
-            self._counter += 1
-
-    async def get_and_reset(self):
-        """Returns the current count and resets it to zero."""
-        async with self._lock:
-            count = self._counter
-            self._counter = 0
         return count
+
+    def _completed(self, buckets, now):
+        """Per-second values for the last `window` complete seconds, newest first."""
+        current = int(self._clock() if now is None else now)
+        values = []
+        for second in range(current - 1, current - 1 - self.window, -1):
+            idx = second % self._size
+            values.append(buckets[idx] if self._seconds[idx] == second else 0)
+        return values
+
+    def get_rates(self, now=None):
+        """
+        Returns telegrams/sec averaged over 1s, 10s and the full window, plus
+        the peak second and the p95/p99 of per-second counts in the window.
+        Utilisation is the share of TP1 line capacity used, in percent, for the
+        last second, the window average and the busiest second; seconds above
+        alarm_threshold are counted in overload_seconds.
+        """
+        counts = self._completed(self._counts, now)
+        bits = self._completed(self._bits, now)
+        ordered = sorted(counts)
+        peak_bits = max(bits)
+        alarm_bits = self.alarm_threshold / 100 * TP1_BIT_RATE
+        return {
+            "rate_1s": float(counts[0]),
+            "rate_10s": sum(counts[:10]) / min(10, self.window),
+            "rate_60s": sum(counts) / self.window,
+            "peak_per_sec": ordered[-1],
+            "p95_per_sec": self._percentile(ordered, 95),
+            "p99_per_sec": self._percentile(ordered, 99),
+            "utilisation_1s_pct": bits[0] / TP1_BIT_RATE * 100,
+            "utilisation_60s_pct": sum(bits) / (TP1_BIT_RATE * self.window) * 100,
+            "peak_utilisation_pct": peak_bits / TP1_BIT_RATE * 100,
+            "overload_seconds": sum(1 for b in bits if b > alarm_bits)
+        }
+
+    def get_top_talkers(self, n=10):
+        """
+        Returns the top n source and destination addresses since the last
+        call as {"source": [(address, count, error)], "destination": [...]}
+        and starts a new reporting period.
+        """
+        talkers = {
+            "source": self.sources.top(n),
+            "destination": self.destinations.top(n)
+        }
+        self.sources.reset()
+        self.destinations.reset()
+        return talkers
+
+    @staticmethod
+    def _percentile(ordered, pct):
+        """Nearest-rank percentile of an ascending list."""
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return ordered[rank - 1]
@@ -0,0 +1,328 @@
+import argparse
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from knx_sentinel.telegram import KnxTelegram
+
+_LOGGER = logging.getLogger(__name__)
+
+# Segment layout (little endian):
+#   header: magic, version, base time (unix seconds)
+#   records: length byte followed by the record body; the first body byte
+#   is the tag.
+#     DEFINE    tag, id H, utf-8 string. Assigns an id to an address or
+#               telegram type; ids are per segment so segments stand alone.
+#     TELEGRAM  tag, ms since base I, destination H, source H, type H,
+#               flags B, payload length B, payload, value
+#               flags: bits 0-2 value kind, bit 3 unused, bit 4 outgoing,
+#               bit 5 payload is a single int. Payload length 0xFF is None.
+MAGIC = b"KNXC"
+VERSION = 1
+HEADER = struct.Struct("<4sHd")
+DEFINE = struct.Struct("<BH")
+TELEGRAM = struct.Struct("<BIHHHBB")
+SEGMENT_SUFFIX = ".knxcap"
+
+TAG_DEFINE = 0
+TAG_TELEGRAM = 1
+
+VALUE_NONE = 0
+VALUE_FLOAT = 1
+VALUE_INT = 2
+VALUE_FALSE = 3
+VALUE_TRUE = 4
+VALUE_JSON = 5
+
+FLAG_OUTGOING = 16
+FLAG_INT_PAYLOAD = 32
+NO_PAYLOAD = 0xFF
+
+FLOAT = struct.Struct("<d")
+INT = struct.Struct("<q")
+MAX_RECORD = 255
+MAX_OFFSET_MS = 2**32 - 1
+
+class CaptureWriter:
+    """
+    Records telegrams to rotating binary segments for offline replay.
+
+    Addresses and telegram types are dictionary-encoded per segment, so a
+    typical telegram takes about 25 bytes instead of ~350 bytes of JSON.
+    Segments rotate at segment_bytes and the oldest are deleted beyond
+    quota_bytes. Writes are buffered and flushed at least every
+    flush_interval seconds.
+    """
+    def __init__(self, directory, segment_bytes=16 * 2**20, quota_bytes=512 * 2**20,
+                 flush_interval=1.0, clock=time.time):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.quota_bytes = quota_bytes
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self.written = 0
+        self._file = None
+        self._size = 0
+        self._base = 0.0
+        self._ids = {}
+        self._last_flush = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+
+    def _rotate(self, now):
+        self.close()
+        segments = self._segments()
+        seq = int(segments[-1][:-len(SEGMENT_SUFFIX)]) + 1 if segments else 1
+        self._file = open(os.path.join(self.directory, f"{seq:012d}{SEGMENT_SUFFIX}"), "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, now))
+        self._size = HEADER.size
+        self._base = now
+        self._ids = {}
+        self._last_flush = now
+        self._enforce_quota()
+
+    def _enforce_quota(self):
+        segments = self._segments()
+        total = sum(os.path.getsize(os.path.join(self.directory, name)) for name in segments)
+        # Never delete the active (newest) segment
+        for name in segments[:-1]:
+            if total <= self.quota_bytes:
+                break
+            path = os.path.join(self.directory, name)
+            total -= os.path.getsize(path)
+            os.remove(path)
+            _LOGGER.info(f"Capture quota reached, deleted {name}")
+
+    def _id(self, text, out):
+        """Returns the id of text in this segment, defining it if new."""
+        ids = self._ids
+        key = ids.get(text)
+        if key is None:
+            key = len(ids)
+            encoded = text.encode("utf-8")[:MAX_RECORD - DEFINE.size]
+            out += bytes((DEFINE.size + len(encoded),)) + DEFINE.pack(TAG_DEFINE, key) + encoded
+            ids[text] = key
+        return key
+
+    def write(self, telegram, now=None):
+        """Appends one telegram (KnxTelegram or equivalent) to the capture."""
+        if now is None:
+            now = self._clock()
+        if self._file is None or self._size >= self.segment_bytes \
+                or (now - self._base) * 1000 > MAX_OFFSET_MS or len(self._ids) > 0xFFFD:
+            self._rotate(now)
+
+        out = bytearray()
+        destination = self._id(telegram.destination or "", out)
+        source = self._id(telegram.source or "", out)
+        telegramtype = self._id(telegram.telegramtype or "", out)
+
+        flags = 0
+        if telegram.direction == "Outgoing":
+            flags |= FLAG_OUTGOING
+
+        payload = telegram.payload
+        if payload is None:
+            payload_bytes = b""
+            payload_length = NO_PAYLOAD
+        elif isinstance(payload, int):
+            flags |= FLAG_INT_PAYLOAD
+            payload_bytes = bytes((payload & 0xFF,))
+            payload_length = 1
+        else:
+            try:
+                payload_bytes = bytes(payload[:64])
+            except (TypeError, ValueError):
+                payload_bytes = b""
+            payload_length = len(payload_bytes)
+
+        value = telegram.value
+        if value is None:
+            value_bytes = b""
+        elif value is True:
+            flags |= VALUE_TRUE
+            value_bytes = b""
+        elif value is False:
+            flags |= VALUE_FALSE
+            value_bytes = b""
+        elif isinstance(value, float):
+            flags |= VALUE_FLOAT
+            value_bytes = FLOAT.pack(value)
+        elif isinstance(value, int) and -2**63 <= value < 2**63:
+            flags |= VALUE_INT
+            value_bytes = INT.pack(value)
+        else:
+            value_bytes = json.dumps(value, separators=(",", ":")).encode("utf-8")
+            flags |= VALUE_JSON
+            if TELEGRAM.size + len(payload_bytes) + len(value_bytes) > MAX_RECORD:
+                flags &= ~VALUE_JSON
+                value_bytes = b""
+
+        offset = max(0, int((now - self._base) * 1000))
+        body_size = TELEGRAM.size + len(payload_bytes) + len(value_bytes)
+        out += bytes((body_size,))
+        out += TELEGRAM.pack(TAG_TELEGRAM, offset, destination, source, telegramtype, flags, payload_length)
+        out += payload_bytes
+        out += value_bytes
+
+        self._file.write(out)
+        self._size += len(out)
+        self.written += 1
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def capture_segments(path):
+    """Segment files of a capture directory in order, or [path] for a file."""
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith(SEGMENT_SUFFIX)]
+    return [path]
+
+def iter_segment(path):
+    """
+    Yields (timestamp, telegram) for every telegram in one segment, read
+    through mmap. A torn record at the tail is ignored.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, base = HEADER.unpack_from(mm)
+            if magic != MAGIC or version != VERSION:
+                _LOGGER.warning(f"Ignoring incompatible capture segment {path}")
+                return
+
+            names = []
+            unpack_telegram = TELEGRAM.unpack_from
+            unpack_float = FLOAT.unpack_from
+            unpack_int = INT.unpack_from
+            offset = HEADER.size
+            end = len(mm)
+            while offset < end:
+                length = mm[offset]
+                start = offset + 1
+                offset = start + length
+                if offset > end:
+                    break
+                if mm[start] == TAG_DEFINE:
+                    names.append(mm[start + DEFINE.size:offset].decode("utf-8") or None)
+                    continue
+
+                _, ms, dst, src, typ, flags, payload_length = unpack_telegram(mm, start)
+                pos = start + TELEGRAM.size
+                if payload_length == NO_PAYLOAD:
+                    payload = None
+                elif flags & FLAG_INT_PAYLOAD:
+                    payload = mm[pos]
+                    pos += 1
+                else:
+                    payload = list(mm[pos:pos + payload_length])
+                    pos += payload_length
+
+                kind = flags & 7
+                if kind == VALUE_FLOAT:
+                    value = unpack_float(mm, pos)[0]
+                elif kind == VALUE_NONE:
+                    value = None
+                elif kind == VALUE_INT:
+                    value = unpack_int(mm, pos)[0]
+                elif kind == VALUE_TRUE:
+                    value = True
+                elif kind == VALUE_FALSE:
+                    value = False
+                else:
+                    value = json.loads(mm[pos:offset])
+
+                yield base + ms / 1000, KnxTelegram(
+                    names[dst],
+                    names[src],
+                    value,
+                    payload,
+                    names[typ],
+                    "Outgoing" if flags & FLAG_OUTGOING else "Incoming"
+                )
+
+def read_capture(path):
+    """Yields (timestamp, telegram) for a capture file or directory."""
+    for segment in capture_segments(path):
+        yield from iter_segment(segment)
+
+async def replay_capture(path, handler, speed=0.0, on_time=None):
+    """
+    Feeds a capture to an async handler(telegram). With speed 0 telegrams are
+    replayed as fast as possible, otherwise at `speed` times wall-clock time.
+    on_time(timestamp) is called before each telegram so replay clocks can
+    follow the recorded time. Returns the number of replayed telegrams.
+    """
+    count = 0
+    first = None
+    started = time.monotonic()
+    for timestamp, telegram in read_capture(path):
+        if first is None:
+            first = timestamp
+        if speed:
+            delay = (timestamp - first) / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if on_time is not None:
+            on_time(timestamp)
+        await handler(telegram)
+        count += 1
+    return count
+
+class _ReplayEgress:
+    """Logs and counts what the pipeline would have sent."""
+    def __init__(self):
+        self.anomalies = 0
+
+    async def send_metric(self, measurement, tags, fields, timestamp=None):
+        self.anomalies += 1
+        _LOGGER.info(f"{measurement} {tags.get('entity_id')} {tags.get('subtype')}: {fields}")
+
+async def _replay_main(args):
+    from knx_sentinel.anomaly_engine import AnomalyEngine
+    from knx_sentinel.bus_monitor import BusLoadMonitor
+    from knx_sentinel.pipeline import EventPipeline
+
+    clock = [0.0]
+    bus_monitor = BusLoadMonitor(clock=lambda: clock[0])
+    engine = AnomalyEngine({})
+    egress = _ReplayEgress()
+    pipeline = EventPipeline(bus_monitor, engine, egress, {"site_id": "replay"})
+
+    def on_time(timestamp):
+        clock[0] = timestamp
+
+    start = time.perf_counter()
+    count = await replay_capture(args.path, pipeline.handle_telegram, args.speed, on_time)
+    elapsed = time.perf_counter() - start
+    _LOGGER.info(f"Replayed {count} telegrams in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f}/s), "
+                 f"{egress.anomalies} anomalies")
+    if count:
+        _LOGGER.info(f"Bus load at end of capture: {bus_monitor.get_rates(clock[0] + 1)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a KNX Sentinel telegram capture.")
+    parser.add_argument("path", help="capture directory or segment file")
+    parser.add_argument("--speed", type=float, default=0.0, help="N x wall-clock speed, 0 = as fast as possible")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+    asyncio.run(_replay_main(args))
+
+if __name__ == "__main__":
+    main()
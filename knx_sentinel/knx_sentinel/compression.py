@@ -0,0 +1,156 @@
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+class DeadbandFilter:
+    """
+    Forwards a value when it differs from the last forwarded one by more than
+    `deviation` (absolute) or `deviation_pct` percent of it. The consumer
+    reconstructs a step curve that holds each value until the next one.
+    """
+    __slots__ = ("deviation", "deviation_pct", "max_interval", "last", "last_time")
+
+    def __init__(self, deviation=0.0, deviation_pct=0.0, max_interval=0.0):
+        self.deviation = deviation
+        self.deviation_pct = deviation_pct
+        self.max_interval = max_interval
+        self.last = None
+        self.last_time = 0.0
+
+    def offer(self, timestamp, value):
+        """Returns the [(timestamp, value)] points to forward."""
+        last = self.last
+        if last is not None:
+            limit = max(self.deviation, abs(last) * self.deviation_pct / 100)
+            if abs(value - last) <= limit and not (
+                    self.max_interval and timestamp - self.last_time >= self.max_interval):
+                return []
+        self.last = value
+        self.last_time = timestamp
+        return [(timestamp, value)]
+
+class SwingingDoorFilter:
+    """
+    Swinging-door trending: forwards only the points needed so that linear
+    interpolation between them stays within `deviation` of every value.
+
+    From the last archived point, the doors narrow the range of slopes that
+    keep all later values within the band. A new value is held as long as
+    the line to it lies between the doors; otherwise the held value is
+    archived and the doors restart from it. The newest value is therefore
+    only forwarded once the trend changes (or after max_interval), which is
+    what makes cyclic resends of a flat signal free.
+    """
+    __slots__ = ("deviation", "deviation_pct", "max_interval", "archived", "held", "low", "high")
+
+    def __init__(self, deviation=0.0, deviation_pct=0.0, max_interval=0.0):
+        self.deviation = deviation
+        self.deviation_pct = deviation_pct
+        self.max_interval = max_interval
+        self.archived = None # (timestamp, value) last forwarded
+        self.held = None # (timestamp, value) newest not yet forwarded
+        self.low = float("-inf")
+        self.high = float("inf")
+
+    def offer(self, timestamp, value):
+        """Returns the [(timestamp, value)] points to forward, oldest first."""
+        archived = self.archived
+        if archived is None or (self.max_interval and timestamp - archived[0] >= self.max_interval):
+            points = [self.held] if self.held is not None else []
+            points.append((timestamp, value))
+            self.archived = (timestamp, value)
+            self.held = None
+            self.low = float("-inf")
+            self.high = float("inf")
+            return points
+
+        t0, v0 = archived
+        dt = timestamp - t0
+        if dt <= 0:
+            return [] # Same instant as the archived point
+
+        points = []
+        slope = (value - v0) / dt
+        if not self.low <= slope <= self.high:
+            # The line to this value would leave the band for an earlier
+            # one: archive the held value and restart the doors from it
+            points.append(self.held)
+            t0, v0 = self.archived = self.held
+            dt = timestamp - t0
+            self.low = float("-inf")
+            self.high = float("inf")
+
+        deviation = max(self.deviation, abs(v0) * self.deviation_pct / 100)
+        self.low = max(self.low, (value - v0 - deviation) / dt)
+        self.high = min(self.high, (value - v0 + deviation) / dt)
+        self.held = (timestamp, value)
+        return points
+
+COMPRESSORS = {
+    "deadband": DeadbandFilter,
+    "swinging_door": SwingingDoorFilter
+}
+
+class ValueCompressor:
+    """
+    Raw value egress with per-entity compression.
+
+    Every numeric value that passes its entity's filter is sent as a
+    `value` field to `measurement`. The filter is chosen once per route from
+    the sensor profile keys `compression` (deadband, swinging_door or none),
+    `deviation` and `deviation_pct`, falling back to `defaults`, and kept on
+    the route so it is dropped together with it.
+    """
+    def __init__(self, egress, defaults=None, measurement="knx_raw_values", clock=time.time):
+        self.egress = egress
+        self.defaults = defaults or {}
+        self.measurement = measurement
+        self._clock = clock
+        self.received = 0
+        self.forwarded = 0
+
+    def create_filter(self, profile):
+        """Builds the filter for a profile, or None to forward every value."""
+        defaults = self.defaults
+        method = profile.get("compression", defaults.get("compression", "swinging_door"))
+        if method == "none":
+            return None
+        filter_class = COMPRESSORS.get(method)
+        if filter_class is None:
+            _LOGGER.warning(f"Unknown compression '{method}', forwarding all values")
+            return None
+        return filter_class(
+            float(profile.get("deviation", defaults.get("deviation", 0.0))),
+            float(profile.get("deviation_pct", defaults.get("deviation_pct", 0.0))),
+            float(defaults.get("max_interval", 0.0))
+        )
+
+    async def add(self, route, value, now=None):
+        """Feeds one value of a routed entity through its filter."""
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            return
+        self.received += 1
+        if now is None:
+            now = self._clock()
+
+        value_filter = route.value_filter
+        if value_filter is None:
+            value_filter = route.value_filter = self.create_filter(route.state.profile) or False
+        if value_filter is False:
+            points = ((now, value),)
+        else:
+            points = value_filter.offer(now, value)
+
+        for timestamp, point in points:
+            self.forwarded += 1
+            await self.egress.send_metric(self.measurement, route.value_tags,
+                                          {"value": point}, int(timestamp * 1e9))
+
+    def get_stats(self):
+        return {
+            "values_received": self.received,
+            "values_forwarded": self.forwarded
+        }
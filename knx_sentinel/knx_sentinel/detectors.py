@@ -0,0 +1,321 @@
+import logging
+import math
+from knx_sentinel.math_kernel import MathKernel, RollingRegression
+
+_LOGGER = logging.getLogger(__name__)
+
+# method name -> detector class
+DETECTORS = {}
+
+def register_detector(name):
+    """
+    Class decorator that registers a detector under a profile method name.
+
+    A detector class is instantiated once per sensor with the sensor's profile,
+    so parameters are read at registration and not on every value. Instances
+    are called as detector(entity_id, value, state) and return an anomaly dict
+    or None. Set uses_window = True to have the engine keep a RollingStats
+    window in state.stats. Detectors with internal state may implement
+    get_state() -> tuple of floats and set_state(values) to survive restarts.
+    """
+    def decorator(cls):
+        DETECTORS[name] = cls
+        return cls
+    return decorator
+
+def resolve_detector(profile):
+    """Returns a detector bound to the profile, or None if the method is unknown."""
+    method = profile.get("method", "z_score")
+    detector_cls = DETECTORS.get(method)
+    if detector_cls is None:
+        _LOGGER.warning(f"No detector registered for method '{method}'")
+        return None
+    return detector_cls(profile)
+
+@register_detector("z_score")
+class ZScoreDetector:
+    """Flags values more than `threshold` standard deviations from the window mean."""
+    __slots__ = ("threshold", "min_samples")
+    uses_window = True
+
+    def __init__(self, profile):
+        self.threshold = profile.get("threshold", 3.0)
+        self.min_samples = profile.get("min_samples", 30)
+
+    def __call__(self, entity_id, value, state):
+        stats = state.stats
+        if len(stats) < self.min_samples:
+            return None # Insufficient data
+
+        std_dev = stats.std_dev
+        if std_dev == 0:
+            return None
+
+        z_score = MathKernel.calculate_z_score(value, stats.mean, std_dev)
+        threshold = self.threshold
+
+        if abs(z_score) > threshold:
+            _LOGGER.warning(f"Anomaly detected for {entity_id}: Value={value}, Z-Score={z_score:.2f}")
+            return {
+                "type": "anomaly",
+                "subtype": "z_score",
+                "entity_id": entity_id,
+                "value": value,
+                "z_score": z_score,
+                "threshold": threshold
+            }
+        return None
+
+@register_detector("solar_check")
+class SolarCheckDetector:
+    """
+    Keeps the latest lux value for the scheduled solar check (SolarMonitor);
+    nothing is evaluated per value.
+    """
+    __slots__ = ("lux",)
+    uses_window = False
+
+    def __init__(self, profile):
+        self.lux = None
+
+    def __call__(self, entity_id, value, state):
+        self.lux = value
+        return None
+
+@register_detector("trend")
+class TrendDetector:
+    """
+    Flags sustained drift: the least-squares slope over the last `window`
+    values, against their arrival times, exceeds `max_slope` units per
+    hour by more than `confidence` standard errors, so noise on a short
+    or flat stretch does not count as a trend. Values must cover at least
+    `min_span` seconds. Reported once per drift; re-armed when the slope
+    falls back below the limit.
+
+    Values closer than min_span / (window - 1) seconds to the previous
+    regression point are skipped, so the window can always span min_span
+    however fast the sensor sends.
+    """
+    __slots__ = ("max_slope", "min_span", "confidence", "spacing", "next_at", "regression", "drifting")
+    uses_window = False
+
+    def __init__(self, profile):
+        self.max_slope = profile.get("max_slope", profile.get("threshold", 0.5))
+        self.min_span = profile.get("min_span", 1800)
+        self.confidence = profile.get("confidence", 2.0)
+        window = max(3, int(profile.get("window", 60)))
+        self.spacing = self.min_span / (window - 1)
+        self.next_at = float("-inf")
+        self.regression = RollingRegression(window)
+        self.drifting = False
+
+    def __call__(self, entity_id, value, state):
+        now = state.last_seen
+        if now < self.next_at:
+            return None
+        self.next_at = now + self.spacing
+        regression = self.regression
+        regression.push(now, value)
+        if regression.span < self.min_span:
+            return None
+
+        slope = regression.slope * 3600
+        if abs(slope) <= self.max_slope:
+            self.drifting = False
+            return None
+        if self.drifting or abs(slope) - self.confidence * regression.slope_stderr * 3600 <= self.max_slope:
+            return None
+        self.drifting = True
+
+        direction = "rising" if slope > 0 else "falling"
+        _LOGGER.warning(f"Trend ({direction}) detected for {entity_id}: {slope:+.2f}/h, Value={value}")
+        return {
+            "type": "anomaly",
+            "subtype": f"trend_{direction}",
+            "entity_id": entity_id,
+            "value": value,
+            "score": slope,
+            "threshold": self.max_slope
+        }
+
+@register_detector("range")
+class RangeDetector:
+    """Flags values outside the fixed [min, max] band."""
+    __slots__ = ("min_val", "max_val")
+    uses_window = False
+
+    def __init__(self, profile):
+        self.min_val = profile.get("min")
+        self.max_val = profile.get("max")
+
+    def __call__(self, entity_id, value, state):
+        min_val = self.min_val
+        max_val = self.max_val
+
+        if min_val is not None and value < min_val:
+            return {
+                "type": "anomaly",
+                "subtype": "range_low",
+                "entity_id": entity_id,
+                "value": value,
+                "limit": min_val
+            }
+
+        if max_val is not None and value > max_val:
+            return {
+                "type": "anomaly",
+                "subtype": "range_high",
+                "entity_id": entity_id,
+                "value": value,
+                "limit": max_val
+            }
+
+        return None
+
+class BaselineDetector:
+    """
+    Base for control-chart detectors.
+
+    The first `warmup` values estimate the in-control mean and standard
+    deviation (Welford, O(1) state). Subclasses then score each value against
+    that frozen baseline and re-learn it after raising an anomaly.
+    """
+    __slots__ = ("warmup", "n", "mean", "_m2", "sigma")
+    uses_window = False
+
+    def __init__(self, profile):
+        self.warmup = profile.get("warmup", 30)
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.sigma = 0.0
+
+    def get_state(self):
+        return (self.n, self.mean, self._m2, self.sigma)
+
+    def set_state(self, values):
+        self.n = int(values[0])
+        self.mean, self._m2, self.sigma = values[1:4]
+
+    def _learn(self, value):
+        """Feeds the baseline. Returns True once the baseline is usable."""
+        if self.n >= self.warmup and self.sigma > 0:
+            return True
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+        if self.n >= self.warmup:
+            self.sigma = math.sqrt(self._m2 / self.n)
+            self._on_baseline()
+        return False
+
+    def _on_baseline(self):
+        pass
+
+@register_detector("ewma")
+class EwmaDetector(BaselineDetector):
+    """
+    EWMA control chart.
+
+    Tracks z = alpha * x + (1 - alpha) * z and flags when it leaves
+    mean +/- threshold * sigma * sqrt(alpha / (2 - alpha)). Small alpha
+    averages out noise so slow, sustained shifts stand out.
+    """
+    __slots__ = ("alpha", "threshold", "ewma", "_limit")
+
+    def __init__(self, profile):
+        self.alpha = profile.get("alpha", 0.1)
+        self.threshold = profile.get("threshold", 3.0)
+        self.ewma = 0.0
+        self._limit = 0.0
+        super().__init__(profile)
+
+    def get_state(self):
+        return super().get_state() + (self.ewma,)
+
+    def set_state(self, values):
+        super().set_state(values)
+        self.ewma = values[4]
+        self._limit = self.threshold * self.sigma * math.sqrt(self.alpha / (2 - self.alpha))
+
+    def _on_baseline(self):
+        self.ewma = self.mean
+        self._limit = self.threshold * self.sigma * math.sqrt(self.alpha / (2 - self.alpha))
+
+    def __call__(self, entity_id, value, state):
+        if not self._learn(value):
+            return None
+
+        ewma = self.ewma = self.alpha * value + (1 - self.alpha) * self.ewma
+        deviation = ewma - self.mean
+        if abs(deviation) <= self._limit:
+            return None
+
+        _LOGGER.warning(f"EWMA drift detected for {entity_id}: EWMA={ewma:.2f}, Baseline={self.mean:.2f}")
+        anomaly = {
+            "type": "anomaly",
+            "subtype": "ewma",
+            "entity_id": entity_id,
+            "value": value,
+            "score": deviation / self._limit * self.threshold,
+            "threshold": self.threshold,
+            "ewma": ewma,
+            "baseline": self.mean
+        }
+        self.reset()
+        return anomaly
+
+@register_detector("cusum")
+class CusumDetector(BaselineDetector):
+    """
+    Two-sided tabular CUSUM on standardised values.
+
+    `k` is the slack and `h` the decision interval, both in units of sigma.
+    """
+    __slots__ = ("k", "h", "s_pos", "s_neg")
+
+    def __init__(self, profile):
+        self.k = profile.get("k", 0.5)
+        self.h = profile.get("h", profile.get("threshold", 5.0))
+        self.s_pos = 0.0
+        self.s_neg = 0.0
+        super().__init__(profile)
+
+    def get_state(self):
+        return super().get_state() + (self.s_pos, self.s_neg)
+
+    def set_state(self, values):
+        super().set_state(values)
+        self.s_pos, self.s_neg = values[4:6]
+
+    def _on_baseline(self):
+        self.s_pos = 0.0
+        self.s_neg = 0.0
+
+    def __call__(self, entity_id, value, state):
+        if not self._learn(value):
+            return None
+
+        z = (value - self.mean) / self.sigma
+        self.s_pos = s_pos = max(0.0, self.s_pos + z - self.k)
+        self.s_neg = s_neg = max(0.0, self.s_neg - z - self.k)
+        if s_pos <= self.h and s_neg <= self.h:
+            return None
+
+        direction = "high" if s_pos > self.h else "low"
+        _LOGGER.warning(f"CUSUM shift ({direction}) detected for {entity_id}: Value={value}, Baseline={self.mean:.2f}")
+        anomaly = {
+            "type": "anomaly",
+            "subtype": f"cusum_{direction}",
+            "entity_id": entity_id,
+            "value": value,
+            "score": max(s_pos, s_neg),
+            "threshold": self.h,
+            "baseline": self.mean
+        }
+        self.reset()
+        return anomaly
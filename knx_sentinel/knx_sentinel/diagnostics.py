@@ -1,24 +1,53 @@
+import asyncio
 import logging
-from datetime import datetime, timezone
-from knx_sentinel.math_kernel import MathKernel
+import time
+from datetime import datetime
+from knx_sentinel.detectors import SolarCheckDetector
+from knx_sentinel.ha_client import HACommandError
+from knx_sentinel.math_kernel import SolarElevationCache
 
 _LOGGER = logging.getLogger(__name__)
 
 class DiagnosticsEngine:
-    def __init__(self, lat=0.0, lon=0.0):
+    """
+    Rule-based diagnostics for one site. Solar elevation comes from a
+    SolarElevationCache, so readings within `elevation_step` seconds share
+    one computation.
+    """
+    def __init__(self, lat=0.0, lon=0.0, elevation_step=60):
         self.lat = lat
         self.lon = lon
+        self.solar = SolarElevationCache(lat, lon, elevation_step)
+
+    def solar_elevation(self, timestamp=None):
+        """Elevation at a datetime or Unix timestamp (default: now)."""
+        if timestamp is None:
+            timestamp = time.time()
+        elif isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+        return self.solar.elevation(timestamp)
 
     def check_solar_sensor(self, entity_id, lux_value, timestamp=None):
         """
         Validates a light sensor against calculated solar elevation.
         Returns a fault dict if inconsistent.
         """
-        if timestamp is None:
-            timestamp = datetime.now(timezone.utc)
-            
-        elevation = MathKernel.calculate_solar_elevation(self.lat, self.lon, timestamp)
-        
+        return self._solar_fault(entity_id, lux_value, self.solar_elevation(timestamp))
+
+    def check_solar_sensors(self, readings, timestamp=None):
+        """
+        Validates many light sensors of the site at once against a single
+        elevation. `readings` maps entity_id to lux; returns the fault dicts.
+        """
+        elevation = self.solar_elevation(timestamp)
+        faults = []
+        for entity_id, lux_value in readings.items():
+            fault = self._solar_fault(entity_id, lux_value, elevation)
+            if fault:
+                faults.append(fault)
+        return faults
+
+    def _solar_fault(self, entity_id, lux_value, elevation):
         # Rule: If Sun is high (> 10 deg) and Lux is low (< 10), potential fault
         # (Assuming outdoor sensor, not obstructed)
         if elevation > 10.0 and lux_value < 10:
@@ -35,3 +64,99 @@ class DiagnosticsEngine:
     # Placeholder for HVAC test
     async def run_hvac_test(self, entity_id, ha_client):
         pass
+
+class SolarMonitor:
+    """
+    Scheduled solar_check diagnostics.
+
+    Sensors with the solar_check profile only keep their latest lux value on
+    the telegram path (SolarCheckDetector). Every `interval` seconds all of
+    them with a value younger than `max_age` seconds are checked against one
+    elevation, and faults are sent to knx_diagnostics in one batch.
+
+    Without a DiagnosticsEngine the site location is read from Home
+    Assistant's get_config on the first run.
+    """
+    def __init__(self, anomaly_engine, egress, common_tags, diagnostics=None, ha_client=None,
+                 interval=300, max_age=900):
+        self.anomaly_engine = anomaly_engine
+        self.egress = egress
+        self.common_tags = common_tags
+        self.diagnostics = diagnostics
+        self.ha_client = ha_client
+        self.interval = interval
+        self.max_age = max_age
+        self.checked = 0
+        self.faults = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _locate(self):
+        """Creates the DiagnosticsEngine at the Home Assistant home location."""
+        while self.diagnostics is None:
+            try:
+                config = await self.ha_client.call({"type": "get_config"})
+                self.diagnostics = DiagnosticsEngine(config["latitude"], config["longitude"])
+                _LOGGER.info(f"Solar check location: {config['latitude']}, {config['longitude']}")
+            except (HACommandError, ConnectionError, asyncio.TimeoutError, KeyError) as e:
+                _LOGGER.warning(f"Could not read the site location, retrying: {e}")
+                await asyncio.sleep(60)
+
+    async def _run(self):
+        await self._locate()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                _LOGGER.error(f"Solar check failed: {e}")
+
+    def readings(self, now=None):
+        """Latest lux value per solar_check sensor seen within max_age."""
+        if now is None:
+            now = time.monotonic()
+        oldest = now - self.max_age
+        return {
+            entity_id: state.detector.lux
+            for entity_id, state in self.anomaly_engine.sensors.items()
+            if isinstance(state.detector, SolarCheckDetector)
+            and state.detector.lux is not None and state.last_seen >= oldest
+        }
+
+    async def run_once(self, timestamp=None, now=None):
+        """Checks all current readings; returns the faults sent."""
+        readings = self.readings(now)
+        if not readings:
+            return []
+        faults = self.diagnostics.check_solar_sensors(readings, timestamp)
+        self.checked += len(readings)
+        self.faults += len(faults)
+        points = []
+        for fault in faults:
+            tags = self.common_tags.copy()
+            tags["entity_id"] = fault["entity_id"]
+            tags["type"] = fault["type"]
+            tags["subtype"] = fault["subtype"]
+            points.append(("knx_diagnostics", tags,
+                           {"lux": float(fault["lux"]), "elevation": fault["elevation"]}, None))
+        if points:
+            await self.egress.send_batch(points)
+        return faults
+
+    def get_stats(self):
+        return {
+            "solar_checked": self.checked,
+            "solar_faults": self.faults
+        }
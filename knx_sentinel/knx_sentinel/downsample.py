@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+class _Bucket:
+    """Running aggregate of one entity within the current interval."""
+    __slots__ = ("tags", "count", "min", "max", "sum", "last")
+
+    def __init__(self, tags, value):
+        self.tags = tags
+        self.count = 1
+        self.min = value
+        self.max = value
+        self.sum = value
+        self.last = value
+
+class Downsampler:
+    """
+    Aggregates raw sensor values into count/min/max/mean/last per entity and
+    interval.
+
+    add() is O(1) per value. At every interval boundary (aligned to the
+    epoch, e.g. whole minutes) all entities seen in the interval are written
+    with one egress.send_batch() call, timestamped at the interval start.
+    Entities without values in an interval produce no point. Intervals
+    advance by exactly `interval` per flush, so a timer that fires slightly
+    early never writes the same timestamp twice; they are only re-aligned
+    to the clock when it jumps by more than an interval.
+    """
+    def __init__(self, egress, interval=60, measurement="knx_values", clock=time.time):
+        self.egress = egress
+        self.interval = interval
+        self.measurement = measurement
+        self._clock = clock
+        self._buckets = {} # entity_id -> _Bucket
+        self._interval_start = self._align(clock())
+        self._task = None
+        self.flushed = 0
+
+    def _align(self, now):
+        return now - now % self.interval
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the timer and flushes the partial interval."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(max(0.0, self._interval_start + self.interval - self._clock()))
+            try:
+                await self.flush()
+            except Exception as e:
+                _LOGGER.error(f"Downsample flush failed: {e}")
+
+    def add(self, entity_id, tags, value):
+        """Adds a value for entity_id; non-numeric values are ignored."""
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            return
+        bucket = self._buckets.get(entity_id)
+        if bucket is None:
+            self._buckets[entity_id] = _Bucket(tags, value)
+            return
+        bucket.count += 1
+        if value < bucket.min:
+            bucket.min = value
+        elif value > bucket.max:
+            bucket.max = value
+        bucket.sum += value
+        bucket.last = value
+
+    async def flush(self):
+        """Writes the current interval as one batch and starts the next one."""
+        buckets = self._buckets
+        start = self._interval_start
+        timestamp = int(start * 1e9)
+        self._buckets = {}
+        next_start = start + self.interval
+        now = self._clock()
+        if not start <= now < next_start + self.interval:
+            # Clock step or a stalled loop
+            next_start = self._align(now)
+        self._interval_start = next_start
+        if not buckets:
+            return
+        measurement = self.measurement
+        points = [
+            (measurement, b.tags, {
+                "count": b.count,
+                "min": b.min,
+                "max": b.max,
+                "mean": b.sum / b.count,
+                "last": b.last
+            }, timestamp)
+            for b in buckets.values()
+        ]
+        await self.egress.send_batch(points)
+        self.flushed += len(points)
+        _LOGGER.debug(f"Downsampled {len(points)} entities")
+
+    def __len__(self):
+        """Number of entities with values in the current interval."""
+        return len(self._buckets)
@@ -1,6 +1,10 @@
 import abc
+import collections
+import email.utils
+import gzip
 import logging
 import json
+import struct
 import time
 import aiohttp
 import asyncio
@@ -8,16 +12,119 @@ import asyncio
 # For simplicity in this prototype, we'll use the standard client and loop.start() if available, 
 # or just run blocking publish in executor.
 import paho.mqtt.client as mqtt
+from knx_sentinel.mqtt_client import MQTTClient
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
 
 _LOGGER = logging.getLogger(__name__)
 
+PAYLOAD_ENCODINGS = ("json", "msgpack", "cbor")
+
+def _json_encode(obj):
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+def _cbor_head(major, value):
+    if value < 24:
+        return bytes((major << 5 | value,))
+    if value < 2**8:
+        return bytes((major << 5 | 24, value))
+    if value < 2**16:
+        return bytes((major << 5 | 25,)) + struct.pack(">H", value)
+    if value < 2**32:
+        return bytes((major << 5 | 26,)) + struct.pack(">I", value)
+    return bytes((major << 5 | 27,)) + struct.pack(">Q", value)
+
+def _cbor_encode(obj):
+    """RFC 8949 encoding of the JSON-like values used in metric payloads."""
+    if obj is None:
+        return b"\xf6"
+    if obj is True:
+        return b"\xf5"
+    if obj is False:
+        return b"\xf4"
+    if isinstance(obj, int):
+        return _cbor_head(0, obj) if obj >= 0 else _cbor_head(1, -1 - obj)
+    if isinstance(obj, float):
+        return b"\xfb" + struct.pack(">d", obj)
+    if isinstance(obj, str):
+        data = obj.encode("utf-8")
+        return _cbor_head(3, len(data)) + data
+    if isinstance(obj, bytes):
+        return _cbor_head(2, len(obj)) + obj
+    if isinstance(obj, (list, tuple)):
+        return _cbor_head(4, len(obj)) + b"".join(_cbor_encode(item) for item in obj)
+    if isinstance(obj, dict):
+        return _cbor_head(5, len(obj)) + b"".join(
+            _cbor_encode(key) + _cbor_encode(value) for key, value in obj.items())
+    raise TypeError(f"Cannot CBOR-encode {type(obj).__name__}")
+
+def get_payload_encoder(encoding):
+    """
+    Returns a function encoding a payload object to bytes, using the fastest
+    installed library: orjson for json, msgpack or msgspec for msgpack, and
+    cbor2 or a built-in encoder for cbor.
+    """
+    if encoding == "json":
+        return orjson.dumps if orjson else _json_encode
+    if encoding == "msgpack":
+        if msgpack is not None:
+            return msgpack.packb
+        if msgspec is not None:
+            return msgspec.msgpack.encode
+        raise ValueError("msgpack encoding requires the msgpack or msgspec package")
+    if encoding == "cbor":
+        return cbor2.dumps if cbor2 else _cbor_encode
+    raise ValueError(f"Unknown payload encoding: {encoding}")
+
 class EgressProvider(abc.ABC):
     @abc.abstractmethod
     async def send_metric(self, measurement, tags, fields, timestamp=None):
         pass
 
+    async def send_batch(self, points):
+        """
+        Sends many (measurement, tags, fields, timestamp) points at once.
+        Providers that can write a batch in one request override this.
+        """
+        for measurement, tags, fields, timestamp in points:
+            await self.send_metric(measurement, tags, fields, timestamp)
+
 class InfluxDBProvider(EgressProvider):
-    def __init__(self, host, token, org, bucket):
+    """
+    Buffered InfluxDB v2 writer.
+
+    Lines are collected in memory and written in one gzip-compressed POST when
+    batch_size lines are buffered or every flush_interval seconds, over a
+    persistent pooled session. 429/503 responses honour Retry-After. Batches
+    that cannot be delivered go to the DiskSpool if one is given, otherwise
+    they are kept for the next flush. The buffer never holds more than
+    max_buffer lines (oldest dropped), and a backlog is written in requests
+    of at most batch_size lines.
+
+    Once started, a full batch only wakes the flush loop, so send_metric()
+    never waits for the network; each request is bounded by `timeout`
+    seconds.
+    """
+    def __init__(self, host, token, org, bucket, batch_size=500, flush_interval=5.0,
+                 compress=True, max_buffer=50000, spool=None, timeout=10.0):
         self.host = host
         self.token = token
         self.org = org
@@ -27,15 +134,90 @@ class InfluxDBProvider(EgressProvider):
             "Authorization": f"Token {token}",
             "Content-Type": "text/plain; charset=utf-8"
         }
+        self.compress = compress
+        if compress:
+            self.headers["Content-Encoding"] = "gzip"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.spool = spool
+        self.timeout = timeout
+        self.session = None
+        self._buffer = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+        self._wakeup = asyncio.Event()
+        self._retry_at = 0.0
+        self.dropped = 0
+
+    async def start(self):
+        """Opens the pooled session and starts the interval flush loop."""
+        self._get_session()
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Flushes pending lines and closes the session."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self._retry_at = 0.0
+        await self.flush()
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=4, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(total=self.timeout, sock_connect=min(self.timeout, 5.0))
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                _LOGGER.error(f"InfluxDB flush failed: {e}")
 
     async def send_metric(self, measurement, tags, fields, timestamp=None):
-        """Sends data to InfluxDB using Line Protocol."""
+        """Buffers a metric as Line Protocol; flushes when the batch is full."""
         if timestamp is None:
             timestamp = time.time_ns()
-            
-        # Format Line Protocol
+        buffer = self._buffer
+        buffer.append(self._format_line(measurement, tags, fields, timestamp))
+        if len(buffer) > self.max_buffer:
+            self._trim()
+        if len(buffer) >= self.batch_size:
+            if self._flush_task is not None:
+                self._wakeup.set()
+            else:
+                await self.flush()
+
+    async def send_batch(self, points):
+        """Buffers all points and writes them with a single flush."""
+        format_line = self._format_line
+        now = time.time_ns()
+        self._buffer.extend(
+            format_line(measurement, tags, fields, now if timestamp is None else timestamp)
+            for measurement, tags, fields, timestamp in points
+        )
+        if len(self._buffer) > self.max_buffer:
+            self._trim()
+        await self.flush()
+
+    def _format_line(self, measurement, tags, fields, timestamp):
         # measurement,tag1=val1 field1=val1 timestamp
-        
         tag_str = ",".join([f"{self._escape_tag(k)}={self._escape_tag(str(v))}" for k, v in tags.items()])
         field_str = ",".join([f"{self._escape_tag(k)}={self._format_field(v)}" for k, v in fields.items()])
         
@@ -43,17 +225,93 @@ class InfluxDBProvider(EgressProvider):
         if tag_str:
             line += f",{tag_str}"
         line += f" {field_str} {timestamp}"
-        
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(self.url, data=line, headers=self.headers) as resp:
-                    if resp.status not in (200, 204):
-                        text = await resp.text()
-                        _LOGGER.error(f"InfluxDB Write Failed: {resp.status} - {text}")
-                    else:
-                        _LOGGER.debug(f"InfluxDB Write Success: {line}")
-            except Exception as e:
-                _LOGGER.error(f"InfluxDB Connection Error: {e}")
+        return line
+
+    async def flush(self):
+        """Writes all buffered lines, in requests of at most batch_size lines."""
+        async with self._flush_lock:
+            while self._buffer and time.monotonic() >= self._retry_at:
+                lines = self._buffer[:self.batch_size]
+                del self._buffer[:self.batch_size]
+                try:
+                    written = await self._write(lines)
+                except asyncio.CancelledError:
+                    # stop() cancelled the flush loop mid-write; its final flush retries
+                    self._requeue(lines)
+                    raise
+                if not written:
+                    self._park(lines)
+
+    async def _write(self, lines):
+        """
+        POSTs lines to the write API. Returns True if they were accepted or
+        permanently rejected, False if the write should be retried later.
+        """
+        body = "\n".join(lines).encode("utf-8")
+        if self.compress:
+            body = gzip.compress(body, compresslevel=6)
+
+        try:
+            async with self._get_session().post(self.url, data=body, headers=self.headers) as resp:
+                if resp.status in (200, 204):
+                    _LOGGER.debug(f"InfluxDB Write Success: {len(lines)} lines")
+                    return True
+                text = await resp.text()
+                if resp.status in (429, 503):
+                    delay = self._parse_retry_after(resp.headers.get("Retry-After"))
+                    _LOGGER.warning(f"InfluxDB throttled ({resp.status}), retrying in {delay:.0f}s")
+                    self._retry_at = time.monotonic() + delay
+                    return False
+                _LOGGER.error(f"InfluxDB Write Failed: {resp.status} - {text}")
+                if resp.status >= 500:
+                    self._retry_at = time.monotonic() + self.flush_interval
+                    return False
+                return True
+        except Exception as e:
+            _LOGGER.error(f"InfluxDB Connection Error: {e}")
+            self._retry_at = time.monotonic() + self.flush_interval
+            return False
+
+    async def replay_records(self, records):
+        """Writes spooled lines; returns False while the server is unavailable."""
+        if time.monotonic() < self._retry_at:
+            return False
+        return await self._write([r.decode("utf-8") for r in records])
+
+    def _park(self, lines):
+        """Keeps a failed batch: on disk if a spool is configured, else in memory."""
+        if self.spool is not None:
+            self.spool.append([line.encode("utf-8") for line in lines])
+        else:
+            self._requeue(lines)
+
+    def _requeue(self, lines):
+        """Puts a failed batch back in front of newer lines, bounded by max_buffer."""
+        self._buffer[:0] = lines
+        self._trim()
+
+    def _trim(self):
+        """Drops the oldest lines beyond max_buffer."""
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            self.dropped += overflow
+            _LOGGER.warning(f"InfluxDB buffer full, dropping {overflow} oldest lines")
+            del self._buffer[:overflow]
+
+    @staticmethod
+    def _parse_retry_after(value, default=10.0):
+        """Parses a Retry-After header (delta seconds or HTTP date)."""
+        if not value:
+            return default
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            return default
 
     def _escape_tag(self, value):
         return value.replace(" ", "\\ ").replace(",", "\\,").replace("=", "\\=")
@@ -66,34 +324,42 @@ class InfluxDBProvider(EgressProvider):
         return str(value)
 
 class MQTTProvider(EgressProvider):
-    def __init__(self, broker, port, topic_prefix, client_id="knx_sentinel"):
+    def __init__(self, broker, port, topic_prefix, client_id="knx_sentinel", spool=None):
         self.broker = broker
         self.port = port
         self.topic_prefix = topic_prefix
         self.client = mqtt.Client(client_id=client_id)
-        # In a real app, we'd handle connection loop properly
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.reconnect_delay_set(min_delay=1, max_delay=60)
+        # Follows the link state reported by paho's network thread
         self.connected = False
+        # Messages that cannot be published are spooled as b"topic\0payload"
+        self.spool = spool
         
     async def start(self):
-        # Run connect in executor to avoid blocking asyncio loop
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, self._connect)
+        # paho's network thread connects and keeps reconnecting with backoff
+        self.client.connect_async(self.broker, self.port, 60)
         self.client.loop_start()
 
-    def _connect(self):
-        try:
-            self.client.connect(self.broker, self.port, 60)
+    def _on_connect(self, client, userdata, flags, rc, *args):
+        if rc == 0:
             self.connected = True
             _LOGGER.info(f"Connected to MQTT Broker {self.broker}")
-        except Exception as e:
-            _LOGGER.error(f"MQTT Connection Error: {e}")
+        else:
+            _LOGGER.error(f"MQTT Connection Error: {rc}")
+
+    def _on_disconnect(self, client, userdata, rc, *args):
+        if self.connected:
+            _LOGGER.warning(f"Disconnected from MQTT Broker {self.broker}: {rc}")
+        self.connected = False
 
     async def stop(self):
         self.client.loop_stop()
         self.client.disconnect()
 
     async def send_metric(self, measurement, tags, fields, timestamp=None):
-        if not self.connected:
+        if not self.connected and self.spool is None:
             return
 
         if timestamp is None:
@@ -110,10 +376,286 @@ class MQTTProvider(EgressProvider):
         site_id = tags.get("site_id", "default")
         topic = f"{self.topic_prefix}/{site_id}/{measurement}"
         
+        message = json.dumps(payload)
+        if not self.connected:
+            self.spool.append([f"{topic}\0{message}".encode("utf-8")])
+            return
+
         # Publish is blocking in paho, but loop_start handles network loop. 
         # publish() returns an info object, it's non-blocking for queuing.
-        info = self.client.publish(topic, json.dumps(payload))
+        info = self.client.publish(topic, message)
         if info.rc != mqtt.MQTT_ERR_SUCCESS:
              _LOGGER.error(f"MQTT Publish Failed: {info.rc}")
+             if self.spool is not None:
+                 self.spool.append([f"{topic}\0{message}".encode("utf-8")])
         else:
              _LOGGER.debug(f"MQTT Publish Success: {topic}")
+
+    async def replay_records(self, records):
+        """Publishes spooled messages; returns False while disconnected."""
+        if not self.connected:
+            return False
+        for record in records:
+            topic, _, message = record.decode("utf-8").partition("\0")
+            info = self.client.publish(topic, message)
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                _LOGGER.error(f"MQTT Replay Failed: {info.rc}")
+                return False
+        return True
+
+class AsyncMQTTProvider(EgressProvider):
+    """
+    MQTT egress on the native asyncio MQTTClient.
+
+    send_metric() only encodes and queues; a sender task publishes with
+    pipelined QoS 1 (or QoS 0) and waits out reconnects. While disconnected,
+    messages go to the DiskSpool if one is given, otherwise up to max_buffer
+    are queued in memory (oldest dropped).
+
+    With batch_size > 0 metrics are packed into one message per site on
+    `{prefix}/{site_id}/batch` (a list of the usual payload objects) when
+    batch_size metrics are collected or every batch_interval seconds.
+    Payloads are encoded as json, msgpack or cbor.
+    """
+    def __init__(self, broker, port, topic_prefix, client_id="knx_sentinel", username=None,
+                 password=None, qos=1, encoding="json", batch_size=0, batch_interval=1.0,
+                 max_inflight=100, max_buffer=10000, spool=None):
+        self.topic_prefix = topic_prefix
+        self.qos = qos
+        try:
+            self.encode = get_payload_encoder(encoding)
+        except ValueError as e:
+            # An optional encoder package is missing; keep publishing
+            _LOGGER.error(f"{e}, falling back to json payloads")
+            encoding = "json"
+            self.encode = get_payload_encoder(encoding)
+        self.encoding = encoding
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_buffer = max_buffer
+        self.spool = spool
+        self.client = MQTTClient(broker, port, client_id, username, password, max_inflight=max_inflight)
+        self.dropped = 0
+        self.published = 0
+        self._queue = collections.deque()
+        self._ready = asyncio.Event()
+        self._batches = {} # topic -> [payload]
+        self._batched = 0
+        self._sender = None
+        self._sending = False
+        self._batch_task = None
+
+    @property
+    def connected(self):
+        return self.client.connected.is_set()
+
+    async def start(self):
+        await self.client.start()
+        self._sender = asyncio.create_task(self._send_loop())
+        if self.batch_size:
+            self._batch_task = asyncio.create_task(self._batch_loop())
+
+    async def stop(self, timeout=5.0):
+        """Publishes what is queued (up to timeout seconds) and disconnects."""
+        if self._batch_task:
+            self._batch_task.cancel()
+            self._batch_task = None
+        self._flush_batches()
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            _LOGGER.warning(f"MQTT stopped with {len(self._queue)} queued messages")
+        if self._sender:
+            self._sender.cancel()
+            try:
+                await self._sender
+            except asyncio.CancelledError:
+                pass
+            self._sender = None
+        await self.client.stop()
+
+    async def _drain(self):
+        while self._queue or self._sending or self.client.inflight:
+            await asyncio.sleep(0.01)
+
+    async def send_metric(self, measurement, tags, fields, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+        payload = {
+            "measurement": measurement,
+            "tags": tags,
+            "fields": fields,
+            "timestamp": timestamp
+        }
+        site_id = tags.get("site_id", "default")
+        if self.batch_size:
+            topic = f"{self.topic_prefix}/{site_id}/batch"
+            self._batches.setdefault(topic, []).append(payload)
+            self._batched += 1
+            if self._batched >= self.batch_size:
+                self._flush_batches()
+            return
+        self._enqueue(f"{self.topic_prefix}/{site_id}/{measurement}", self.encode(payload))
+
+    def _flush_batches(self):
+        batches = self._batches
+        self._batches = {}
+        self._batched = 0
+        for topic, payloads in batches.items():
+            self._enqueue(topic, self.encode(payloads))
+
+    async def _batch_loop(self):
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            self._flush_batches()
+
+    def _enqueue(self, topic, message):
+        if self.spool is not None and not self.connected:
+            self.spool.append([topic.encode("utf-8") + b"\0" + message])
+            return
+        queue = self._queue
+        queue.append((topic, message))
+        if len(queue) > self.max_buffer:
+            queue.popleft()
+            self.dropped += 1
+        self._ready.set()
+
+    async def _send_loop(self):
+        queue = self._queue
+        publish = self.client.publish
+        while True:
+            if not queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            topic, message = queue.popleft()
+            self._sending = True
+            await publish(topic, message, self.qos)
+            self._sending = False
+            self.published += 1
+
+    async def replay_records(self, records):
+        """Publishes spooled messages; returns False while disconnected."""
+        if not self.connected:
+            return False
+        for record in records:
+            topic, _, message = record.partition(b"\0")
+            await self.client.publish(topic.decode("utf-8"), message, self.qos)
+        return True
+
+    def get_stats(self):
+        return {
+            "published": self.published,
+            "acked": self.client.acked,
+            "dropped": self.dropped,
+            "queued": len(self._queue),
+            "inflight": self.client.inflight,
+            "connects": self.client.connects
+        }
+
+class FanoutEgress(EgressProvider):
+    """
+    Sends every metric to several providers concurrently.
+
+    Each sink has its own bounded queue and worker, so a slow or unreachable
+    sink only fills its own queue and never delays the others. When a queue
+    is full new metrics for that sink are dropped and counted. Batches from
+    send_batch() are queued as one item and passed on with send_batch().
+    """
+    def __init__(self, sinks, queue_size=10000):
+        self.sinks = sinks # name -> EgressProvider
+        self.queue_size = queue_size
+        self._queues = {}
+        self._workers = []
+        self._stats = {name: self._new_stats() for name in sinks}
+
+    @staticmethod
+    def _new_stats():
+        return {"queued": 0, "sent": 0, "dropped": 0, "errors": 0, "items": 0,
+                "latency_sum": 0.0, "latency_max": 0.0, "send_max": 0.0}
+
+    async def start(self):
+        """Starts one worker per sink; the sinks must already be started."""
+        for name, sink in self.sinks.items():
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            self._queues[name] = queue
+            self._workers.append(asyncio.create_task(self._worker(name, sink, queue)))
+
+    async def stop(self, timeout=5.0):
+        """Drains the queues (up to timeout seconds) and stops all sinks."""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues.values())), timeout)
+        except asyncio.TimeoutError:
+            _LOGGER.warning("Egress queues not drained on shutdown")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for sink in self.sinks.values():
+            if hasattr(sink, "stop"):
+                await sink.stop()
+
+    def _put(self, points):
+        item = (points, time.monotonic())
+        for name, queue in self._queues.items():
+            stats = self._stats[name]
+            try:
+                queue.put_nowait(item)
+                stats["queued"] += len(points)
+            except asyncio.QueueFull:
+                stats["dropped"] += len(points)
+
+    async def send_metric(self, measurement, tags, fields, timestamp=None):
+        self._put([(measurement, tags, fields, timestamp)])
+
+    async def send_batch(self, points):
+        if points:
+            self._put(points)
+
+    async def _worker(self, name, sink, queue):
+        stats = self._stats[name]
+        while True:
+            points, enqueued = await queue.get()
+            started = time.monotonic()
+            try:
+                if len(points) == 1:
+                    await sink.send_metric(*points[0])
+                else:
+                    await sink.send_batch(points)
+                stats["sent"] += len(points)
+            except Exception as e:
+                stats["errors"] += 1
+                _LOGGER.error(f"Egress sink {name} failed: {e}")
+            finally:
+                done = time.monotonic()
+                # Queue wait plus send time, per queued item
+                stats["latency_sum"] += done - enqueued
+                stats["latency_max"] = max(stats["latency_max"], done - enqueued)
+                stats["send_max"] = max(stats["send_max"], done - started)
+                stats["items"] += 1
+                queue.task_done()
+
+    def get_stats(self):
+        """
+        Returns {sink: counters} since the last call: queued, sent, dropped
+        and errors (metrics), queue depth, and the mean and max latency from
+        enqueue to delivery plus the slowest single send, in ms.
+        """
+        report = {}
+        for name in self.sinks:
+            stats = self._stats[name]
+            items = stats["items"]
+            queue = self._queues.get(name)
+            report[name] = {
+                "queued": stats["queued"],
+                "sent": stats["sent"],
+                "dropped": stats["dropped"],
+                "errors": stats["errors"],
+                "depth": queue.qsize() if queue else 0,
+                "latency_avg_ms": stats["latency_sum"] / items * 1000 if items else 0.0,
+                "latency_max_ms": stats["latency_max"] * 1000,
+                "send_max_ms": stats["send_max"] * 1000
+            }
+            stats.update(self._new_stats())
+        return report
@@ -1,14 +1,21 @@
 import asyncio
-import json
 import logging
 import os
 import aiohttp
 from aiohttp import ClientError, WSMsgType
+from knx_sentinel.telegram import FrameDecoder
 
 _LOGGER = logging.getLogger(__name__)
 
+OVERFLOW_POLICIES = ("block", "drop_oldest", "sample")
+
+class HACommandError(Exception):
+    """A WebSocket command was answered with success: false."""
+
 class HAWebSocketClient:
-    def __init__(self, supervisor_url="ws://supervisor/core/websocket", token=None):
+    def __init__(self, supervisor_url="ws://supervisor/core/websocket", token=None,
+                 queue_size=1000, workers=4, overflow_policy="block", sample_rate=10,
+                 subscription="knx_event", capture=None):
         self.url = supervisor_url
         self.token = token or os.getenv("SUPERVISOR_TOKEN")
         self.running = False
@@ -16,46 +23,141 @@ class HAWebSocketClient:
         self.ws = None
         self.event_callback = None
         self._reconnect_delay = 1
+        # "knx_event" only sees GAs registered as event types in the KNX
+        # integration; "telegrams" streams every telegram on the bus
+        self.subscription = subscription
+        self.decoder = FrameDecoder(subscription=subscription)
+        # Optional CaptureWriter; records telegrams before any queue drops
+        self.capture = capture
+        # Commands and event subscriptions besides the telegram stream
+        self.connected = asyncio.Event()
+        self._next_id = 0
+        self._telegram_id = None
+        self._pending = {} # message id -> Future for call()
+        self._event_subscriptions = [] # (event_type, callback), renewed on reconnect
+        self._event_handlers = {} # subscription id -> callback
+
+        # Ingest queue between the socket reader and the processing workers
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.queue_size = queue_size
+        self.num_workers = workers
+        self.overflow_policy = overflow_policy
+        self.sample_rate = sample_rate
+        self._queue = None
+        self._workers = []
+        self._sample_counter = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.processed = 0
+        self.peak_depth = 0
 
     def set_callback(self, callback):
-        """Sets the callback function for incoming KNX events."""
+        """Sets the callback function for incoming KNX telegrams (KnxTelegram)."""
         self.event_callback = callback
 
     async def start(self):
         """Starts the WebSocket client loop."""
         self.running = True
         self.session = aiohttp.ClientSession()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.num_workers)
+        ]
         _LOGGER.info(f"Starting HA WebSocket Client connecting to {self.url}")
         
         while self.running:
             try:
-                async with self.session.ws_connect(self.url) as ws:
+                # No frame size limit: registry and state lists of large
+                # installations exceed aiohttp's 4 MiB default
+                async with self.session.ws_connect(self.url, max_msg_size=0) as ws:
                     self.ws = ws
                     self._reconnect_delay = 1 # Reset delay on connection
                     _LOGGER.info("Connected to Home Assistant Core")
                     
                     await self._authenticate_and_subscribe()
+                    self.connected.set()
                     await self._listen()
                     
             except (ClientError, asyncio.TimeoutError, OSError) as err:
                 _LOGGER.warning(f"Connection failed: {err}")
             except Exception as e:
                 _LOGGER.error(f"Unexpected error: {e}", exc_info=True)
+            finally:
+                self._disconnected()
             
             if self.running:
                 _LOGGER.info(f"Reconnecting in {self._reconnect_delay}s...")
                 await asyncio.sleep(self._reconnect_delay)
                 self._reconnect_delay = min(self._reconnect_delay * 2, 60)
 
-    async def stop(self):
-        """Stops the client."""
+    async def stop(self, timeout=5.0):
+        """
+        Stops the client. Reading stops first; telegrams already queued are
+        processed for up to `timeout` seconds before the workers are cancelled.
+        """
         self.running = False
         if self.ws:
             await self.ws.close()
+        if self._queue is not None and self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                _LOGGER.warning(f"Dropping {self._queue.qsize()} queued telegrams on shutdown")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
         if self.session:
             await self.session.close()
+        self._disconnected()
         _LOGGER.info("HA WebSocket Client stopped")
 
+    def _disconnected(self):
+        self.connected.clear()
+        self._event_handlers.clear()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Home Assistant connection lost"))
+        self._pending.clear()
+
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    async def call(self, command, timeout=60):
+        """
+        Sends a command (e.g. {"type": "get_states"}) once connected and
+        returns its result. Raises HACommandError if Home Assistant rejects
+        it and ConnectionError if the connection drops first.
+        """
+        await asyncio.wait_for(self.connected.wait(), timeout)
+        msg_id = self._new_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+        try:
+            await self.ws.send_json({**command, "id": msg_id})
+            message = await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(msg_id, None)
+        if not message.get("success"):
+            raise HACommandError(f"{command.get('type')} failed: {message.get('error')}")
+        return message.get("result")
+
+    async def subscribe_events(self, event_type, callback):
+        """
+        Calls callback(event) for every Home Assistant event of event_type.
+        The subscription is renewed after reconnects.
+        """
+        self._event_subscriptions.append((event_type, callback))
+        if self.connected.is_set():
+            await self._send_subscription(event_type, callback)
+
+    async def _send_subscription(self, event_type, callback):
+        msg_id = self._new_id()
+        self._event_handlers[msg_id] = callback
+        await self.ws.send_json({"id": msg_id, "type": "subscribe_events", "event_type": event_type})
+
     async def _authenticate_and_subscribe(self):
         """Handles the auth handshake and subscription."""
         # Wait for auth_required
@@ -80,38 +182,138 @@ class HAWebSocketClient:
 
         _LOGGER.info("Authentication successful")
 
-        # Subscribe to knx_event
-        # We use a fixed ID for simplicity, or we could increment.
-        await self.ws.send_json({
-            "id": 1,
-            "type": "subscribe_events",
-            "event_type": "knx_event"
-        })
+        # Subscribe to knx_event or the KNX integration's telegram stream
+        self._telegram_id = self._new_id()
+        if self.subscription == "telegrams":
+            await self.ws.send_json({
+                "id": self._telegram_id,
+                "type": "knx/subscribe_telegrams"
+            })
+        else:
+            await self.ws.send_json({
+                "id": self._telegram_id,
+                "type": "subscribe_events",
+                "event_type": "knx_event"
+            })
         
         # Wait for subscription confirmation
         msg = await self.ws.receive_json()
         if not msg.get("success"):
              _LOGGER.error(f"Subscription failed: {msg}")
 
-        _LOGGER.info("Subscribed to knx_event")
+        _LOGGER.info(f"Subscribed to {self.subscription}")
+
+        for event_type, callback in self._event_subscriptions:
+            await self._send_subscription(event_type, callback)
+
+    def get_queue_stats(self):
+        """Returns ingest queue depth and counters; resets the peak depth."""
+        stats = {
+            "depth": self._queue.qsize() if self._queue else 0,
+            "peak_depth": self.peak_depth,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "processed": self.processed
+        }
+        self.peak_depth = 0
+        return stats
+
+    async def _enqueue(self, event):
+        """
+        Hands an event to the workers, applying the overflow policy when full:
+        block waits for space (pausing socket reads), drop_oldest discards the
+        oldest queued event, and sample keeps only every sample_rate-th event
+        once the queue is half full.
+        """
+        queue = self._queue
+        depth = queue.qsize()
+        policy = self.overflow_policy
+
+        if policy == "sample" and depth >= self.queue_size // 2:
+            self._sample_counter += 1
+            if self._sample_counter % self.sample_rate or depth >= self.queue_size:
+                self.dropped += 1
+                return
+        elif policy == "drop_oldest" and depth >= self.queue_size:
+            queue.get_nowait()
+            queue.task_done()
+            self.dropped += 1
+            depth -= 1
+
+        if policy == "block":
+            await queue.put(event)
+        else:
+            queue.put_nowait(event)
+        self.enqueued += 1
+        depth += 1
+        if depth > self.peak_depth:
+            self.peak_depth = depth
+
+    async def _worker(self):
+        """Processes queued events with the registered callback."""
+        queue = self._queue
+        while True:
+            event = await queue.get()
+            try:
+                if asyncio.iscoroutinefunction(self.event_callback):
+                    await self.event_callback(event)
+                else:
+                    self.event_callback(event)
+            except Exception as e:
+                _LOGGER.error(f"Error in event callback: {e}")
+            finally:
+                self.processed += 1
+                queue.task_done()
 
     async def _listen(self):
-        """Listens for incoming messages."""
+        """Listens for incoming messages and queues events for the workers."""
+        telegram_id = self._telegram_id
         async for msg in self.ws:
             if msg.type == WSMsgType.TEXT:
-                data = json.loads(msg.data)
-                if data.get("type") == "event":
-                    event = data.get("event", {})
-                    if self.event_callback:
-                        # Dispatch to callback (fire and forget or await?)
-                        # Ideally await if we want backpressure, or create task.
-                        # For a monitor, we probably want to process it.
-                        try:
-                            if asyncio.iscoroutinefunction(self.event_callback):
-                                await self.event_callback(event)
-                            else:
-                                self.event_callback(event)
-                        except Exception as e:
-                            _LOGGER.error(f"Error in event callback: {e}")
+                msg_type, msg_id, telegram, message = self.decoder.decode(msg.data)
+                if msg_type != "event":
+                    if msg_type == "result":
+                        self._handle_result(msg_id, message)
+                    continue
+                if msg_id != telegram_id:
+                    self._handle_event(msg_id, msg.data)
+                    continue
+                if self.capture is not None:
+                    try:
+                        self.capture.write(telegram)
+                    except Exception as e:
+                        self._disable_capture(e)
+                if self.event_callback:
+                    await self._enqueue(telegram)
             elif msg.type == WSMsgType.ERROR:
                 _LOGGER.error('WebSocket connection closed with exception %s', self.ws.exception())
+
+    def _disable_capture(self, error):
+        """
+        Stops capturing after a write error (e.g. a full /data) instead of
+        dropping the connection, which would lose the live stream too.
+        """
+        _LOGGER.error(f"Telegram capture failed, disabling it: {error}")
+        capture, self.capture = self.capture, None
+        try:
+            capture.close()
+        except Exception:
+            pass
+
+    def _handle_result(self, msg_id, message):
+        future = self._pending.get(msg_id)
+        if future is not None:
+            if not future.done():
+                future.set_result(message)
+        elif not message.get("success"):
+            _LOGGER.error(f"Command {msg_id} failed: {message.get('error')}")
+
+    def _handle_event(self, msg_id, raw):
+        """Dispatches an event of a subscription other than the telegram stream."""
+        callback = self._event_handlers.get(msg_id)
+        if callback is None:
+            return
+        try:
+            callback(self.decoder.loads(raw).get("event"))
+        except Exception as e:
+            _LOGGER.error(f"Error in event subscription callback: {e}")
@@ -1,6 +1,15 @@
 import math
+from array import array
 from datetime import datetime, timezone
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Julian Day of 1970-01-01T00:00Z
+UNIX_EPOCH_JD = 2440587.5
+
 class MathKernel:
     @staticmethod
     def calculate_mean(data):
@@ -64,73 +73,342 @@ class MathKernel:
         Returns:
             Elevation in degrees
         """
-        # 1. Calculate Julian Day (JD)
-        # Grena algorithm uses a simplified JD calculation valid for 2000-2050
-        # But we can use a standard one for robustness or the one from the prompt.
-        # Prompt formula: JD=367*Y-int(7*(Y+int((M+9)/12))/4)+int(275*M/9)+D+1721013.5+hour/24
-        
+        # Julian Day (JD), formula valid for 1901-2099:
+        # JD=367*Y-int(7*(Y+int((M+9)/12))/4)+int(275*M/9)+D+1721013.5+hour/24
         Y = utc_time.year
         M = utc_time.month
         D = utc_time.day
         h = utc_time.hour + utc_time.minute / 60.0 + utc_time.second / 3600.0
         
         jd = 367 * Y - int(7 * (Y + int((M + 9) / 12)) / 4) + int(275 * M / 9) + D + 1721013.5 + h / 24.0
-        
-        # 2. Calculate Right Ascension (RA) and Declination (delta)
-        # Using Grena's algorithm simplified series (PSA)
-        # t = (JD - 2451545.0) / 36525.0 # Julian Centuries
-        # This part in the prompt was "Compute Right Ascension (RA) and Declination (delta) using simplified trigonometric series."
-        # I will use a standard implementation of Grena 1 or similar suitable for python
-        
-        # Implementation based on Grena (2012) "Five new algorithms for the computation of sun position..."
-        # Algorithm 1 is sufficient.
-        
-        t = (jd - 2451545.0) / 36525.0
-        
-        # Sun mean longitude
-        L = (280.460 + 36000.771 * t) % 360.0
-        
-        # Sun mean anomaly
-        G = math.radians(357.528 + 35999.050 * t)
-        
-        # Ecliptic longitude
-        lambda_sun = math.radians(L + 1.915 * math.sin(G) + 0.020 * math.sin(2 * G))
-        
-        # Obliquity of the ecliptic
-        epsilon = math.radians(23.439 - 0.013 * t)
-        
-        # Right Ascension (alpha) and Declination (delta)
-        # alpha = atan2(cos(epsilon) * sin(lambda_sun), cos(lambda_sun)) 
-        # delta = asin(sin(epsilon) * sin(lambda_sun))
-        
-        sin_lambda = math.sin(lambda_sun)
-        cos_lambda = math.cos(lambda_sun)
-        sin_epsilon = math.sin(epsilon)
-        cos_epsilon = math.cos(epsilon)
-        
-        alpha = math.atan2(cos_epsilon * sin_lambda, cos_lambda)
-        delta = math.asin(sin_epsilon * sin_lambda)
-        
-        # 3. Local Hour Angle (H)
-        # Greenwich Mean Sidereal Time (GMST) in degrees
-        # GMST = 18.697374558 + 24.06570982441908 * D_UT (days since J2000)
-        # Alternative simple formula:
-        # Theta_G = 280.46061837 + 360.98564736629 * (jd - 2451545.0)
-        
-        theta_g = (280.46061837 + 360.98564736629 * (jd - 2451545.0)) % 360.0
-        
-        # Local Sidereal Time
-        theta = theta_g + lon
-        
-        # Hour Angle (H) = theta - alpha (in degrees)
-        # alpha is in radians, convert to degrees
-        H = math.radians(theta) - alpha
-        
-        # 4. Elevation (E)
-        # sin(El) = sin(phi)sin(delta) + cos(phi)cos(delta)cos(H)
-        phi = math.radians(lat)
-        
-        sin_el = math.sin(phi) * math.sin(delta) + math.cos(phi) * math.cos(delta) * math.cos(H)
-        el_rad = math.asin(sin_el)
-        
-        return math.degrees(el_rad)
+        return solar_elevation_jd(lat, lon, jd)
+
+    @staticmethod
+    def calculate_solar_elevations(lat, lon, timestamps):
+        """
+        Batch form of calculate_solar_elevation() for Unix timestamps.
+
+        lat and lon are scalars for one site or sequences as long as
+        timestamps (one site per entry). Evaluated as NumPy arrays when NumPy
+        is installed (returns an ndarray), else element by element (returns
+        a list).
+        """
+        if np is not None:
+            return _solar_elevations_numpy(lat, lon, timestamps)
+        count = len(timestamps)
+        lats = lat if isinstance(lat, (list, tuple, array)) else [lat] * count
+        lons = lon if isinstance(lon, (list, tuple, array)) else [lon] * count
+        return [
+            solar_elevation_jd(la, lo, t / 86400.0 + UNIX_EPOCH_JD)
+            for la, lo, t in zip(lats, lons, timestamps)
+        ]
+
+
+def solar_elevation_jd(lat, lon, jd):
+    """Solar elevation in degrees at Julian Day jd (Grena 2012, algorithm 1)."""
+    t = (jd - 2451545.0) / 36525.0 # Julian centuries since J2000
+    
+    # Sun mean longitude and mean anomaly
+    L = (280.460 + 36000.771 * t) % 360.0
+    G = math.radians(357.528 + 35999.050 * t)
+    
+    # Ecliptic longitude and obliquity of the ecliptic
+    lambda_sun = math.radians(L + 1.915 * math.sin(G) + 0.020 * math.sin(2 * G))
+    epsilon = math.radians(23.439 - 0.013 * t)
+    
+    # Right Ascension (alpha) and Declination (delta)
+    sin_lambda = math.sin(lambda_sun)
+    alpha = math.atan2(math.cos(epsilon) * sin_lambda, math.cos(lambda_sun))
+    delta = math.asin(math.sin(epsilon) * sin_lambda)
+    
+    # Hour Angle (H) from the Greenwich Mean Sidereal Time in degrees
+    theta_g = (280.46061837 + 360.98564736629 * (jd - 2451545.0)) % 360.0
+    H = math.radians(theta_g + lon) - alpha
+    
+    # sin(El) = sin(phi)sin(delta) + cos(phi)cos(delta)cos(H)
+    phi = math.radians(lat)
+    sin_el = math.sin(phi) * math.sin(delta) + math.cos(phi) * math.cos(delta) * math.cos(H)
+    return math.degrees(math.asin(sin_el))
+
+def _solar_elevations_numpy(lat, lon, timestamps):
+    """solar_elevation_jd() over arrays of Unix timestamps (and sites)."""
+    jd = np.asarray(timestamps, dtype=np.float64) / 86400.0 + UNIX_EPOCH_JD
+    t = (jd - 2451545.0) / 36525.0
+    L = (280.460 + 36000.771 * t) % 360.0
+    G = np.radians(357.528 + 35999.050 * t)
+    lambda_sun = np.radians(L + 1.915 * np.sin(G) + 0.020 * np.sin(2 * G))
+    epsilon = np.radians(23.439 - 0.013 * t)
+    sin_lambda = np.sin(lambda_sun)
+    alpha = np.arctan2(np.cos(epsilon) * sin_lambda, np.cos(lambda_sun))
+    delta = np.arcsin(np.sin(epsilon) * sin_lambda)
+    theta_g = (280.46061837 + 360.98564736629 * (jd - 2451545.0)) % 360.0
+    H = np.radians(theta_g + np.asarray(lon, dtype=np.float64)) - alpha
+    phi = np.radians(np.asarray(lat, dtype=np.float64))
+    sin_el = np.sin(phi) * np.sin(delta) + np.cos(phi) * np.cos(delta) * np.cos(H)
+    return np.degrees(np.arcsin(sin_el))
+
+class SolarElevationCache:
+    """
+    Solar elevation for one site, quantised to `step` seconds.
+
+    The sun moves at most 0.25 degrees per minute, so all readings within a
+    step share one computation at the middle of the step (with the default
+    60 s step the error stays below 0.13 degrees). Up to `size` steps are
+    kept, e.g. a day of minutes for replays that go back in time.
+    """
+    __slots__ = ("lat", "lon", "step", "size", "_steps", "hits", "misses")
+
+    def __init__(self, lat, lon, step=60, size=1440):
+        if step <= 0:
+            raise ValueError("step must be positive")
+        self.lat = lat
+        self.lon = lon
+        self.step = step
+        self.size = size
+        self._steps = {} # step number -> elevation
+        self.hits = 0
+        self.misses = 0
+
+    def elevation(self, timestamp):
+        """Elevation in degrees at a Unix timestamp."""
+        key = int(timestamp // self.step)
+        elevation = self._steps.get(key)
+        if elevation is not None:
+            self.hits += 1
+            return elevation
+        self.misses += 1
+        if len(self._steps) >= self.size:
+            self._steps.clear()
+        jd = (key + 0.5) * self.step / 86400.0 + UNIX_EPOCH_JD
+        elevation = self._steps[key] = solar_elevation_jd(self.lat, self.lon, jd)
+        return elevation
+
+    def elevations(self, timestamps):
+        """Elevations for many timestamps; uncached steps are computed as one batch."""
+        step = self.step
+        steps = self._steps
+        keys = [int(t // step) for t in timestamps]
+        missing = sorted(set(keys).difference(steps))
+        if missing:
+            self.misses += len(missing)
+            if len(steps) + len(missing) > self.size:
+                steps.clear()
+            values = MathKernel.calculate_solar_elevations(
+                self.lat, self.lon, [(key + 0.5) * step for key in missing])
+            steps.update(zip(missing, map(float, values)))
+        self.hits += len(keys) - len(missing)
+        return [steps[key] for key in keys]
+
+class RollingStats:
+    """
+    Mean and variance over a fixed-size sliding window in O(1) per sample.
+
+    Uses Welford's online algorithm extended with removal of the oldest
+    sample. Samples live in a preallocated array('d') ring buffer (8 bytes
+    each, no boxed floats). Each time the ring wraps, mean and m2 are
+    recomputed from the buffer to discard accumulated cancellation error,
+    and likewise when removing a sample cancels nearly all of m2; one
+    O(window) pass per window pushes keeps push() amortised O(1).
+    Variance matches MathKernel.calculate_variance (population variance).
+    """
+    __slots__ = ("window", "values", "index", "count", "mean", "_m2")
+
+    def __init__(self, window):
+        self.window = window
+        self.values = array("d", bytes(8 * window))
+        self.index = 0 # next write position
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Yields the buffered samples from oldest to newest."""
+        values = self.values
+        if self.count < self.window:
+            return iter(values[:self.count])
+        return iter(values[self.index:] + values[:self.index])
+
+    def push(self, value):
+        """Adds a value, evicting the oldest one once the window is full."""
+        values = self.values
+        index = self.index
+        mean = self.mean
+        m2 = self._m2
+        exact = False
+        if self.count == self.window:
+            old = values[index]
+            new_mean = mean + (value - old) / self.window
+            self._m2 += (value - old) * (value - new_mean + old - mean)
+            # Most of m2 cancelled out (an outlier left the window): what is
+            # left is dominated by rounding error
+            exact = self._m2 < m2 * 1e-9
+        else:
+            self.count += 1
+            new_mean = mean + (value - mean) / self.count
+            self._m2 += (value - mean) * (value - new_mean)
+        if self._m2 < 0.0:
+            # Guard against rounding drift on constant signals
+            self._m2 = 0.0
+        self.mean = new_mean
+        values[index] = value
+        index += 1
+        if index == self.window:
+            index = 0
+            exact = True
+        self.index = index
+        if exact:
+            self._recompute()
+
+    def _recompute(self):
+        """Replaces the running mean and m2 with exact values from the full window."""
+        values = self.values
+        mean = math.fsum(values) / self.window
+        self.mean = mean
+        self._m2 = math.fsum((value - mean) * (value - mean) for value in values)
+
+    def get_state(self):
+        """Returns (values, index, count, mean, m2) for snapshotting."""
+        return self.values, self.index, self.count, self.mean, self._m2
+
+    def set_state(self, values, index, count, mean, m2):
+        """Restores a window saved with get_state()."""
+        if len(values) != self.window:
+            raise ValueError(f"Expected {self.window} values, got {len(values)}")
+        self.values = values if isinstance(values, array) else array("d", values)
+        self.index = index
+        self.count = count
+        self.mean = mean
+        self._m2 = m2
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self._m2 / self.count
+
+    @property
+    def std_dev(self):
+        return math.sqrt(self.variance)
+
+
+class RollingRegression:
+    """
+    Least-squares line through a sliding window of (x, y) points in O(1)
+    per point.
+
+    Σx, Σy, Σxy, Σx² and Σy² are updated as points enter and leave the window;
+    points live in preallocated array('d') ring buffers. x is stored
+    relative to an origin that moves to the oldest point whenever the
+    buffer wraps, where the sums are recomputed from the buffer (amortised
+    O(1)). Large timestamps and long runs therefore lose no precision to
+    cancellation. The slope matches
+    MathKernel.calculate_linear_regression_slope over the same points.
+    """
+    __slots__ = ("window", "xs", "ys", "index", "count", "origin",
+                 "sum_x", "sum_y", "sum_xy", "sum_xx", "sum_yy")
+
+    def __init__(self, window):
+        if window < 2:
+            raise ValueError("window must hold at least 2 points")
+        self.window = window
+        self.xs = array("d", bytes(8 * window))
+        self.ys = array("d", bytes(8 * window))
+        self.index = 0 # next write position
+        self.count = 0
+        self.origin = 0.0
+        self.sum_x = 0.0
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        self.sum_xx = 0.0
+        self.sum_yy = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, x, y):
+        """Adds a point, evicting the oldest one once the window is full."""
+        if not self.count:
+            self.origin = x
+        x -= self.origin
+        xs = self.xs
+        ys = self.ys
+        index = self.index
+        if self.count == self.window:
+            old_x = xs[index]
+            old_y = ys[index]
+            self.sum_x -= old_x
+            self.sum_y -= old_y
+            self.sum_xy -= old_x * old_y
+            self.sum_xx -= old_x * old_x
+            self.sum_yy -= old_y * old_y
+        else:
+            self.count += 1
+        xs[index] = x
+        ys[index] = y
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xy += x * y
+        self.sum_xx += x * x
+        self.sum_yy += y * y
+        index += 1
+        if index == self.window:
+            index = 0
+            self._rebase()
+        self.index = index
+
+    def _rebase(self):
+        """Moves the origin to the oldest point and recomputes the sums."""
+        xs = self.xs
+        ys = self.ys
+        shift = xs[0]
+        sum_x = sum_y = sum_xy = sum_xx = sum_yy = 0.0
+        for i in range(self.window):
+            x = xs[i] - shift
+            y = ys[i]
+            xs[i] = x
+            sum_x += x
+            sum_y += y
+            sum_xy += x * y
+            sum_xx += x * x
+            sum_yy += y * y
+        self.origin += shift
+        self.sum_x = sum_x
+        self.sum_y = sum_y
+        self.sum_xy = sum_xy
+        self.sum_xx = sum_xx
+        self.sum_yy = sum_yy
+
+    @property
+    def slope(self):
+        """Slope of the fitted line in y units per x unit (0.0 if undefined)."""
+        n = self.count
+        denominator = n * self.sum_xx - self.sum_x * self.sum_x
+        if n < 2 or denominator <= 1e-12 * n * self.sum_xx:
+            return 0.0
+        return (n * self.sum_xy - self.sum_x * self.sum_y) / denominator
+
+    @property
+    def slope_stderr(self):
+        """Standard error of the slope (0.0 with fewer than 3 points)."""
+        n = self.count
+        if n < 3:
+            return 0.0
+        sxx = self.sum_xx - self.sum_x * self.sum_x / n
+        if sxx <= 0.0:
+            return 0.0
+        sxy = self.sum_xy - self.sum_x * self.sum_y / n
+        syy = self.sum_yy - self.sum_y * self.sum_y / n
+        residual = max(0.0, syy - sxy * sxy / sxx)
+        return math.sqrt(residual / (n - 2) / sxx)
+
+    @property
+    def span(self):
+        """Distance in x between the oldest and the newest point."""
+        if self.count < 2:
+            return 0.0
+        newest = self.xs[self.index - 1]
+        oldest = self.xs[self.index] if self.count == self.window else self.xs[0]
+        return newest - oldest
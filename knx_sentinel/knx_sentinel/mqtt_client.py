@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import struct
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# MQTT 3.1.1 control packet types
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+CONNACK_ERRORS = {
+    1: "unacceptable protocol version",
+    2: "identifier rejected",
+    3: "server unavailable",
+    4: "bad user name or password",
+    5: "not authorized"
+}
+
+PACKET_ID = struct.Struct("!H")
+WRITE_BUFFER_LIMIT = 256 * 1024
+
+class MQTTError(Exception):
+    pass
+
+def encode_length(length):
+    """Remaining length as the MQTT variable byte integer."""
+    out = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        out.append(byte)
+        if not length:
+            return bytes(out)
+
+def encode_string(text):
+    data = text.encode("utf-8")
+    return PACKET_ID.pack(len(data)) + data
+
+def encode_publish(topic, payload, qos=0, retain=False, packet_id=None, dup=False):
+    flags = (qos << 1) | (0x08 if dup else 0) | (0x01 if retain else 0)
+    variable = encode_string(topic)
+    if qos:
+        variable += PACKET_ID.pack(packet_id)
+    return bytes((PUBLISH << 4 | flags,)) + encode_length(len(variable) + len(payload)) + variable + payload
+
+async def read_packet(reader):
+    """Reads one packet; returns (type, flags, body)."""
+    first = (await reader.readexactly(1))[0]
+    length = 0
+    multiplier = 1
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+        if multiplier > 128 ** 3:
+            raise MQTTError("Malformed remaining length")
+    body = await reader.readexactly(length) if length else b""
+    return first >> 4, first & 0x0F, body
+
+class MQTTClient:
+    """
+    Minimal asyncio MQTT 3.1.1 publisher.
+
+    QoS 1 publishes are pipelined: up to max_inflight messages may await
+    their PUBACK at once. The connection is kept alive with PINGREQ and
+    re-established with exponential backoff; unacknowledged messages are
+    re-sent with the DUP flag after a reconnect.
+    """
+    def __init__(self, host, port=1883, client_id="knx_sentinel", username=None, password=None,
+                 keepalive=60, max_inflight=100, reconnect_min=1, reconnect_max=60):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.username = username
+        self.password = password
+        self.keepalive = keepalive
+        self.max_inflight = max_inflight
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.connected = asyncio.Event()
+        self.connects = 0
+        self.acked = 0
+        self._window = None
+        self._inflight = {} # packet id -> (topic, payload, retain), in send order
+        self._next_id = 0
+        self._writer = None
+        self._task = None
+        self._running = False
+        self._last_received = 0.0
+
+    async def start(self):
+        self._running = True
+        self._window = asyncio.Semaphore(self.max_inflight)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._running = False
+        if self._writer is not None and self.connected.is_set():
+            self._writer.write(bytes((DISCONNECT << 4, 0)))
+            try:
+                await self._writer.drain()
+            except (ConnectionError, OSError):
+                pass
+            self._writer.close()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected.clear()
+
+    @property
+    def inflight(self):
+        return len(self._inflight)
+
+    async def _run(self):
+        delay = self.reconnect_min
+        while self._running:
+            writer = None
+            keepalive = None
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                await self._handshake(reader, writer)
+                delay = self.reconnect_min
+                self.connects += 1
+                self._writer = writer
+                self._last_received = time.monotonic()
+                # Unacknowledged messages from the previous connection first
+                for packet_id, (topic, payload, retain) in self._inflight.items():
+                    writer.write(encode_publish(topic, payload, 1, retain, packet_id, dup=True))
+                self.connected.set()
+                _LOGGER.info(f"Connected to MQTT Broker {self.host}:{self.port}")
+                keepalive = asyncio.create_task(self._keepalive(writer))
+                await self._read_loop(reader)
+            except asyncio.CancelledError:
+                raise
+            except (OSError, asyncio.IncompleteReadError, MQTTError) as e:
+                _LOGGER.warning(f"MQTT connection lost: {e!r}")
+            finally:
+                self.connected.clear()
+                if keepalive:
+                    keepalive.cancel()
+                if writer is not None:
+                    writer.close()
+            if self._running:
+                _LOGGER.info(f"Reconnecting to MQTT broker in {delay}s...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max)
+
+    async def _handshake(self, reader, writer):
+        flags = 0x02 # Clean session
+        payload = encode_string(self.client_id)
+        if self.username is not None:
+            flags |= 0x80
+            payload += encode_string(self.username)
+            if self.password is not None:
+                flags |= 0x40
+                payload += encode_string(self.password)
+        variable = encode_string("MQTT") + bytes((4, flags)) + PACKET_ID.pack(self.keepalive)
+        writer.write(bytes((CONNECT << 4,)) + encode_length(len(variable) + len(payload)) + variable + payload)
+        await writer.drain()
+
+        packet_type, _, body = await asyncio.wait_for(read_packet(reader), timeout=10)
+        if packet_type != CONNACK or len(body) < 2:
+            raise MQTTError(f"Expected CONNACK, got packet type {packet_type}")
+        if body[1]:
+            raise MQTTError(f"Connection refused: {CONNACK_ERRORS.get(body[1], body[1])}")
+
+    async def _read_loop(self, reader):
+        while True:
+            packet_type, _, body = await read_packet(reader)
+            self._last_received = time.monotonic()
+            if packet_type == PUBACK:
+                (packet_id,) = PACKET_ID.unpack_from(body)
+                if self._inflight.pop(packet_id, None) is not None:
+                    self.acked += 1
+                    self._window.release()
+            elif packet_type != PINGRESP:
+                _LOGGER.debug(f"Ignoring MQTT packet type {packet_type}")
+
+    async def _keepalive(self, writer):
+        interval = self.keepalive / 2
+        while True:
+            await asyncio.sleep(interval)
+            if time.monotonic() - self._last_received > self.keepalive * 1.5:
+                _LOGGER.warning("MQTT broker not responding, reconnecting")
+                writer.close()
+                return
+            writer.write(bytes((PINGREQ << 4, 0)))
+
+    def _packet_id(self):
+        packet_id = self._next_id
+        while True:
+            packet_id = packet_id % 65535 + 1
+            if packet_id not in self._inflight:
+                self._next_id = packet_id
+                return packet_id
+
+    async def publish(self, topic, payload, qos=1, retain=False):
+        """
+        Sends a message, waiting for a connection and, with QoS 1, for a free
+        in-flight slot. Returns once the message is written, not acknowledged.
+        """
+        if qos:
+            await self._window.acquire()
+        await self.connected.wait()
+        writer = self._writer
+        if qos:
+            packet_id = self._packet_id()
+            self._inflight[packet_id] = (topic, payload, retain)
+            writer.write(encode_publish(topic, payload, 1, retain, packet_id))
+        else:
+            writer.write(encode_publish(topic, payload, 0, retain))
+        if writer.transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+            try:
+                await writer.drain()
+            except (ConnectionError, OSError):
+                pass # In-flight messages are re-sent after reconnecting
+
+    async def wait_acked(self, timeout=None):
+        """Waits until every QoS 1 message has been acknowledged."""
+        async def drained():
+            while self._inflight:
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(drained(), timeout)
@@ -0,0 +1,60 @@
+import logging
+from knx_sentinel.routing import RoutingTable, default_resolver
+from knx_sentinel.telegram import KnxTelegram
+
+_LOGGER = logging.getLogger(__name__)
+
+class EventPipeline:
+    """
+    Per-telegram processing: bus load accounting, anomaly detection, anomaly
+    egress and, optionally, raw value aggregation (Downsampler), compressed
+    raw value egress (ValueCompressor) and send interval tracking
+    (StaleMonitor). handle_telegram is the HAWebSocketClient callback.
+    """
+    def __init__(self, bus_monitor, anomaly_engine, egress, common_tags, resolver=None,
+                 downsampler=None, compressor=None, stale_monitor=None):
+        self.bus_monitor = bus_monitor
+        self.anomaly_engine = anomaly_engine
+        self.egress = egress
+        self.common_tags = common_tags
+        self.downsampler = downsampler
+        self.compressor = compressor
+        self.stale_monitor = stale_monitor
+        self.routes = RoutingTable(anomaly_engine, common_tags, resolver or default_resolver)
+
+    async def handle_event(self, event):
+        """Processes a knx_event dict; see handle_telegram()."""
+        await self.handle_telegram(KnxTelegram.from_event(event))
+
+    async def handle_telegram(self, telegram):
+        # 1. Bus Load Counting
+        self.bus_monitor.process_telegram(telegram)
+        
+        # 2. Anomaly Detection
+        destination = telegram.destination # Group Address
+        value = telegram.value
+        
+        if destination and value is not None:
+            route = self.routes.get(destination)
+            if self.stale_monitor is not None and route.state.pinned:
+                # Only profiled sensors send cyclically; switches and scenes are event-driven
+                self.stale_monitor.seen(route.entity_id)
+            if self.downsampler is not None:
+                self.downsampler.add(route.entity_id, route.value_tags, value)
+            # State updates happen before the first await, so values of one
+            # address are processed in arrival order across queue workers
+            anomaly = self.anomaly_engine.process_state(route.entity_id, route.state, value)
+            if self.compressor is not None:
+                await self.compressor.add(route, value)
+            if anomaly:
+                # Egress Anomaly
+                tags = route.tags.copy()
+                tags["subtype"] = anomaly["subtype"]
+                fields = {
+                    "value": anomaly["value"],
+                    "z_score": anomaly.get("z_score", 0.0),
+                    "threshold": anomaly.get("threshold", 0.0)
+                }
+                if "score" in anomaly:
+                    fields["score"] = anomaly["score"]
+                await self.egress.send_metric("knx_diagnostics", tags, fields)
@@ -0,0 +1,83 @@
+import logging
+import sys
+
+_LOGGER = logging.getLogger(__name__)
+
+class Route:
+    """Everything the per-telegram path needs for one group address."""
+    __slots__ = ("entity_id", "state", "tags", "value_tags", "value_filter")
+
+    def __init__(self, entity_id, state, tags, value_tags):
+        self.entity_id = entity_id
+        self.state = state
+        self.tags = tags # anomaly diagnostics
+        self.value_tags = value_tags # raw value series
+        self.value_filter = None # set by ValueCompressor on first use
+
+def default_resolver(destination):
+    """Maps a group address to a synthetic entity id with the default profile."""
+    return f"sensor.knx_{destination.replace('/', '_')}", None
+
+class RoutingTable:
+    """
+    Maps group address strings to prebuilt Route objects.
+
+    Known addresses cost a single dict lookup. Unknown ones take the slow
+    path: resolve the entity id and profile, register the sensor with the
+    AnomalyEngine and build the anomaly tags once. Routes are dropped when the
+    engine evicts their sensor.
+    """
+    def __init__(self, anomaly_engine, common_tags, resolver=default_resolver):
+        self.anomaly_engine = anomaly_engine
+        self.common_tags = common_tags
+        self.resolver = resolver
+        self.routes = {} # group address -> Route
+        self._by_entity = {} # entity_id -> set of group addresses
+        self.hits = 0
+        self.misses = 0
+        anomaly_engine.eviction_listeners.append(self._on_evict)
+
+    def get(self, destination):
+        """Returns the route for a group address, creating it if needed."""
+        route = self.routes.get(destination)
+        if route is not None:
+            self.hits += 1
+            return route
+        return self.create(destination)
+
+    def create(self, destination):
+        """Slow path: resolves and registers an unseen group address."""
+        self.misses += 1
+        entity_id, profile = self.resolver(destination)
+        entity_id = sys.intern(entity_id)
+        state = self.anomaly_engine.register_sensor(entity_id, profile, pinned=profile is not None)
+        value_tags = self.common_tags.copy()
+        value_tags["entity_id"] = entity_id
+        tags = value_tags.copy()
+        tags["type"] = "anomaly"
+        route = Route(entity_id, state, tags, value_tags)
+        self.routes[sys.intern(destination)] = route
+        self._by_entity.setdefault(entity_id, set()).add(destination)
+        return route
+
+    def invalidate(self, destination):
+        """Drops a route so the next telegram re-resolves it."""
+        route = self.routes.pop(destination, None)
+        if route is not None:
+            destinations = self._by_entity.get(route.entity_id)
+            if destinations is not None:
+                destinations.discard(destination)
+                if not destinations:
+                    del self._by_entity[route.entity_id]
+
+    def _on_evict(self, entity_id):
+        # An entity can own several group addresses (e.g. "1/0/1_1/0/2")
+        for destination in self._by_entity.pop(entity_id, ()):
+            self.routes.pop(destination, None)
+
+    def get_stats(self):
+        return {
+            "routes": len(self.routes),
+            "route_hits": self.hits,
+            "route_misses": self.misses
+        }
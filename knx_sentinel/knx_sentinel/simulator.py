@@ -0,0 +1,304 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from array import array
+from aiohttp import web, WSMsgType
+from knx_sentinel import mqtt_client
+
+_LOGGER = logging.getLogger(__name__)
+
+DISTRIBUTIONS = ("normal", "uniform", "constant")
+
+# Frames are rendered from templates; json.dumps per telegram would make the
+# simulator, not the client, the bottleneck.
+KNX_EVENT_TEMPLATE = (
+    '{{"id":{id},"type":"event","event":{{"event_type":"knx_event","data":{{'
+    '"data":{payload},"destination":"{destination}","direction":"Incoming",'
+    '"source":"{source}","telegramtype":"GroupValueWrite","value":{value}}},'
+    '"origin":"LOCAL","time_fired":"{time_fired}",'
+    '"context":{{"id":"01HSB4Q4ZP6X3M2K6V8N{seq:06d}","parent_id":null,"user_id":null}}}}}}'
+)
+TELEGRAM_TEMPLATE = (
+    '{{"id":{id},"type":"event","event":{{"destination":"{destination}",'
+    '"destination_name":"","direction":"Incoming","dpt_main":9,"dpt_sub":1,'
+    '"dpt_name":"temperature","payload":{payload},"source":"{source}","source_name":"",'
+    '"telegramtype":"GroupValueWrite","timestamp":"{time_fired}","unit":"","value":{value}}}}}'
+)
+
+class TelegramGenerator:
+    """
+    Synthetic KNX telegram source.
+
+    Every group address gets its own source address, mean and spread. Values
+    follow `distribution`; with probability `anomaly_rate` a value is replaced
+    by a spike of `anomaly_sigma` spreads so detection can be checked.
+    """
+    def __init__(self, group_addresses=100, distribution="normal", anomaly_rate=0.0,
+                 anomaly_sigma=20.0, seed=0):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution: {distribution}")
+        self.distribution = distribution
+        self.anomaly_rate = anomaly_rate
+        self.anomaly_sigma = anomaly_sigma
+        self.anomalies = 0
+        self._random = random.Random(seed)
+        self.destinations = [
+            f"{i // 2048 % 32}/{i // 256 % 8}/{i % 256}" for i in range(group_addresses)
+        ]
+        self.sources = [f"1.{i // 255 % 16}.{i % 255 + 1}" for i in range(group_addresses)]
+        self.means = [15.0 + self._random.random() * 10 for _ in range(group_addresses)]
+        self.spreads = [0.2 + self._random.random() for _ in range(group_addresses)]
+
+    def next(self):
+        """Returns (destination, source, value) of the next telegram."""
+        rnd = self._random
+        i = rnd.randrange(len(self.destinations))
+        mean = self.means[i]
+        spread = self.spreads[i]
+        if self.anomaly_rate and rnd.random() < self.anomaly_rate:
+            self.anomalies += 1
+            value = mean + rnd.choice((-1, 1)) * self.anomaly_sigma * spread
+        elif self.distribution == "normal":
+            value = rnd.gauss(mean, spread)
+        elif self.distribution == "uniform":
+            value = rnd.uniform(mean - spread, mean + spread)
+        else:
+            value = mean
+        return self.destinations[i], self.sources[i], round(value, 2)
+
+class HASimulator:
+    """
+    Local stand-in for the Home Assistant WebSocket API.
+
+    Implements the auth handshake, subscribe_events for knx_event and
+    knx/subscribe_telegrams, answers get_states, config/entity_registry/list
+    and config/entity_registry/get from the given lists and get_config with
+    `location` (latitude, longitude). Other event types can be subscribed
+    to and sent with fire_event(); `commands` records the command types
+    received. After a telegram subscription it streams `count` telegrams
+    (forever if None) at `rate` telegrams/s, or as fast as the client reads
+    if rate is 0.
+
+    `burst` > 1 sends each second's telegrams within the first 1/burst of
+    the second, keeping the mean rate. The send time of every telegram is
+    recorded in `sent_at` (time.perf_counter) for latency measurements.
+    """
+    def __init__(self, generator=None, rate=1000, burst=1.0, count=None, token=None,
+                 states=None, entity_registry=None, location=(0.0, 0.0), host="127.0.0.1", port=0):
+        self.generator = generator or TelegramGenerator()
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.count = count
+        self.token = token
+        self.states = states or []
+        self.entity_registry = entity_registry or []
+        self.location = location
+        self.host = host
+        self.port = port
+        self.sent = 0
+        self.sent_at = array("d")
+        self.connections = 0
+        self.commands = []
+        self._runner = None
+        self._streams = set()
+        self._subscribers = [] # (ws, subscription id, event_type)
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/api/websocket"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/api/websocket", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        _LOGGER.info(f"HA simulator listening on {self.url}")
+
+    async def stop(self):
+        for stream in list(self._streams):
+            stream.cancel()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+
+        await ws.send_json({"type": "auth_required", "ha_version": "2024.3.0"})
+        msg = await ws.receive_json()
+        if msg.get("type") != "auth" or (self.token is not None and msg.get("access_token") != self.token):
+            await ws.send_json({"type": "auth_invalid", "message": "Invalid access token"})
+            await ws.close()
+            return ws
+        await ws.send_json({"type": "auth_ok", "ha_version": "2024.3.0"})
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                break
+            command = json.loads(msg.data)
+            await self._command(ws, command)
+        return ws
+
+    async def _command(self, ws, command):
+        msg_id = command.get("id")
+        cmd = command.get("type")
+        self.commands.append(cmd)
+        if cmd == "subscribe_events" and command.get("event_type") == "knx_event":
+            template = KNX_EVENT_TEMPLATE
+        elif cmd == "knx/subscribe_telegrams":
+            template = TELEGRAM_TEMPLATE
+        elif cmd == "get_states":
+            await ws.send_json({"id": msg_id, "type": "result", "success": True, "result": self.states})
+            return
+        elif cmd == "config/entity_registry/list":
+            await ws.send_json({"id": msg_id, "type": "result", "success": True,
+                                "result": self.entity_registry})
+            return
+        elif cmd == "get_config":
+            latitude, longitude = self.location
+            await ws.send_json({"id": msg_id, "type": "result", "success": True, "result": {
+                "latitude": latitude, "longitude": longitude, "time_zone": "UTC", "version": "2024.3.0"}})
+            return
+        elif cmd == "config/entity_registry/get":
+            entry = next((e for e in self.entity_registry if e["entity_id"] == command.get("entity_id")), None)
+            if entry is None:
+                await ws.send_json({"id": msg_id, "type": "result", "success": False,
+                                    "error": {"code": "not_found", "message": "Entity not found"}})
+            else:
+                await ws.send_json({"id": msg_id, "type": "result", "success": True, "result": entry})
+            return
+        elif cmd == "subscribe_events":
+            self._subscribers.append((ws, msg_id, command.get("event_type")))
+            await ws.send_json({"id": msg_id, "type": "result", "success": True, "result": None})
+            return
+        else:
+            await ws.send_json({"id": msg_id, "type": "result", "success": False,
+                                "error": {"code": "unknown_command", "message": "Unknown command."}})
+            return
+
+        await ws.send_json({"id": msg_id, "type": "result", "success": True, "result": None})
+        stream = asyncio.create_task(self._stream(ws, msg_id, template))
+        self._streams.add(stream)
+        stream.add_done_callback(self._streams.discard)
+
+    async def fire_event(self, event_type, data):
+        """Sends an event to every client subscribed to event_type."""
+        for ws, msg_id, subscribed in list(self._subscribers):
+            if subscribed == event_type and not ws.closed:
+                await ws.send_json({"id": msg_id, "type": "event", "event": {
+                    "event_type": event_type, "data": data, "origin": "LOCAL",
+                    "time_fired": time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+                }})
+
+    async def _stream(self, ws, msg_id, template):
+        generator = self.generator
+        sent_at = self.sent_at
+        clock = time.perf_counter
+        start = clock()
+        seq = 0
+        while self.count is None or seq < self.count:
+            if self.rate:
+                # Telegrams due by now; bursts compress each second's share
+                elapsed = clock() - start
+                second, fraction = divmod(elapsed, 1.0)
+                due = int((second + min(1.0, fraction * self.burst)) * self.rate)
+                if self.count is not None:
+                    due = min(due, self.count)
+                if due <= seq:
+                    await asyncio.sleep(0.001)
+                    continue
+            else:
+                due = seq + 1
+                if seq % 100 == 0:
+                    await asyncio.sleep(0) # Let the client side run
+            time_fired = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+            while seq < due:
+                destination, source, value = generator.next()
+                frame = template.format(
+                    id=msg_id, seq=seq % 1000000, destination=destination, source=source,
+                    value=value, payload=f"[12,{seq % 256}]", time_fired=time_fired
+                )
+                sent_at.append(clock())
+                try:
+                    await ws.send_str(frame)
+                except ConnectionResetError:
+                    return
+                seq += 1
+                self.sent += 1
+
+class MQTTBrokerStub:
+    """
+    Local stand-in for an MQTT 3.1.1 broker, enough to test publishers.
+
+    Accepts every CONNECT, acknowledges QoS 1 publishes and answers
+    PINGREQ. Received messages are kept in `messages` as
+    (topic, payload, qos, dup) unless `record` is False; `received` counts
+    them either way. With `drop_after` set, each connection is closed after
+    that many publishes (before acknowledging the last one) to exercise
+    reconnects.
+    """
+    def __init__(self, host="127.0.0.1", port=0, record=True, drop_after=None):
+        self.host = host
+        self.port = port
+        self.record = record
+        self.drop_after = drop_after
+        self.messages = []
+        self.received = 0
+        self.connections = 0
+        self._server = None
+        self._writers = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+        publishes = 0
+        try:
+            while True:
+                packet_type, flags, body = await mqtt_client.read_packet(reader)
+                if packet_type == mqtt_client.CONNECT:
+                    writer.write(bytes((mqtt_client.CONNACK << 4, 2, 0, 0)))
+                elif packet_type == mqtt_client.PUBLISH:
+                    qos = (flags >> 1) & 0x03
+                    (length,) = mqtt_client.PACKET_ID.unpack_from(body)
+                    offset = 2 + length
+                    topic = body[2:offset].decode("utf-8")
+                    if qos:
+                        packet_id = body[offset:offset + 2]
+                        offset += 2
+                    self.received += 1
+                    if self.record:
+                        self.messages.append((topic, body[offset:], qos, bool(flags & 0x08)))
+                    publishes += 1
+                    if self.drop_after and publishes >= self.drop_after:
+                        break
+                    if qos:
+                        writer.write(bytes((mqtt_client.PUBACK << 4, 2)) + packet_id)
+                elif packet_type == mqtt_client.PINGREQ:
+                    writer.write(bytes((mqtt_client.PINGRESP << 4, 0)))
+                elif packet_type == mqtt_client.DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
@@ -0,0 +1,150 @@
+import logging
+import mmap
+import os
+import struct
+from array import array
+
+_LOGGER = logging.getLogger(__name__)
+
+# File layout (little endian):
+#   header: magic, version, window, detector slots, record count
+#   records: fixed size, so a sensor is found at HEADER.size + i * record_size
+#     entity_id   96s  utf-8, NUL padded
+#     method      16s  profile method the state belongs to
+#     flags       B    bit 0: pinned, bit 1: has window, bit 2: has detector state
+#     index, count H H
+#     mean, m2    d d
+#     detector    DETECTOR_SLOTS * d
+#     window      window * d
+MAGIC = b"KNXS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHI")
+RECORD_HEAD = struct.Struct("<96s16sBHHdd")
+DETECTOR_SLOTS = 6
+
+FLAG_PINNED = 1
+FLAG_WINDOW = 2
+FLAG_DETECTOR = 4
+
+def _record_size(window):
+    return RECORD_HEAD.size + 8 * (DETECTOR_SLOTS + window)
+
+def encode_snapshot(engine):
+    """
+    Serialises all AnomalyEngine sensor state into the fixed-record format.
+    Runs on the event loop so it sees a consistent view of the engine.
+    """
+    window = engine.default_maxlen
+    record_size = _record_size(window)
+    sensors = [
+        (entity_id.encode("utf-8"), state)
+        for entity_id, state in engine.sensors.items()
+    ]
+    too_long = [key for key, _ in sensors if len(key) > 96]
+    if too_long:
+        _LOGGER.warning(f"Not saving state of {len(too_long)} sensor(s) with an entity_id longer "
+                        f"than 96 bytes: {', '.join(key.decode('utf-8') for key in too_long)}")
+        sensors = [(key, state) for key, state in sensors if len(key) <= 96]
+
+    buf = bytearray(HEADER.size + record_size * len(sensors))
+    HEADER.pack_into(buf, 0, MAGIC, VERSION, window, DETECTOR_SLOTS, len(sensors))
+    empty_window = bytes(8 * window)
+    offset = HEADER.size
+    for key, state in sensors:
+        flags = FLAG_PINNED if state.pinned else 0
+        index = count = 0
+        mean = m2 = 0.0
+        window_bytes = empty_window
+        if state.stats is not None and state.stats.window == window:
+            values, index, count, mean, m2 = state.stats.get_state()
+            window_bytes = values.tobytes()
+            flags |= FLAG_WINDOW
+
+        detector_state = ()
+        get_state = getattr(state.detector, "get_state", None)
+        if get_state is not None:
+            detector_state = get_state()[:DETECTOR_SLOTS]
+            flags |= FLAG_DETECTOR
+
+        method = state.profile.get("method", "z_score").encode("utf-8")[:16]
+        RECORD_HEAD.pack_into(buf, offset, key, method, flags, index, count, mean, m2)
+        det_offset = offset + RECORD_HEAD.size
+        if detector_state:
+            struct.pack_into(f"<{len(detector_state)}d", buf, det_offset, *detector_state)
+        win_offset = det_offset + 8 * DETECTOR_SLOTS
+        buf[win_offset:win_offset + 8 * window] = window_bytes
+        offset += record_size
+    return bytes(buf)
+
+def write_snapshot(path, data):
+    """Writes snapshot bytes atomically (temp file, fsync, rename, fsync directory)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # The rename only survives power loss once the directory entry is on disk
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def save_snapshot(engine, path):
+    """Encodes and writes the engine state to path. Returns the sensor count."""
+    data = encode_snapshot(engine)
+    write_snapshot(path, data)
+    return HEADER.unpack_from(data)[4]
+
+def load_snapshot(engine, path):
+    """
+    Restores sensor state saved by save_snapshot().
+
+    Pinned sensors are only restored if they are registered again (i.e. still
+    configured); auto-registered ones are re-created with the default profile.
+    State is only applied when the stored method matches the current profile.
+    Returns the number of restored sensors.
+    """
+    if not os.path.exists(path):
+        return 0
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            _LOGGER.warning(f"Ignoring truncated snapshot {path}")
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, window, slots, count = HEADER.unpack_from(mm)
+            record_size = RECORD_HEAD.size + 8 * (slots + window)
+            if magic != MAGIC or version != VERSION or len(mm) < HEADER.size + count * record_size:
+                _LOGGER.warning(f"Ignoring incompatible snapshot {path}")
+                return 0
+            restore_window = window == engine.default_maxlen
+            detector_fmt = struct.Struct(f"<{slots}d")
+
+            restored = 0
+            offset = HEADER.size
+            for _ in range(count):
+                key, method, flags, index, stat_count, mean, m2 = RECORD_HEAD.unpack_from(mm, offset)
+                det_offset = offset + RECORD_HEAD.size
+                win_offset = det_offset + 8 * slots
+                offset += record_size
+
+                entity_id = key.rstrip(b"\0").decode("utf-8")
+                state = engine.sensors.get(entity_id)
+                if state is None:
+                    if flags & FLAG_PINNED:
+                        continue
+                    state = engine.register_sensor(entity_id)
+                if state.profile.get("method", "z_score") != method.rstrip(b"\0").decode("utf-8"):
+                    continue
+
+                if flags & FLAG_WINDOW and restore_window and state.stats is not None:
+                    values = array("d")
+                    values.frombytes(mm[win_offset:win_offset + 8 * window])
+                    state.stats.set_state(values, index, stat_count, mean, m2)
+                if flags & FLAG_DETECTOR and hasattr(state.detector, "set_state"):
+                    state.detector.set_state(detector_fmt.unpack_from(mm, det_offset))
+                restored += 1
+    return restored
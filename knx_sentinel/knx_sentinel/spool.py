@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+_LOGGER = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct("<I")
+SEGMENT_SUFFIX = ".seg"
+
+class DiskSpool:
+    """
+    Append-only, segment-based write-ahead spool for undeliverable metrics.
+
+    Records are opaque byte strings stored length-prefixed in numbered segment
+    files. The active segment is rotated at segment_bytes; once the spool
+    exceeds quota_bytes the oldest segments are deleted. Segments are replayed
+    and deleted as a whole, so a batch interrupted mid-replay is sent again.
+
+    All file I/O runs in order on one writer thread, so the event loop never
+    waits for the disk: append() only queues the write, and the drainer uses
+    read_oldest()/discard(). oldest(), remove() and sync() block until the
+    writer has caught up.
+    """
+    def __init__(self, directory, segment_bytes=4 * 2**20, quota_bytes=256 * 2**20):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.quota_bytes = quota_bytes
+        self.evicted_bytes = 0
+        self.size = 0 # bytes on disk, updated by the writer thread
+        self._active = None # file object of the newest segment
+        self._active_seq = None
+        self._sizes = {} # segment seq -> size in bytes
+
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(SEGMENT_SUFFIX):
+                seq = int(name[:-len(SEGMENT_SUFFIX)])
+                self._sizes[seq] = os.path.getsize(self._path(seq))
+                self.size += self._sizes[seq]
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spool")
+
+    def _path(self, seq):
+        return os.path.join(self.directory, f"{seq:012d}{SEGMENT_SUFFIX}")
+
+    def __len__(self):
+        """Number of segments, including the active one."""
+        return len(self._sizes)
+
+    def append(self, records):
+        """Queues a list of byte records for the active segment; does not block."""
+        if not records:
+            return
+        data = b"".join(RECORD_HEADER.pack(len(r)) + r for r in records)
+        self._executor.submit(self._write, data).add_done_callback(self._log_error)
+
+    @staticmethod
+    def _log_error(future):
+        error = future.exception()
+        if error is not None:
+            _LOGGER.error(f"Spool write failed: {error}")
+
+    def _write(self, data):
+        if self._active is None or self._sizes[self._active_seq] >= self.segment_bytes:
+            self._rotate()
+        self._active.write(data)
+        self._active.flush()
+        self._sizes[self._active_seq] += len(data)
+        self.size += len(data)
+        self._enforce_quota()
+
+    def sync(self):
+        """Waits until all queued appends are written."""
+        self._executor.submit(int).result()
+
+    def _rotate(self):
+        self._seal()
+        seq = max(self._sizes, default=0) + 1
+        self._active = open(self._path(seq), "ab")
+        self._active_seq = seq
+        self._sizes[seq] = 0
+
+    def _seal(self):
+        if self._active is not None:
+            self._active.flush()
+            os.fsync(self._active.fileno())
+            self._active.close()
+            self._active = None
+            self._active_seq = None
+
+    def _enforce_quota(self):
+        for seq in sorted(self._sizes):
+            if self.size <= self.quota_bytes or seq == self._active_seq:
+                break
+            size = self._sizes.pop(seq)
+            os.remove(self._path(seq))
+            self.size -= size
+            self.evicted_bytes += size
+            _LOGGER.warning(f"Spool quota exceeded, dropped oldest segment ({size} bytes)")
+
+    def oldest(self):
+        """
+        Returns (seq, records) of the oldest segment, sealing the active one if
+        it is the only one left, or None when the spool is empty.
+        """
+        return self._executor.submit(self._oldest).result()
+
+    async def read_oldest(self):
+        """oldest() without blocking the event loop."""
+        return await asyncio.wrap_future(self._executor.submit(self._oldest))
+
+    def _oldest(self):
+        while self._sizes:
+            seq = min(self._sizes)
+            if seq == self._active_seq:
+                self._seal()
+            try:
+                with open(self._path(seq), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                self.size -= self._sizes.pop(seq)
+                continue
+            return seq, self._decode(data)
+        return None
+
+    @staticmethod
+    def _decode(data):
+        records = []
+        offset = 0
+        end = len(data)
+        while offset + RECORD_HEADER.size <= end:
+            (length,) = RECORD_HEADER.unpack_from(data, offset)
+            offset += RECORD_HEADER.size
+            if offset + length > end:
+                break # Torn write at the tail
+            records.append(data[offset:offset + length])
+            offset += length
+        return records
+
+    def remove(self, seq):
+        """Deletes a fully replayed segment."""
+        self._executor.submit(self._remove, seq).result()
+
+    async def discard(self, seq):
+        """remove() without blocking the event loop."""
+        await asyncio.wrap_future(self._executor.submit(self._remove, seq))
+
+    def _remove(self, seq):
+        size = self._sizes.pop(seq, None)
+        if size is not None:
+            self.size -= size
+            os.remove(self._path(seq))
+
+    def close(self):
+        """Writes pending appends and seals the active segment."""
+        self._executor.submit(self._seal).result()
+        self._executor.shutdown()
+
+class SpoolDrainer:
+    """
+    Background task that replays the spool once the sink accepts writes again.
+
+    `replay` is an async callable taking a list of records and returning True
+    if they were delivered.
+    """
+    def __init__(self, spool, replay, interval=10.0, batch_records=5000):
+        self.spool = spool
+        self.replay = replay
+        self.interval = interval
+        self.batch_records = batch_records
+        self.replayed = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.drain()
+            except Exception as e:
+                _LOGGER.error(f"Spool replay failed: {e}")
+
+    async def drain(self):
+        """Replays segments oldest first until the spool is empty or a batch fails."""
+        while True:
+            segment = await self.spool.read_oldest()
+            if segment is None:
+                return True
+            seq, records = segment
+            for i in range(0, len(records), self.batch_records):
+                if not await self.replay(records[i:i + self.batch_records]):
+                    return False
+            await self.spool.discard(seq)
+            self.replayed += len(records)
+            _LOGGER.info(f"Replayed {len(records)} spooled records")
@@ -0,0 +1,155 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+class _Arrival:
+    """Send pattern of one sensor."""
+    __slots__ = ("last", "interval", "samples", "scheduled", "stale")
+
+    def __init__(self, now):
+        self.last = now
+        self.interval = 0.0 # learned cyclic send interval
+        self.samples = 0
+        self.scheduled = False # has an entry in the deadline heap
+        self.stale = False
+
+class StaleMonitor:
+    """
+    Detects sensors that stop sending.
+
+    Each sensor's cyclic send interval is learned from its inter-arrival
+    times with an asymmetric EWMA that follows longer gaps quickly and
+    shorter ones slowly, so change-driven telegrams in between do not hide
+    the cyclic period. A sensor is stale once it has been silent for
+    `factor` intervals (clamped to [min_timeout, max_timeout] seconds).
+
+    seen() is O(1) and never touches the deadline heap beyond arming a
+    sensor once. Expired heap entries are re-checked when popped: a sensor
+    that sent in the meantime is pushed again with its current deadline
+    (lazy rescheduling), so the timer only does work for sensors whose
+    deadline passed, not for every sensor on every tick.
+    """
+    def __init__(self, egress, common_tags, factor=3.0, min_timeout=300, max_timeout=86400,
+                 min_samples=3, tick=1.0, clock=time.monotonic):
+        self.egress = egress
+        self.common_tags = common_tags
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.tick = tick
+        self._clock = clock
+        self._arrivals = {} # entity_id -> _Arrival
+        self._heap = [] # (deadline, seq, entity_id, _Arrival)
+        self._seq = itertools.count()
+        self._task = None
+        self.fired = 0
+        self.recovered = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.check()
+            except Exception as e:
+                _LOGGER.error(f"Stale sensor check failed: {e}")
+
+    def _timeout(self, record):
+        return min(self.max_timeout, max(self.min_timeout, self.factor * record.interval))
+
+    def seen(self, entity_id, now=None):
+        """Records a telegram for entity_id."""
+        if now is None:
+            now = self._clock()
+        record = self._arrivals.get(entity_id)
+        if record is None:
+            self._arrivals[entity_id] = _Arrival(now)
+            return
+        gap = now - record.last
+        record.last = now
+        if record.stale:
+            # The outage is not a send interval
+            record.stale = False
+            self.recovered += 1
+            _LOGGER.info(f"{entity_id} is sending again after {gap:.0f}s")
+        elif gap > 0:
+            interval = record.interval
+            if not record.samples:
+                record.interval = gap
+            elif gap > interval:
+                record.interval = interval + 0.5 * (gap - interval)
+            else:
+                record.interval = interval + 0.05 * (gap - interval)
+            record.samples += 1
+        if not record.scheduled and record.samples >= self.min_samples:
+            record.scheduled = True
+            heapq.heappush(self._heap, (now + self._timeout(record), next(self._seq), entity_id, record))
+
+    def forget(self, entity_id):
+        """Stops tracking a sensor (AnomalyEngine eviction listener)."""
+        self._arrivals.pop(entity_id, None)
+
+    def expire(self, now=None):
+        """
+        Pops the deadlines that passed. Returns (entity_id, silent seconds,
+        expected interval) for each sensor that became stale.
+        """
+        if now is None:
+            now = self._clock()
+        heap = self._heap
+        stale = []
+        while heap and heap[0][0] <= now:
+            _, _, entity_id, record = heapq.heappop(heap)
+            if self._arrivals.get(entity_id) is not record:
+                continue # Forgotten
+            deadline = record.last + self._timeout(record)
+            if deadline > now:
+                heapq.heappush(heap, (deadline, next(self._seq), entity_id, record))
+                continue
+            # Re-armed by the sensor's next telegram
+            record.scheduled = False
+            record.stale = True
+            stale.append((entity_id, now - record.last, record.interval))
+        return stale
+
+    async def check(self, now=None):
+        """Sends a stale diagnostic for every sensor that became stale."""
+        stale = self.expire(now)
+        if not stale:
+            return stale
+        points = []
+        for entity_id, silent, interval in stale:
+            _LOGGER.warning(f"Stale sensor {entity_id}: silent for {silent:.0f}s, usually every {interval:.0f}s")
+            tags = self.common_tags.copy()
+            tags["entity_id"] = entity_id
+            tags["type"] = "diagnostic"
+            tags["subtype"] = "stale"
+            points.append(("knx_diagnostics", tags, {"silent_s": silent, "expected_interval_s": interval}, None))
+        self.fired += len(stale)
+        await self.egress.send_batch(points)
+        return stale
+
+    def get_stats(self):
+        return {
+            "stale_tracked": len(self._arrivals),
+            "stale_scheduled": len(self._heap),
+            "stale_fired": self.fired,
+            "stale_recovered": self.recovered
+        }
@@ -0,0 +1,171 @@
+import json
+import logging
+from typing import Any, Optional
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_LOGGER = logging.getLogger(__name__)
+
+class KnxTelegram:
+    """
+    The fields of a KNX telegram that the pipeline reads.
+
+    `payload` is the raw KNX payload (an int for values of up to 6 bits, a
+    list of bytes otherwise). When msgspec is installed, FrameDecoder returns
+    an equivalent slotted msgspec Struct with the same attribute names instead
+    of this class, so consumers must only rely on attribute access.
+    """
+    __slots__ = ("destination", "source", "value", "payload", "telegramtype", "direction")
+
+    def __init__(self, destination=None, source=None, value=None, payload=None,
+                 telegramtype=None, direction=None):
+        self.destination = destination
+        self.source = source
+        self.value = value
+        self.payload = payload
+        self.telegramtype = telegramtype
+        self.direction = direction
+
+    @classmethod
+    def from_event_data(cls, data):
+        """Builds a telegram from the data dict of a knx_event."""
+        if not isinstance(data, dict):
+            return cls()
+        return cls(
+            data.get("destination"),
+            data.get("source"),
+            data.get("value"),
+            data.get("data"),
+            data.get("telegramtype"),
+            data.get("direction")
+        )
+
+    @classmethod
+    def from_event(cls, event):
+        """Builds a telegram from a knx_event dict ({"data": {...}})."""
+        return cls.from_event_data(event.get("data"))
+
+    @classmethod
+    def from_telegram_dict(cls, data):
+        """
+        Builds a telegram from a knx/subscribe_telegrams event, which carries
+        the raw payload under "payload".
+        """
+        if not isinstance(data, dict):
+            return cls()
+        return cls(
+            data.get("destination"),
+            data.get("source"),
+            data.get("value"),
+            data.get("payload"),
+            data.get("telegramtype"),
+            data.get("direction")
+        )
+
+if msgspec is not None:
+    class _TelegramStruct(msgspec.Struct, gc=False):
+        destination: Optional[str] = None
+        source: Optional[str] = None
+        value: Any = None
+        payload: Any = msgspec.field(default=None, name="data")
+        telegramtype: Optional[str] = None
+        direction: Optional[str] = None
+
+    class _EventStruct(msgspec.Struct):
+        data: Optional[_TelegramStruct] = None
+
+    class _FrameStruct(msgspec.Struct):
+        type: str = ""
+        id: Optional[int] = None
+        event: Optional[_EventStruct] = None
+
+    # knx/subscribe_telegrams sends the telegram itself as the event
+    class _BusTelegramStruct(msgspec.Struct, gc=False):
+        destination: Optional[str] = None
+        source: Optional[str] = None
+        value: Any = None
+        payload: Any = None
+        telegramtype: Optional[str] = None
+        direction: Optional[str] = None
+
+    class _TelegramFrameStruct(msgspec.Struct):
+        type: str = ""
+        id: Optional[int] = None
+        event: Optional[_BusTelegramStruct] = None
+
+# Event frame formats understood by FrameDecoder
+SUBSCRIPTIONS = ("knx_event", "telegrams")
+
+class FrameDecoder:
+    """
+    Decodes Home Assistant WebSocket frames.
+
+    Event frames are reduced to a telegram without materialising the rest of
+    the frame (context, origin, time_fired, ...). The fastest available
+    backend is used: msgspec typed structs, then orjson, then stdlib json.
+
+    `subscription` selects the event format: "knx_event" for the HA event
+    bus or "telegrams" for the KNX integration's knx/subscribe_telegrams.
+    """
+    def __init__(self, backend=None, subscription="knx_event"):
+        if subscription not in SUBSCRIPTIONS:
+            raise ValueError(f"Unknown subscription: {subscription}")
+        self.subscription = subscription
+        if backend is None:
+            backend = "msgspec" if msgspec else "orjson" if orjson else "json"
+        if backend == "msgspec" and msgspec is None or backend == "orjson" and orjson is None:
+            raise ValueError(f"JSON backend '{backend}' is not installed")
+        self.backend = backend
+        if backend == "msgspec":
+            frame_type = _FrameStruct if subscription == "knx_event" else _TelegramFrameStruct
+            self._typed = msgspec.json.Decoder(frame_type)
+            self._loads = msgspec.json.decode
+        elif backend == "orjson":
+            self._loads = orjson.loads
+        else:
+            self._loads = json.loads
+        _LOGGER.debug(f"Decoding WebSocket frames with {backend}")
+
+    def loads(self, raw):
+        """Decodes a whole frame into Python objects."""
+        return self._loads(raw)
+
+    def decode(self, raw):
+        """
+        Returns (type, id, telegram, message). For event frames `telegram` is
+        set and `message` is None; for any other frame `message` holds the
+        fully decoded dict.
+        """
+        if self.backend == "msgspec":
+            try:
+                frame = self._typed.decode(raw)
+            except msgspec.ValidationError:
+                # Unexpected shape; fall back to the generic path below
+                pass
+            else:
+                if frame.type != "event":
+                    return frame.type, frame.id, None, self._loads(raw)
+                event = frame.event
+                if self.subscription == "telegrams":
+                    telegram = event if event is not None else KnxTelegram()
+                else:
+                    telegram = event.data if event is not None and event.data is not None else KnxTelegram()
+                return frame.type, frame.id, telegram, None
+
+        message = self._loads(raw)
+        msg_type = message.get("type")
+        if msg_type != "event":
+            return msg_type, message.get("id"), None, message
+        event = message.get("event")
+        if self.subscription == "telegrams":
+            return msg_type, message.get("id"), KnxTelegram.from_telegram_dict(event), None
+        data = event.get("data") if isinstance(event, dict) else None
+        return msg_type, message.get("id"), KnxTelegram.from_event_data(data), None
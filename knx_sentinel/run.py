@@ -8,7 +8,15 @@ from knx_sentinel.bus_monitor import BusLoadMonitor
 from knx_sentinel.anomaly_engine import AnomalyEngine
 from knx_sentinel.autoconfig import AutoConfigurator
 from knx_sentinel.autoconfig import AutoConfigurator
-from knx_sentinel.egress import InfluxDBProvider, MQTTProvider
+from knx_sentinel.egress import InfluxDBProvider, MQTTProvider, AsyncMQTTProvider, FanoutEgress
+from knx_sentinel.pipeline import EventPipeline
+from knx_sentinel.snapshot import encode_snapshot, write_snapshot, load_snapshot
+from knx_sentinel.spool import DiskSpool, SpoolDrainer
+from knx_sentinel.capture import CaptureWriter
+from knx_sentinel.downsample import Downsampler
+from knx_sentinel.diagnostics import SolarMonitor
+from knx_sentinel.stale import StaleMonitor
+from knx_sentinel.compression import ValueCompressor
 from knx_sentinel.web import WebServer
 import json
 
@@ -33,19 +41,81 @@ def load_config():
                 
                 # Map options to internal structure
                 config = {
+                    "ha_url": "ws://supervisor/core/websocket",
                     "client_id": options.get("client_id", "default_client"),
                     "site_id": options.get("site_id", "default_site"),
                     "mode": options.get("mode", "influxdb_cloud"),
+                    "egress_queue_size": options.get("egress_queue_size", 10000),
+                    "autodiscovery": {
+                        "enabled": options.get("autodiscovery", True),
+                        "exclude_entities": options.get("exclude_entities", []),
+                        "cache_path": "/data/autoconfig.json"
+                    },
                     "influxdb": {
                         "host": options.get("influxdb", {}).get("host"),
                         "token": options.get("influxdb", {}).get("token"),
                         "org": options.get("influxdb", {}).get("org"),
-                        "bucket": options.get("influxdb", {}).get("bucket")
+                        "bucket": options.get("influxdb", {}).get("bucket"),
+                        "batch_size": options.get("influxdb", {}).get("batch_size", 500),
+                        "flush_interval": options.get("influxdb", {}).get("flush_interval", 5)
                     },
                     "mqtt": {
                         "broker": options.get("mqtt", {}).get("broker"),
                         "port": options.get("mqtt", {}).get("port", 1883),
-                        "topic_prefix": options.get("mqtt", {}).get("topic_prefix", "knx")
+                        "topic_prefix": options.get("mqtt", {}).get("topic_prefix", "knx"),
+                        "username": options.get("mqtt", {}).get("username"),
+                        "password": options.get("mqtt", {}).get("password"),
+                        "client": options.get("mqtt", {}).get("client", "native"),
+                        "qos": options.get("mqtt", {}).get("qos", 1),
+                        "encoding": options.get("mqtt", {}).get("encoding", "json"),
+                        "batch_size": options.get("mqtt", {}).get("batch_size", 0),
+                        "batch_interval": options.get("mqtt", {}).get("batch_interval", 1)
+                    },
+                    "anomaly_detection": {
+                        "sensors": options.get("anomaly_detection", {}).get("sensors", []),
+                        "max_sensors": options.get("anomaly_detection", {}).get("max_sensors", 5000),
+                        "idle_ttl": options.get("anomaly_detection", {}).get("idle_ttl", 86400)
+                    },
+                    "top_talkers": options.get("top_talkers", 10),
+                    "bus_load_alarm_pct": options.get("bus_load_alarm_pct", 60),
+                    "snapshot": {
+                        "path": "/data/anomaly_state.bin",
+                        "interval": options.get("snapshot_interval", 300)
+                    },
+                    "ingest": {
+                        "queue_size": options.get("ingest", {}).get("queue_size", 1000),
+                        "workers": options.get("ingest", {}).get("workers", 4),
+                        "policy": options.get("ingest", {}).get("policy", "block"),
+                        "subscription": options.get("ingest", {}).get("subscription", "knx_event")
+                    },
+                    "spool": {
+                        "path": "/data/spool",
+                        "quota_mb": options.get("spool_quota_mb", 256)
+                    },
+                    "capture": {
+                        "enabled": options.get("capture", {}).get("enabled", False),
+                        "path": "/data/capture",
+                        "quota_mb": options.get("capture", {}).get("quota_mb", 512)
+                    },
+                    "downsample": {
+                        "enabled": options.get("downsample", {}).get("enabled", False),
+                        "interval": options.get("downsample", {}).get("interval", 60)
+                    },
+                    "stale_detection": {
+                        "enabled": options.get("stale_detection", {}).get("enabled", True),
+                        "factor": options.get("stale_detection", {}).get("factor", 3),
+                        "min_timeout": options.get("stale_detection", {}).get("min_timeout", 300)
+                    },
+                    "solar_check": {
+                        "enabled": options.get("solar_check", {}).get("enabled", True),
+                        "interval": options.get("solar_check", {}).get("interval", 300)
+                    },
+                    "raw_values": {
+                        "enabled": options.get("raw_values", {}).get("enabled", False),
+                        "compression": options.get("raw_values", {}).get("compression", "swinging_door"),
+                        "deviation": options.get("raw_values", {}).get("deviation", 0.1),
+                        "deviation_pct": options.get("raw_values", {}).get("deviation_pct", 0),
+                        "max_interval": options.get("raw_values", {}).get("max_interval", 900)
                     }
                 }
         except Exception as e:
@@ -54,92 +124,259 @@ def load_config():
     else:
         _LOGGER.info("Using environment variables for configuration")
         config = {
+            "ha_url": os.getenv("HA_WEBSOCKET_URL", "ws://supervisor/core/websocket"),
             "client_id": os.getenv("CLIENT_ID", "default_client"),
             "site_id": os.getenv("SITE_ID", "default_site"),
             "mode": os.getenv("EGRESS_MODE", "influxdb"),
+            "egress_queue_size": int(os.getenv("EGRESS_QUEUE_SIZE", 10000)),
+            "autodiscovery": {
+                "enabled": os.getenv("AUTODISCOVERY", "true").lower() == "true",
+                "exclude_entities": [e for e in os.getenv("EXCLUDE_ENTITIES", "").split(",") if e],
+                "cache_path": os.getenv("AUTOCONFIG_CACHE", "/data/autoconfig.json")
+            },
             "influxdb": {
                 "host": os.getenv("INFLUX_HOST", "http://localhost:8086"),
                 "token": os.getenv("INFLUX_TOKEN", "token"),
                 "org": os.getenv("INFLUX_ORG", "org"),
-                "bucket": os.getenv("INFLUX_BUCKET", "bucket")
+                "bucket": os.getenv("INFLUX_BUCKET", "bucket"),
+                "batch_size": int(os.getenv("INFLUX_BATCH_SIZE", 500)),
+                "flush_interval": float(os.getenv("INFLUX_FLUSH_INTERVAL", 5))
             },
             "mqtt": {
                 "broker": os.getenv("MQTT_BROKER", "localhost"),
                 "port": int(os.getenv("MQTT_PORT", 1883)),
-                "topic_prefix": os.getenv("MQTT_PREFIX", "knx")
+                "topic_prefix": os.getenv("MQTT_PREFIX", "knx"),
+                "username": os.getenv("MQTT_USERNAME"),
+                "password": os.getenv("MQTT_PASSWORD"),
+                "client": os.getenv("MQTT_CLIENT", "native"),
+                "qos": int(os.getenv("MQTT_QOS", 1)),
+                "encoding": os.getenv("MQTT_ENCODING", "json"),
+                "batch_size": int(os.getenv("MQTT_BATCH_SIZE", 0)),
+                "batch_interval": float(os.getenv("MQTT_BATCH_INTERVAL", 1))
+            },
+            "anomaly_detection": {
+                "sensors": [],
+                "max_sensors": int(os.getenv("ANOMALY_MAX_SENSORS", 5000)),
+                "idle_ttl": int(os.getenv("ANOMALY_IDLE_TTL", 86400))
+            },
+            "top_talkers": int(os.getenv("TOP_TALKERS", 10)),
+            "bus_load_alarm_pct": float(os.getenv("BUS_LOAD_ALARM_PCT", 60)),
+            "snapshot": {
+                "path": os.getenv("SNAPSHOT_PATH", "/data/anomaly_state.bin"),
+                "interval": int(os.getenv("SNAPSHOT_INTERVAL", 300))
+            },
+            "ingest": {
+                "queue_size": int(os.getenv("INGEST_QUEUE_SIZE", 1000)),
+                "workers": int(os.getenv("INGEST_WORKERS", 4)),
+                "policy": os.getenv("INGEST_POLICY", "block"),
+                "subscription": os.getenv("INGEST_SUBSCRIPTION", "knx_event")
+            },
+            "spool": {
+                "path": os.getenv("SPOOL_PATH", "/data/spool"),
+                "quota_mb": int(os.getenv("SPOOL_QUOTA_MB", 256))
+            },
+            "capture": {
+                "enabled": os.getenv("CAPTURE_ENABLED", "false").lower() == "true",
+                "path": os.getenv("CAPTURE_PATH", "/data/capture"),
+                "quota_mb": int(os.getenv("CAPTURE_QUOTA_MB", 512))
+            },
+            "downsample": {
+                "enabled": os.getenv("DOWNSAMPLE_ENABLED", "false").lower() == "true",
+                "interval": int(os.getenv("DOWNSAMPLE_INTERVAL", 60))
+            },
+            "stale_detection": {
+                "enabled": os.getenv("STALE_DETECTION_ENABLED", "true").lower() == "true",
+                "factor": float(os.getenv("STALE_FACTOR", 3)),
+                "min_timeout": int(os.getenv("STALE_MIN_TIMEOUT", 300))
+            },
+            "solar_check": {
+                "enabled": os.getenv("SOLAR_CHECK_ENABLED", "true").lower() == "true",
+                "interval": int(os.getenv("SOLAR_CHECK_INTERVAL", 300))
+            },
+            "raw_values": {
+                "enabled": os.getenv("RAW_VALUES_ENABLED", "false").lower() == "true",
+                "compression": os.getenv("RAW_VALUES_COMPRESSION", "swinging_door"),
+                "deviation": float(os.getenv("RAW_VALUES_DEVIATION", 0.1)),
+                "deviation_pct": float(os.getenv("RAW_VALUES_DEVIATION_PCT", 0)),
+                "max_interval": float(os.getenv("RAW_VALUES_MAX_INTERVAL", 900))
             }
         }
     return config
 
-async def main():
+async def main(config=None, stop_event=None, on_ready=None):
+    """
+    Runs the add-on until stop_event is set or a signal is received.
+
+    `config` replaces load_config() and `on_ready` is called with the wired
+    components before the client starts; both are used by the benchmarks.
+    """
     _LOGGER.info("Starting KNX Sentinel...")
     
-    config = load_config()
+    if config is None:
+        config = load_config()
     
-    # Initialize Egress
-    if config["mode"] == "mqtt":
-        egress = MQTTProvider(
-            config["mqtt"]["broker"], 
-            config["mqtt"]["port"], 
-            config["mqtt"]["topic_prefix"]
-        )
-        await egress.start()
+    # Initialize Egress: "mode" names one sink or a comma-separated list
+    sink_names = []
+    for mode in config["mode"].split(","):
+        name = "mqtt" if mode.strip() == "mqtt" else "influxdb"
+        if name not in sink_names:
+            sink_names.append(name)
+    
+    sinks = {}
+    spools = []
+    drainers = []
+    for name in sink_names:
+        # Spool for metrics that cannot be delivered while the backend is down
+        spool = None
+        if config["spool"]["quota_mb"] > 0:
+            spool_path = config["spool"]["path"]
+            if len(sink_names) > 1:
+                spool_path = os.path.join(spool_path, name)
+            try:
+                spool = DiskSpool(spool_path, quota_bytes=config["spool"]["quota_mb"] * 2**20)
+                spools.append(spool)
+            except OSError as e:
+                _LOGGER.error(f"Egress spool disabled for {name}: {e}")
+        
+        if name == "mqtt" and config["mqtt"].get("client", "native") == "paho":
+            sink = MQTTProvider(
+                config["mqtt"]["broker"], 
+                config["mqtt"]["port"], 
+                config["mqtt"]["topic_prefix"],
+                spool=spool
+            )
+        elif name == "mqtt":
+            sink = AsyncMQTTProvider(
+                config["mqtt"]["broker"],
+                config["mqtt"]["port"],
+                config["mqtt"]["topic_prefix"],
+                username=config["mqtt"].get("username"),
+                password=config["mqtt"].get("password"),
+                qos=config["mqtt"].get("qos", 1),
+                encoding=config["mqtt"].get("encoding", "json"),
+                batch_size=config["mqtt"].get("batch_size", 0),
+                batch_interval=config["mqtt"].get("batch_interval", 1),
+                spool=spool
+            )
+        else:
+            sink = InfluxDBProvider(
+                config["influxdb"]["host"],
+                config["influxdb"]["token"],
+                config["influxdb"]["org"],
+                config["influxdb"]["bucket"],
+                batch_size=config["influxdb"]["batch_size"],
+                flush_interval=config["influxdb"]["flush_interval"],
+                spool=spool
+            )
+        await sink.start()
+        sinks[name] = sink
+        
+        if spool is not None:
+            drainer = SpoolDrainer(spool, sink.replay_records)
+            drainer.start()
+            drainers.append(drainer)
+    
+    if len(sinks) == 1:
+        egress = sinks[sink_names[0]]
     else:
-        egress = InfluxDBProvider(
-            config["influxdb"]["host"],
-            config["influxdb"]["token"],
-            config["influxdb"]["org"],
-            config["influxdb"]["bucket"]
-        )
+        # Independent queue and worker per sink so a slow one cannot stall the others
+        egress = FanoutEgress(sinks, queue_size=config["egress_queue_size"])
+        await egress.start()
 
     # Initialize Components
-    bus_monitor = BusLoadMonitor()
-    anomaly_engine = AnomalyEngine()
-    client = HAWebSocketClient()
-    autoconfig = AutoConfigurator(client)
+    # Raw telegram capture for offline replay (python -m knx_sentinel.capture)
+    capture = None
+    if config["capture"]["enabled"]:
+        try:
+            capture = CaptureWriter(config["capture"]["path"], quota_bytes=config["capture"]["quota_mb"] * 2**20)
+            _LOGGER.info(f"Capturing telegrams to {config['capture']['path']}")
+        except OSError as e:
+            _LOGGER.error(f"Telegram capture disabled: {e}")
+    
+    bus_monitor = BusLoadMonitor(alarm_threshold=config["bus_load_alarm_pct"])
+    anomaly_engine = AnomalyEngine(config["anomaly_detection"])
+    client = HAWebSocketClient(
+        config["ha_url"],
+        queue_size=config["ingest"]["queue_size"],
+        workers=config["ingest"]["workers"],
+        overflow_policy=config["ingest"]["policy"],
+        subscription=config["ingest"]["subscription"],
+        capture=capture
+    )
+    # Configured sensors are pinned; auto-registered ones may be evicted
+    profiles = {}
+    for sensor in config["anomaly_detection"]["sensors"]:
+        profile = {k: v for k, v in sensor.items() if k != "entity_id" and v is not None}
+        profiles[sensor["entity_id"]] = profile
+        anomaly_engine.register_sensor(sensor["entity_id"], profile, pinned=True)
+    
+    # Group address -> entity/profile index from the HA entity registry
+    autoconfig = None
+    if config["autodiscovery"]["enabled"]:
+        autoconfig = AutoConfigurator(client, config["autodiscovery"]["cache_path"],
+                                      exclude_entities=config["autodiscovery"]["exclude_entities"],
+                                      anomaly_engine=anomaly_engine, profiles=profiles)
     web_server = WebServer(config)
     
+    # Discovered sensors must be registered (pinned) before their state is restored
+    if autoconfig:
+        autoconfig.preload()
+    
+    # Warm start from the last snapshot so detection resumes immediately
+    snapshot_path = config["snapshot"]["path"]
+    try:
+        restored = load_snapshot(anomaly_engine, snapshot_path)
+        _LOGGER.info(f"Restored anomaly state for {restored} sensors from {snapshot_path}")
+    except Exception as e:
+        _LOGGER.error(f"Failed to restore anomaly state: {e}")
+    
     # Common Tags
     common_tags = {
         "client_id": config["client_id"],
         "site_id": config["site_id"]
     }
     
-    # Define Event Callback
-    async def handle_event(event):
-        # 1. Bus Load Counting
-        await bus_monitor.process_event(event)
-        
-        # 2. Anomaly Detection
-        data = event.get("data", {})
-        destination = data.get("destination") # Group Address
-        value = data.get("value")
-        
-        if destination and value is not None:
-            # Mock mapping: use destination as entity_id for now
-            entity_id = f"sensor.knx_{destination.replace('/', '_')}"
-            
-            # Auto-register if new (simple heuristic)
-            anomaly_engine.register_sensor(entity_id)
-            
-            anomaly = anomaly_engine.process_value(entity_id, value)
-            if anomaly:
-                # Egress Anomaly
-                tags = common_tags.copy()
-                tags["entity_id"] = entity_id
-                tags["type"] = "anomaly"
-                fields = {
-                    "value": float(value),
-                    "z_score": anomaly.get("z_score", 0.0),
-                    "threshold": anomaly.get("threshold", 0.0)
-                }
-                await egress.send_metric("knx_diagnostics", tags, fields)
+    # Per-entity value history, written once per interval
+    downsampler = None
+    if config["downsample"]["enabled"]:
+        downsampler = Downsampler(egress, config["downsample"]["interval"])
+        downsampler.start()
+    
+    # Raw values, compressed per entity (profile keys override the defaults)
+    compressor = None
+    if config["raw_values"]["enabled"]:
+        compressor = ValueCompressor(egress, config["raw_values"])
+    
+    # Sensors that stop sending, from learned send intervals
+    stale_monitor = None
+    if config["stale_detection"]["enabled"]:
+        stale_monitor = StaleMonitor(egress, common_tags, factor=config["stale_detection"]["factor"],
+                                     min_timeout=config["stale_detection"]["min_timeout"])
+        anomaly_engine.eviction_listeners.append(stale_monitor.forget)
+        stale_monitor.start()
+    
+    # Per-telegram processing
+    pipeline = EventPipeline(bus_monitor, anomaly_engine, egress, common_tags,
+                             resolver=autoconfig.resolve if autoconfig else None,
+                             downsampler=downsampler, compressor=compressor,
+                             stale_monitor=stale_monitor)
+    if autoconfig:
+        # Re-resolve addresses whose mapping changes
+        autoconfig.listeners.append(pipeline.routes.invalidate)
+    
+    # Illuminance sensors are checked against the sun on a timer, not per telegram
+    solar_monitor = None
+    if config["solar_check"]["enabled"]:
+        solar_monitor = SolarMonitor(anomaly_engine, egress, common_tags, ha_client=client,
+                                     interval=config["solar_check"]["interval"])
+        solar_monitor.start()
 
-    client.set_callback(handle_event)
+    client.set_callback(pipeline.handle_telegram)
     
     # Setup Signal Handling
     loop = asyncio.get_running_loop()
-    stop_event = asyncio.Event()
+    if stop_event is None:
+        stop_event = asyncio.Event()
     
     def signal_handler():
         _LOGGER.info("Signal received, stopping...")
@@ -148,8 +385,21 @@ async def main():
     for sig in (signal.SIGTERM, signal.SIGINT):
         loop.add_signal_handler(sig, signal_handler)
         
+    if on_ready:
+        on_ready({
+            "client": client,
+            "pipeline": pipeline,
+            "bus_monitor": bus_monitor,
+            "anomaly_engine": anomaly_engine,
+            "egress": egress,
+            "downsampler": downsampler,
+            "autoconfig": autoconfig
+        })
+    
     # Start Client Task
     client_task = asyncio.create_task(client.start())
+    # Discovery needs the connection, so it runs alongside ingest
+    discovery_task = asyncio.create_task(autoconfig.start()) if autoconfig else None
     
     # Start Web Server
     await web_server.start()
@@ -161,15 +411,66 @@ async def main():
                 await asyncio.sleep(60)
                 
                 # 1. Bus Load
-                count = await bus_monitor.get_and_reset()
-                _LOGGER.info(f"Bus Load: {count} telegrams/min")
+                count = bus_monitor.get_and_reset()
+                rates = bus_monitor.get_rates()
+                _LOGGER.info(f"Bus Load: {count} telegrams/min, peak {rates['peak_per_sec']} telegrams/s")
                 
                 tags = common_tags.copy()
                 tags["metric_type"] = "bus_load"
                 fields = {"telegrams_per_min": count}
+                fields.update(rates)
                 await egress.send_metric("knx_metrics", tags, fields)
                 
-                # 2. Heartbeat
+                if rates["overload_seconds"]:
+                    _LOGGER.warning(f"Bus overload: {rates['overload_seconds']}s above {config['bus_load_alarm_pct']}% of line capacity")
+                    alarm_tags = common_tags.copy()
+                    alarm_tags["type"] = "diagnostic"
+                    alarm_tags["subtype"] = "bus_overload"
+                    alarm_fields = {
+                        "overload_seconds": rates["overload_seconds"],
+                        "peak_utilisation_pct": rates["peak_utilisation_pct"],
+                        "threshold": float(config["bus_load_alarm_pct"])
+                    }
+                    await egress.send_metric("knx_diagnostics", alarm_tags, alarm_fields)
+                
+                # Top talkers behind the load
+                for role, talkers in bus_monitor.get_top_talkers(config["top_talkers"]).items():
+                    for rank, (address, telegrams, error) in enumerate(talkers, 1):
+                        talker_tags = common_tags.copy()
+                        talker_tags["metric_type"] = "top_talker"
+                        talker_tags["role"] = role
+                        talker_tags["address"] = address
+                        talker_fields = {"telegrams": telegrams, "error": error, "rank": rank}
+                        await egress.send_metric("knx_metrics", talker_tags, talker_fields)
+                
+                # 2. Sensor Registry
+                anomaly_engine.evict_idle()
+                reg_tags = common_tags.copy()
+                reg_tags["metric_type"] = "sensor_registry"
+                reg_fields = anomaly_engine.get_stats()
+                reg_fields.update(pipeline.routes.get_stats())
+                if compressor:
+                    reg_fields.update(compressor.get_stats())
+                if solar_monitor:
+                    reg_fields.update(solar_monitor.get_stats())
+                if stale_monitor:
+                    reg_fields.update(stale_monitor.get_stats())
+                await egress.send_metric("knx_metrics", reg_tags, reg_fields)
+                
+                # 3. Ingest Queue
+                queue_tags = common_tags.copy()
+                queue_tags["metric_type"] = "ingest_queue"
+                await egress.send_metric("knx_metrics", queue_tags, client.get_queue_stats())
+                
+                # Per-sink egress queues
+                if isinstance(egress, FanoutEgress):
+                    for name, sink_stats in egress.get_stats().items():
+                        sink_tags = common_tags.copy()
+                        sink_tags["metric_type"] = "egress_sink"
+                        sink_tags["sink"] = name
+                        await egress.send_metric("knx_metrics", sink_tags, sink_stats)
+                
+                # 4. Heartbeat
                 hb_tags = common_tags.copy()
                 hb_tags["metric_type"] = "heartbeat"
                 await egress.send_metric("agent_status", hb_tags, {"online": 1})
@@ -181,20 +482,57 @@ async def main():
 
     agg_task = asyncio.create_task(aggregation_loop())
     
+    async def save_state():
+        # Encode on the loop for a consistent view, write in the executor
+        data = encode_snapshot(anomaly_engine)
+        try:
+            await loop.run_in_executor(None, write_snapshot, snapshot_path, data)
+        except OSError as e:
+            _LOGGER.error(f"Failed to write anomaly snapshot: {e}")
+    
+    # Start Snapshot Loop (Background Task)
+    async def snapshot_loop():
+        while not stop_event.is_set():
+            try:
+                await asyncio.sleep(config["snapshot"]["interval"])
+                await save_state()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                _LOGGER.error(f"Error in snapshot loop: {e}")
+    
+    snapshot_task = asyncio.create_task(snapshot_loop())
+    
     # Wait for stop signal
     await stop_event.wait()
     
-    # Shutdown
+    # Shutdown: stop ingest first and let the workers finish queued telegrams
     agg_task.cancel()
+    snapshot_task.cancel()
+    if discovery_task:
+        discovery_task.cancel()
+    await client.stop()
+    if capture:
+        capture.close()
+    # Then persist state and flush everything still headed for egress
+    await save_state()
+    if solar_monitor:
+        await solar_monitor.stop()
+    if stale_monitor:
+        await stale_monitor.stop()
+    if downsampler:
+        await downsampler.stop()
+    for drainer in drainers:
+        await drainer.stop()
     if hasattr(egress, "stop"):
         await egress.stop()
+    for spool in spools:
+        spool.close()
     await web_server.stop()
-    await client.stop()
-    try:
-        await client_task
-        await agg_task
-    except asyncio.CancelledError:
-        pass
+    tasks = [client_task, agg_task, snapshot_task]
+    if discovery_task:
+        tasks.append(discovery_task)
+    await asyncio.gather(*tasks, return_exceptions=True)
         
     _LOGGER.info("KNX Sentinel stopped.")
 
@@ -0,0 +1,178 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from unittest.mock import AsyncMock
+from knx_sentinel.anomaly_engine import AnomalyEngine
+from knx_sentinel.autoconfig import AutoConfigurator, group_addresses
+from knx_sentinel.bus_monitor import BusLoadMonitor
+from knx_sentinel.detectors import RangeDetector, ZScoreDetector
+from knx_sentinel.ha_client import HAWebSocketClient
+from knx_sentinel.pipeline import EventPipeline
+from knx_sentinel.simulator import HASimulator
+from knx_sentinel.snapshot import load_snapshot, save_snapshot
+
+REGISTRY = [
+    {"entity_id": "sensor.office_temperature", "platform": "knx", "unique_id": "1/2/3"},
+    {"entity_id": "sensor.mains_voltage", "platform": "knx", "unique_id": "1/2/4"},
+    {"entity_id": "climate.office", "platform": "knx", "unique_id": "1/2/3_1/2/5"},
+    {"entity_id": "sensor.hue_temperature", "platform": "hue", "unique_id": "abc"}
+]
+STATES = [
+    {"entity_id": "sensor.office_temperature", "state": "21.5",
+     "attributes": {"device_class": "temperature", "unit_of_measurement": "°C"}},
+    {"entity_id": "sensor.mains_voltage", "state": "230", "attributes": {"device_class": "voltage"}},
+    {"entity_id": "climate.office", "state": "heat", "attributes": {}}
+]
+
+class TestAutoConfigurator(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.simulator = HASimulator(count=0, token="test_token", states=STATES,
+                                     entity_registry=[dict(e) for e in REGISTRY])
+        await self.simulator.start()
+        self.client = HAWebSocketClient(self.simulator.url, token="test_token")
+        self.client.set_callback(lambda telegram: None)
+        self.client_task = asyncio.create_task(self.client.start())
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, "autoconfig.json")
+
+    async def asyncTearDown(self):
+        await self.client.stop()
+        await self.client_task
+        await self.simulator.stop()
+        self.tmp.cleanup()
+
+    def test_group_addresses(self):
+        self.assertEqual(group_addresses("1/2/3_1/2/5"), ["1/2/3", "1/2/5"])
+        self.assertEqual(group_addresses("knx_es_01H"), [])
+        self.assertEqual(group_addresses(None), [])
+
+    async def test_discover_and_resolve(self):
+        autoconfig = AutoConfigurator(self.client, self.cache_path)
+        invalidated = []
+        autoconfig.listeners.append(invalidated.append)
+        entities = await autoconfig.discover_entities()
+
+        self.assertEqual({e["entity_id"] for e in entities},
+                         {"sensor.office_temperature", "sensor.mains_voltage", "climate.office"})
+        # The sensor whose unique_id is the address wins over the climate entity
+        self.assertEqual(autoconfig.resolve("1/2/3"),
+                         ("sensor.office_temperature", {"method": "z_score", "threshold": 3.0}))
+        self.assertEqual(autoconfig.resolve("1/2/4")[1]["method"], "range")
+        self.assertEqual(autoconfig.resolve("1/2/5"), ("climate.office", None))
+        self.assertEqual(autoconfig.resolve("9/9/9"), ("sensor.knx_9_9_9", None))
+        self.assertEqual(sorted(invalidated), ["1/2/3", "1/2/4", "1/2/5"])
+
+    async def test_cache_skips_fetch(self):
+        await AutoConfigurator(self.client, self.cache_path).discover_entities()
+        self.assertEqual(self.simulator.commands.count("get_states"), 1)
+
+        autoconfig = AutoConfigurator(self.client, self.cache_path)
+        await autoconfig.discover_entities()
+        self.assertEqual(self.simulator.commands.count("get_states"), 1)
+        self.assertEqual(autoconfig.resolve("1/2/4")[0], "sensor.mains_voltage")
+
+        # A stale cache is refetched
+        await AutoConfigurator(self.client, self.cache_path, cache_max_age=-1).discover_entities()
+        self.assertEqual(self.simulator.commands.count("get_states"), 2)
+
+    async def test_restart_restores_discovered_sensors(self):
+        engine = AnomalyEngine()
+        autoconfig = AutoConfigurator(self.client, self.cache_path, anomaly_engine=engine)
+        await autoconfig.discover_entities()
+        self.assertTrue(engine.sensors["sensor.office_temperature"].pinned)
+        self.assertTrue(engine.sensors["sensor.mains_voltage"].pinned)
+        self.assertNotIn("climate.office", engine.sensors)
+        for i in range(40):
+            engine.process_value("sensor.office_temperature", 21 + (i % 3) * 0.1)
+        snapshot_path = os.path.join(self.tmp.name, "anomaly_state.bin")
+        save_snapshot(engine, snapshot_path)
+
+        # On restart the cache is loaded before the snapshot, without Home Assistant
+        restarted = AnomalyEngine()
+        AutoConfigurator(None, self.cache_path, anomaly_engine=restarted).preload()
+        self.assertEqual(load_snapshot(restarted, snapshot_path), 2)
+        self.assertEqual(len(restarted.sensors["sensor.office_temperature"].stats), 40)
+        self.assertTrue(restarted.sensors["sensor.office_temperature"].pinned)
+
+    async def test_start_uses_preloaded_cache(self):
+        await AutoConfigurator(self.client, self.cache_path).discover_entities()
+        autoconfig = AutoConfigurator(self.client, self.cache_path)
+        self.assertTrue(autoconfig.preload())
+        await autoconfig.start()
+        self.assertEqual(self.simulator.commands.count("get_states"), 1)
+        self.assertEqual(autoconfig.resolve("1/2/4")[0], "sensor.mains_voltage")
+
+    async def test_registry_updates(self):
+        autoconfig = AutoConfigurator(self.client, self.cache_path)
+        await autoconfig.start()
+        invalidated = []
+        autoconfig.listeners.append(invalidated.append)
+
+        # Rename and a new entity are fetched one by one
+        self.simulator.entity_registry[1]["entity_id"] = "sensor.supply_voltage"
+        self.simulator.entity_registry.append(
+            {"entity_id": "sensor.office_lux", "platform": "knx", "unique_id": "1/2/6",
+             "original_device_class": "illuminance"})
+        await self.simulator.fire_event("entity_registry_updated", {
+            "action": "update", "entity_id": "sensor.supply_voltage",
+            "old_entity_id": "sensor.mains_voltage", "changes": {"entity_id": "sensor.mains_voltage"}})
+        await self.simulator.fire_event("entity_registry_updated", {
+            "action": "create", "entity_id": "sensor.office_lux"})
+        await self.simulator.fire_event("entity_registry_updated", {
+            "action": "remove", "entity_id": "climate.office"})
+        for _ in range(50):
+            await asyncio.sleep(0.02)
+            if len(invalidated) >= 3:
+                break
+
+        self.assertEqual(autoconfig.resolve("1/2/4")[0], "sensor.supply_voltage")
+        self.assertEqual(autoconfig.resolve("1/2/6"), ("sensor.office_lux", {"method": "solar_check"}))
+        self.assertEqual(autoconfig.resolve("1/2/5"), ("sensor.knx_1_2_5", None))
+        self.assertEqual(self.simulator.commands.count("config/entity_registry/list"), 1)
+        self.assertEqual(sorted(set(invalidated)), ["1/2/3", "1/2/4", "1/2/5", "1/2/6"])
+
+        # The cache reflects the updates
+        cached = AutoConfigurator(self.client, self.cache_path)
+        await cached.discover_entities()
+        self.assertEqual(cached.resolve("1/2/6")[0], "sensor.office_lux")
+
+    async def test_live_update_through_pipeline(self):
+        engine = AnomalyEngine()
+        autoconfig = AutoConfigurator(self.client, self.cache_path, anomaly_engine=engine,
+                                      profiles={"sensor.configured": {"method": "cusum"}})
+        await autoconfig.start()
+        pipeline = EventPipeline(BusLoadMonitor(), engine, AsyncMock(), {"client_id": "c", "site_id": "s"},
+                                 resolver=autoconfig.resolve)
+        autoconfig.listeners.append(pipeline.routes.invalidate)
+
+        async def telegram(destination, value):
+            await pipeline.handle_event({"data": {"destination": destination, "source": "1.1.1", "value": value}})
+
+        await telegram("1/2/3", 21.0)
+        await telegram("1/2/4", 230)
+        self.assertIsInstance(engine.sensors["sensor.office_temperature"].detector, ZScoreDetector)
+
+        # device_class change, removal and a configured entity appearing
+        self.simulator.entity_registry[0]["original_device_class"] = "voltage"
+        self.simulator.entity_registry.append(
+            {"entity_id": "sensor.configured", "platform": "knx", "unique_id": "1/2/7",
+             "original_device_class": "temperature"})
+        await autoconfig.apply_registry_update({"action": "update", "entity_id": "sensor.office_temperature"})
+        await autoconfig.apply_registry_update({"action": "remove", "entity_id": "sensor.mains_voltage"})
+        await autoconfig.apply_registry_update({"action": "create", "entity_id": "sensor.configured"})
+
+        await telegram("1/2/3", 230)
+        state = engine.sensors["sensor.office_temperature"]
+        self.assertIsInstance(state.detector, RangeDetector)
+        self.assertIs(pipeline.routes.routes["1/2/3"].state, state)
+        self.assertEqual(engine.sensors["sensor.configured"].profile, {"method": "cusum"})
+
+        # The removed entity is no longer pinned; its address falls back to a synthetic sensor
+        self.assertNotIn("sensor.mains_voltage", engine.sensors)
+        await telegram("1/2/4", 230)
+        self.assertEqual(pipeline.routes.routes["1/2/4"].entity_id, "sensor.knx_1_2_4")
+        self.assertFalse(engine.sensors["sensor.knx_1_2_4"].pinned)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -45,7 +45,7 @@ class TestHAWebSocketClient(unittest.IsolatedAsyncioTestCase):
             await task
             
             # Verify calls
-            mock_session.ws_connect.assert_called_with(client.url)
+            mock_session.ws_connect.assert_called_with(client.url, max_msg_size=0)
             
             # Verify Auth sent
             mock_ws.send_json.assert_any_call({
@@ -60,6 +60,37 @@ class TestHAWebSocketClient(unittest.IsolatedAsyncioTestCase):
                 "event_type": "knx_event"
             })
 
+    async def test_subscribe_telegrams(self):
+        """Test the knx/subscribe_telegrams subscription mode."""
+        client = HAWebSocketClient(token="test_token", subscription="telegrams")
+        received = []
+        client.set_callback(received.append)
+
+        mock_session = MagicMock()
+        mock_session.close = AsyncMock()
+        mock_ws = AsyncMock()
+        mock_ws.receive_json.side_effect = [
+            {"type": "auth_required"},
+            {"type": "auth_ok"},
+            {"id": 1, "type": "result", "success": True, "result": None}
+        ]
+        mock_ws.__aiter__.return_value = [
+            MagicMock(type=WSMsgType.TEXT, data='{"id": 1, "type": "event", "event": '
+                      '{"destination": "1/2/3", "source": "1.1.5", "payload": 1, "value": true}}')
+        ]
+        mock_session.ws_connect.return_value.__aenter__.return_value = mock_ws
+
+        with patch('aiohttp.ClientSession', return_value=mock_session):
+            task = asyncio.create_task(client.start())
+            await asyncio.sleep(0.1)
+            await client.stop()
+            await task
+
+        mock_ws.send_json.assert_any_call({"id": 1, "type": "knx/subscribe_telegrams"})
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0].destination, "1/2/3")
+        self.assertEqual(received[0].payload, 1)
+
     async def test_backoff_logic(self):
         """Test that the client waits longer after failures."""
         client = HAWebSocketClient()
@@ -89,5 +120,85 @@ class TestHAWebSocketClient(unittest.IsolatedAsyncioTestCase):
             args = [call.args[0] for call in mock_sleep.call_args_list]
             self.assertEqual(args, [1, 2, 4])
 
+    async def test_queue_drop_oldest(self):
+        client = HAWebSocketClient(token="t", queue_size=4, overflow_policy="drop_oldest")
+        client._queue = asyncio.Queue(maxsize=4)
+        for i in range(10):
+            await client._enqueue({"n": i})
+
+        stats = client.get_queue_stats()
+        self.assertEqual(stats["depth"], 4)
+        self.assertEqual(stats["dropped"], 6)
+        self.assertEqual(stats["peak_depth"], 4)
+        queued = [client._queue.get_nowait()["n"] for _ in range(4)]
+        self.assertEqual(queued, [6, 7, 8, 9])
+
+    async def test_queue_sample(self):
+        client = HAWebSocketClient(token="t", queue_size=8, overflow_policy="sample", sample_rate=2)
+        client._queue = asyncio.Queue(maxsize=8)
+        for i in range(12):
+            await client._enqueue({"n": i})
+
+        # Below half full everything is admitted, above it every 2nd event
+        self.assertEqual(client._queue.qsize(), 8)
+        self.assertEqual(client.dropped, 4)
+
+    async def test_workers_decouple_slow_callback(self):
+        release = asyncio.Event()
+        handled = []
+
+        async def slow_callback(event):
+            await release.wait()
+            handled.append(event["n"])
+
+        client = HAWebSocketClient(token="t", queue_size=100, workers=2)
+        client.set_callback(slow_callback)
+        client._queue = asyncio.Queue(maxsize=100)
+        client._workers = [asyncio.create_task(client._worker()) for _ in range(2)]
+
+        # Ingest is not held up by the blocked callbacks
+        for i in range(50):
+            await asyncio.wait_for(client._enqueue({"n": i}), 0.1)
+
+        release.set()
+        await asyncio.wait_for(client._queue.join(), 1)
+        self.assertEqual(sorted(handled), list(range(50)))
+        self.assertEqual(client.processed, 50)
+        for worker in client._workers:
+            worker.cancel()
+
+    async def test_stop_drains_queue(self):
+        handled = []
+
+        async def callback(event):
+            await asyncio.sleep(0.001)
+            handled.append(event["n"])
+
+        client = HAWebSocketClient(token="t", queue_size=100, workers=2)
+        client.set_callback(callback)
+        client._queue = asyncio.Queue(maxsize=100)
+        client._workers = [asyncio.create_task(client._worker()) for _ in range(2)]
+        for i in range(50):
+            await client._enqueue({"n": i})
+
+        await client.stop()
+        self.assertEqual(sorted(handled), list(range(50)))
+        self.assertEqual(client._workers, [])
+
+    async def test_stop_timeout_cancels_workers(self):
+        async def stuck(event):
+            await asyncio.Event().wait()
+
+        client = HAWebSocketClient(token="t", queue_size=10, workers=1)
+        client.set_callback(stuck)
+        client._queue = asyncio.Queue(maxsize=10)
+        workers = client._workers = [asyncio.create_task(client._worker())]
+        await client._enqueue({"n": 1})
+        await client._enqueue({"n": 2})
+
+        with self.assertLogs("knx_sentinel.ha_client", "WARNING"):
+            await client.stop(timeout=0.05)
+        self.assertTrue(workers[0].done())
+
 if __name__ == '__main__':
     unittest.main()
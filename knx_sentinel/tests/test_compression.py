@@ -0,0 +1,79 @@
+import math
+import random
+import unittest
+from unittest.mock import AsyncMock
+from knx_sentinel.anomaly_engine import AnomalyEngine
+from knx_sentinel.bus_monitor import BusLoadMonitor
+from knx_sentinel.compression import DeadbandFilter, SwingingDoorFilter, ValueCompressor
+from knx_sentinel.pipeline import EventPipeline
+from knx_sentinel.telegram import KnxTelegram
+
+def compress(value_filter, series):
+    points = []
+    for t, v in series:
+        points.extend(value_filter.offer(t, v))
+    return points
+
+def interpolate(points, t):
+    for (t0, v0), (t1, v1) in zip(points, points[1:]):
+        if t0 <= t <= t1:
+            return v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+    return None
+
+class TestDeadband(unittest.TestCase):
+    def test_absolute(self):
+        points = compress(DeadbandFilter(0.5), [(0, 20.0), (10, 20.2), (20, 20.6), (30, 20.4), (40, 21.2)])
+        self.assertEqual(points, [(0, 20.0), (20, 20.6), (40, 21.2)])
+
+    def test_percent_and_max_interval(self):
+        value_filter = DeadbandFilter(deviation_pct=10, max_interval=60)
+        points = compress(value_filter, [(0, 100.0), (10, 109.0), (20, 111.0), (50, 111.0), (80, 111.0)])
+        self.assertEqual(points, [(0, 100.0), (20, 111.0), (80, 111.0)])
+
+class TestSwingingDoor(unittest.TestCase):
+    def test_flat_signal(self):
+        points = compress(SwingingDoorFilter(0.1), [(t, 21.0) for t in range(0, 1000, 10)])
+        self.assertEqual(points, [(0, 21.0)])
+
+    def test_ramp_then_flat(self):
+        series = [(t, 20.0 + 0.01 * t) for t in range(0, 500, 10)] + [(t, 25.0) for t in range(500, 1000, 10)]
+        points = compress(SwingingDoorFilter(0.05), series)
+        # Start and the knee; the flat tail is held until the trend changes
+        self.assertEqual(points, [(0, 20.0), (500, 25.0)])
+
+    def test_reconstruction_error(self):
+        rnd = random.Random(3)
+        series = [(t, 21 + 2 * math.sin(t / 300) + rnd.uniform(-0.05, 0.05)) for t in range(0, 3600, 10)]
+        points = compress(SwingingDoorFilter(0.2), series)
+        points.append(series[-1])
+        self.assertLess(len(points), len(series) / 5)
+        for t, v in series:
+            self.assertLessEqual(abs(interpolate(points, t) - v), 0.2 + 1e-9)
+
+    def test_max_interval(self):
+        value_filter = SwingingDoorFilter(0.1, max_interval=100)
+        points = compress(value_filter, [(t, 21.0) for t in range(0, 250, 10)])
+        self.assertEqual([t for t, _ in points], [0, 90, 100, 190, 200])
+
+class TestValueCompressor(unittest.IsolatedAsyncioTestCase):
+    async def test_profile_selects_filter(self):
+        engine = AnomalyEngine({})
+        engine.register_sensor("sensor.knx_1_2_4", {"method": "range", "min": 0, "max": 50,
+                                                    "compression": "none"}, pinned=True)
+        egress = AsyncMock()
+        compressor = ValueCompressor(egress, {"compression": "deadband", "deviation": 1.0})
+        pipeline = EventPipeline(BusLoadMonitor(), engine, egress, {"site_id": "s"},
+                                 compressor=compressor)
+
+        for value in (20.0, 20.5, 21.5, 21.0):
+            await pipeline.handle_telegram(KnxTelegram("1/2/3", "1.1.1", value))
+            await pipeline.handle_telegram(KnxTelegram("1/2/4", "1.1.1", value))
+
+        sent = [(call.args[1]["entity_id"], call.args[2]["value"]) for call in egress.send_metric.call_args_list]
+        self.assertEqual([v for e, v in sent if e == "sensor.knx_1_2_3"], [20.0, 21.5])
+        self.assertEqual([v for e, v in sent if e == "sensor.knx_1_2_4"], [20.0, 20.5, 21.5, 21.0])
+        self.assertEqual(compressor.get_stats(), {"values_received": 8, "values_forwarded": 6})
+        self.assertEqual(egress.send_metric.call_args.args[0], "knx_raw_values")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import random
+from knx_sentinel.anomaly_engine import AnomalyEngine
+from knx_sentinel.detectors import DETECTORS, register_detector, resolve_detector
+
+class TestDetectors(unittest.TestCase):
+    def _feed_drift(self, profile):
+        rng = random.Random(1)
+        engine = AnomalyEngine()
+        engine.register_sensor("sensor.temp", profile)
+        for _ in range(60):
+            self.assertIsNone(engine.process_value("sensor.temp", 21.0 + rng.gauss(0, 0.1)))
+        # Slow creep of 0.01 per sample, well inside the per-sample noise at first
+        for i in range(200):
+            res = engine.process_value("sensor.temp", 21.0 + 0.01 * i + rng.gauss(0, 0.1))
+            if res:
+                return i, res
+        return None, None
+
+    def test_ewma_detects_drift(self):
+        step, res = self._feed_drift({"method": "ewma", "alpha": 0.1, "threshold": 3.0})
+        self.assertIsNotNone(res)
+        self.assertEqual(res["subtype"], "ewma")
+        self.assertGreater(res["ewma"], res["baseline"])
+
+    def test_cusum_detects_drift(self):
+        step, res = self._feed_drift({"method": "cusum", "k": 0.5, "h": 5.0})
+        self.assertIsNotNone(res)
+        self.assertEqual(res["subtype"], "cusum_high")
+
+    def _feed_trend(self, slope_per_hour, hours=6, interval=300, profile=None):
+        """A value every `interval` seconds with 0.1 noise; returns the anomalies."""
+        rng = random.Random(2)
+        engine = AnomalyEngine()
+        engine.register_sensor("sensor.temp", profile or {"method": "trend", "max_slope": 0.3, "window": 24},
+                               now=0)
+        anomalies = []
+        for i in range(hours * 3600 // interval):
+            t = 1_000_000 + i * interval
+            value = 21.0 + slope_per_hour * i * interval / 3600 + rng.gauss(0, 0.1)
+            res = engine.process_value("sensor.temp", value, now=t)
+            if res:
+                anomalies.append((i, res))
+        return anomalies
+
+    def test_trend_detects_creep(self):
+        anomalies = self._feed_trend(0.5)
+        # Reported once, after the window covers min_span
+        self.assertEqual(len(anomalies), 1)
+        step, res = anomalies[0]
+        self.assertGreaterEqual(step, 6)
+        self.assertLess(step, 36)
+        self.assertEqual(res["subtype"], "trend_rising")
+        self.assertAlmostEqual(res["score"], 0.5, delta=0.2)
+
+    def test_trend_fast_cadence(self):
+        # Every 10 s: 60 consecutive values would only span 590 s
+        anomalies = self._feed_trend(3.0, hours=4, interval=10, profile={"method": "trend"})
+        self.assertEqual(len(anomalies), 1)
+        step, res = anomalies[0]
+        self.assertLess(step * 10, 2400)
+        self.assertAlmostEqual(res["score"], 3.0, delta=0.5)
+        self.assertEqual(self._feed_trend(0.0, hours=4, interval=10, profile={"method": "trend"}), [])
+
+    def test_trend_ignores_flat_noise(self):
+        self.assertEqual(self._feed_trend(0.0), [])
+        self.assertEqual(self._feed_trend(-0.1), [])
+
+    def test_stateful_detectors_skip_window(self):
+        engine = AnomalyEngine()
+        engine.register_sensor("sensor.a", {"method": "cusum"})
+        engine.register_sensor("sensor.b", {"method": "range", "max": 5})
+        engine.register_sensor("sensor.c")
+        self.assertIsNone(engine.sensors["sensor.a"].stats)
+        self.assertIsNone(engine.sensors["sensor.b"].stats)
+        self.assertIsNotNone(engine.sensors["sensor.c"].stats)
+        self.assertEqual(engine.process_value("sensor.b", 7)["subtype"], "range_high")
+
+    def test_register_custom_detector(self):
+        @register_detector("always")
+        class AlwaysDetector:
+            uses_window = False
+
+            def __init__(self, profile):
+                self.tag = profile["tag"]
+
+            def __call__(self, entity_id, value, state):
+                return {"type": "anomaly", "subtype": self.tag, "entity_id": entity_id, "value": value}
+
+        try:
+            engine = AnomalyEngine()
+            engine.register_sensor("sensor.x", {"method": "always", "tag": "custom"})
+            self.assertEqual(engine.process_value("sensor.x", 1)["subtype"], "custom")
+        finally:
+            del DETECTORS["always"]
+
+    def test_unknown_method(self):
+        with self.assertLogs("knx_sentinel.detectors", level="WARNING"):
+            self.assertIsNone(resolve_detector({"method": "does_not_exist"}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+from knx_sentinel.anomaly_engine import AnomalyEngine
+from knx_sentinel.diagnostics import DiagnosticsEngine, SolarMonitor
+from knx_sentinel.ha_client import HAWebSocketClient
+from knx_sentinel.simulator import HASimulator
+
+NOON = datetime(2024, 3, 20, 12, 0, tzinfo=timezone.utc)
+
+class TestSolarMonitor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.engine = AnomalyEngine({})
+        self.egress = AsyncMock()
+        for entity_id in ("sensor.lux_roof", "sensor.lux_facade", "sensor.lux_stale"):
+            self.engine.register_sensor(entity_id, {"method": "solar_check"}, pinned=True, now=0)
+        self.engine.register_sensor("sensor.temperature", now=0)
+        self.monitor = SolarMonitor(self.engine, self.egress, {"site_id": "s1"},
+                                    diagnostics=DiagnosticsEngine(0.0, 0.0), max_age=900)
+
+    async def test_latest_values_checked_in_batch(self):
+        # Values are only recorded on the telegram path
+        self.assertIsNone(self.engine.process_value("sensor.lux_roof", 30000, now=1000))
+        self.assertIsNone(self.engine.process_value("sensor.lux_roof", 3, now=1100))
+        self.assertIsNone(self.engine.process_value("sensor.lux_facade", 20000, now=1100))
+        self.engine.process_value("sensor.lux_stale", 1, now=10)
+        self.engine.process_value("sensor.temperature", 1, now=1100)
+
+        self.assertEqual(self.monitor.readings(now=1200), {"sensor.lux_roof": 3.0, "sensor.lux_facade": 20000.0})
+        faults = await self.monitor.run_once(NOON, now=1200)
+
+        self.assertEqual([f["entity_id"] for f in faults], ["sensor.lux_roof"])
+        self.egress.send_batch.assert_awaited_once()
+        ((measurement, tags, fields, _),) = self.egress.send_batch.call_args[0][0]
+        self.assertEqual(measurement, "knx_diagnostics")
+        self.assertEqual(tags, {"site_id": "s1", "entity_id": "sensor.lux_roof",
+                                "type": "diagnostic", "subtype": "solar_mismatch"})
+        self.assertEqual(fields["lux"], 3.0)
+        self.assertGreater(fields["elevation"], 80)
+        self.assertEqual(self.monitor.get_stats(), {"solar_checked": 2, "solar_faults": 1})
+
+    async def test_no_faults_at_night(self):
+        self.engine.process_value("sensor.lux_roof", 0, now=1000)
+        self.assertEqual(await self.monitor.run_once(NOON.replace(hour=0), now=1000), [])
+        self.egress.send_batch.assert_not_awaited()
+
+    async def test_location_from_home_assistant(self):
+        simulator = HASimulator(count=0, token="test_token", location=(48.1, 11.6))
+        await simulator.start()
+        client = HAWebSocketClient(simulator.url, token="test_token")
+        client.set_callback(lambda telegram: None)
+        client_task = asyncio.create_task(client.start())
+        try:
+            monitor = SolarMonitor(self.engine, self.egress, {}, ha_client=client)
+            await asyncio.wait_for(monitor._locate(), 5)
+            self.assertEqual((monitor.diagnostics.lat, monitor.diagnostics.lon), (48.1, 11.6))
+        finally:
+            await client.stop()
+            await client_task
+            await simulator.stop()
+
+if __name__ == '__main__':
+    unittest.main()
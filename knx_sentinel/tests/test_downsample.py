@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import AsyncMock
+from knx_sentinel.downsample import Downsampler
+from knx_sentinel.anomaly_engine import AnomalyEngine
+from knx_sentinel.bus_monitor import BusLoadMonitor
+from knx_sentinel.pipeline import EventPipeline
+from knx_sentinel.telegram import KnxTelegram
+
+class TestDownsampler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.egress = AsyncMock()
+        self.sampler = Downsampler(self.egress, interval=60, clock=lambda: self.now)
+
+    async def test_aggregates_per_interval(self):
+        tags_a = {"entity_id": "sensor.a"}
+        for value in (21.0, 19.0, 23.0, 22.0):
+            self.sampler.add("sensor.a", tags_a, value)
+        self.sampler.add("sensor.b", {"entity_id": "sensor.b"}, True)
+        self.sampler.add("sensor.c", {"entity_id": "sensor.c"}, "on")
+        self.assertEqual(len(self.sampler), 2)
+
+        self.now = 1020.0
+        await self.sampler.flush()
+        (points,), _ = self.egress.send_batch.call_args
+        self.assertEqual(len(points), 2)
+        measurement, tags, fields, timestamp = points[0]
+        self.assertEqual(measurement, "knx_values")
+        self.assertIs(tags, tags_a)
+        self.assertEqual(fields, {"count": 4, "min": 19.0, "max": 23.0, "mean": 21.25, "last": 22.0})
+        # Interval start, aligned to the minute
+        self.assertEqual(timestamp, 960 * 10**9)
+        self.assertEqual(points[1][2]["last"], 1.0)
+        self.assertEqual(len(self.sampler), 0)
+
+        # The next interval starts empty and is timestamped on its own boundary
+        self.sampler.add("sensor.a", tags_a, 5.0)
+        await self.sampler.flush()
+        (points,), _ = self.egress.send_batch.call_args
+        self.assertEqual(points[0][2], {"count": 1, "min": 5.0, "max": 5.0, "mean": 5.0, "last": 5.0})
+        self.assertEqual(points[0][3], 1020 * 10**9)
+
+    async def test_early_flush_keeps_timestamps_distinct(self):
+        tags = {"entity_id": "sensor.a"}
+        self.sampler.add("sensor.a", tags, 1.0)
+        # The timer fires just before the 1020 boundary
+        self.now = 1019.9
+        await self.sampler.flush()
+        self.sampler.add("sensor.a", tags, 2.0)
+        self.now = 1079.95
+        await self.sampler.flush()
+        timestamps = [call[0][0][0][3] for call in self.egress.send_batch.call_args_list]
+        self.assertEqual(timestamps, [960 * 10**9, 1020 * 10**9])
+
+        # A clock step re-aligns to the current interval
+        self.sampler.add("sensor.a", tags, 3.0)
+        self.now = 5000.0
+        await self.sampler.flush()
+        self.sampler.add("sensor.a", tags, 4.0)
+        self.now = 5040.0
+        await self.sampler.flush()
+        self.assertEqual(self.egress.send_batch.call_args[0][0][0][3], 4980 * 10**9)
+
+    async def test_empty_interval(self):
+        await self.sampler.flush()
+        self.egress.send_batch.assert_not_called()
+
+    async def test_pipeline_feeds_downsampler(self):
+        pipeline = EventPipeline(BusLoadMonitor(), AnomalyEngine({}), self.egress,
+                                 {"site_id": "s"}, downsampler=self.sampler)
+        await pipeline.handle_telegram(KnxTelegram("1/2/3", "1.1.1", 20.5))
+        await pipeline.handle_telegram(KnxTelegram("1/2/3", "1.1.1", 21.5))
+        await self.sampler.stop()
+        (points,), _ = self.egress.send_batch.call_args
+        self.assertEqual(points[0][1], {"site_id": "s", "entity_id": "sensor.knx_1_2_3"})
+        self.assertEqual(points[0][2]["mean"], 21.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
+import asyncio
+import gzip
 from unittest.mock import MagicMock, patch, AsyncMock
-from knx_sentinel.egress import InfluxDBProvider, MQTTProvider
+from knx_sentinel.egress import EgressProvider, FanoutEgress, InfluxDBProvider, MQTTProvider
 
 class TestEgress(unittest.IsolatedAsyncioTestCase):
     async def test_influxdb_formatting(self):
@@ -20,11 +22,15 @@ class TestEgress(unittest.IsolatedAsyncioTestCase):
         
         with patch('aiohttp.ClientSession', return_value=mock_session):
             await provider.send_metric("sensor_data", tags, fields, timestamp)
+            # Lines are buffered until a flush
+            mock_session.post.assert_not_called()
+            await provider.flush()
             
             # Verify payload
             # Expected: sensor_data,site=NYC,tag\ with\ space=value\,comma temp=22.5,count=10i 1234567890000000000
             call_args = mock_session.post.call_args
-            data = call_args[1]['data']
+            self.assertEqual(call_args[1]['headers']['Content-Encoding'], 'gzip')
+            data = gzip.decompress(call_args[1]['data']).decode()
             
             self.assertIn("sensor_data", data)
             self.assertIn("site=NYC", data)
@@ -33,6 +39,113 @@ class TestEgress(unittest.IsolatedAsyncioTestCase):
             self.assertIn("count=10i", data)
             self.assertIn(str(timestamp), data)
 
+    async def test_influxdb_batching(self):
+        provider = InfluxDBProvider("http://localhost", "token", "org", "bucket",
+                                    batch_size=3, compress=False)
+        mock_post = MagicMock()
+        mock_post.__aenter__.return_value.status = 204
+        mock_session = MagicMock()
+        mock_session.post.return_value = mock_post
+
+        with patch('aiohttp.ClientSession', return_value=mock_session):
+            for i in range(7):
+                await provider.send_metric("m", {}, {"v": i}, i)
+
+            # Two full batches written, one line still buffered
+            self.assertEqual(mock_session.post.call_count, 2)
+            body = mock_session.post.call_args_list[1][1]['data'].decode()
+            self.assertEqual(body, "m v=3i 3\nm v=4i 4\nm v=5i 5")
+            self.assertEqual(provider._buffer, ["m v=6i 6"])
+
+    async def test_influxdb_full_batch_does_not_block(self):
+        provider = InfluxDBProvider("http://localhost", "token", "org", "bucket",
+                                    batch_size=2, flush_interval=60, compress=False)
+        release = asyncio.Event()
+        bodies = []
+        class SlowPost:
+            def __init__(self, url, data, headers):
+                bodies.append(data)
+            async def __aenter__(self):
+                await release.wait()
+                response = MagicMock()
+                response.status = 204
+                return response
+            async def __aexit__(self, *args):
+                pass
+        mock_session = MagicMock()
+        mock_session.post.side_effect = SlowPost
+        mock_session.close = AsyncMock()
+
+        with patch('aiohttp.ClientSession', return_value=mock_session) as session_cls:
+            await provider.start()
+            self.assertEqual(session_cls.call_args[1]['timeout'].total, 10.0)
+            # The write hangs, but buffering returns immediately
+            for i in range(6):
+                await asyncio.wait_for(provider.send_metric("m", {}, {"v": i}, i), 0.1)
+            await asyncio.sleep(0.01)
+            self.assertEqual(bodies, [b"m v=0i 0\nm v=1i 1"])
+            # stop() cancels the hanging write; its lines are sent by the final flush
+            release.set()
+            await provider.stop()
+        # Re-sent in requests of at most batch_size lines
+        self.assertTrue(all(body.count(b"\n") <= 1 for body in bodies))
+        self.assertEqual(b"\n".join(bodies[1:]), b"\n".join(b"m v=%di %d" % (i, i) for i in range(6)))
+
+    async def test_influxdb_send_batch(self):
+        provider = InfluxDBProvider("http://localhost", "token", "org", "bucket",
+                                    batch_size=2, compress=False)
+        mock_post = MagicMock()
+        mock_post.__aenter__.return_value.status = 204
+        mock_session = MagicMock()
+        mock_session.post.return_value = mock_post
+
+        with patch('aiohttp.ClientSession', return_value=mock_session):
+            await provider.send_batch([("m", {"e": "a"}, {"v": 1}, 5), ("m", {"e": "b"}, {"v": 2}, 5),
+                                       ("m", {"e": "c"}, {"v": 3}, 5)])
+
+        # Written at once, in requests of at most batch_size lines
+        bodies = [c[1]['data'].decode() for c in mock_session.post.call_args_list]
+        self.assertEqual(bodies, ["m,e=a v=1i 5\nm,e=b v=2i 5", "m,e=c v=3i 5"])
+
+    async def test_influxdb_buffer_bounded_while_throttled(self):
+        provider = InfluxDBProvider("http://localhost", "token", "org", "bucket",
+                                    batch_size=3, max_buffer=5, compress=False)
+        provider._retry_at = float("inf")
+        mock_session = MagicMock()
+        with patch('aiohttp.ClientSession', return_value=mock_session):
+            for i in range(8):
+                await provider.send_metric("m", {}, {"v": i}, i)
+            await provider.send_batch([("m", {}, {"v": 8}, 8)])
+        mock_session.post.assert_not_called()
+        self.assertEqual(provider._buffer, [f"m v={i}i {i}" for i in range(4, 9)])
+        self.assertEqual(provider.dropped, 4)
+
+    async def test_influxdb_retry_after(self):
+        provider = InfluxDBProvider("http://localhost", "token", "org", "bucket", compress=False)
+        mock_post = MagicMock()
+        mock_post.__aenter__.return_value.status = 429
+        mock_post.__aenter__.return_value.headers = {"Retry-After": "30"}
+        mock_post.__aenter__.return_value.text = AsyncMock(return_value="slow down")
+        mock_session = MagicMock()
+        mock_session.post.return_value = mock_post
+
+        with patch('aiohttp.ClientSession', return_value=mock_session):
+            await provider.send_metric("m", {}, {"v": 1}, 1)
+            await provider.flush()
+            await provider.send_metric("m", {}, {"v": 2}, 2)
+            # Still inside the Retry-After window: nothing is sent
+            await provider.flush()
+
+        self.assertEqual(mock_session.post.call_count, 1)
+        self.assertEqual(provider._buffer, ["m v=1i 1", "m v=2i 2"])
+        self.assertGreater(provider._retry_at, 0)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(InfluxDBProvider._parse_retry_after("12"), 12.0)
+        self.assertEqual(InfluxDBProvider._parse_retry_after(None), 10.0)
+        self.assertEqual(InfluxDBProvider._parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertEqual(InfluxDBProvider._parse_retry_after("soon"), 10.0)
+
     async def test_mqtt_payload(self):
         provider = MQTTProvider("localhost", 1883, "knx")
         provider.client = MagicMock()
@@ -51,5 +164,56 @@ class TestEgress(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(topic, "knx/site1/test_metric")
         self.assertIn('"val": 123', payload)
 
+class RecordingSink(EgressProvider):
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.metrics = []
+        self.batches = []
+        self.stopped = False
+
+    async def send_metric(self, measurement, tags, fields, timestamp=None):
+        await asyncio.sleep(self.delay)
+        self.metrics.append((measurement, fields))
+
+    async def send_batch(self, points):
+        self.batches.append(points)
+
+    async def stop(self):
+        self.stopped = True
+
+class TestFanoutEgress(unittest.IsolatedAsyncioTestCase):
+    async def test_slow_sink_does_not_delay_fast_sink(self):
+        fast, slow = RecordingSink(), RecordingSink(delay=10)
+        fanout = FanoutEgress({"fast": fast, "slow": slow}, queue_size=3)
+        await fanout.start()
+        for i in range(6):
+            await fanout.send_metric("m", {}, {"v": i})
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(len(fast.metrics), 6)
+        self.assertEqual(slow.metrics, [])
+        stats = fanout.get_stats()
+        self.assertEqual((stats["fast"]["sent"], stats["fast"]["dropped"]), (6, 0))
+        # One item in flight plus a full queue; the rest were dropped
+        self.assertEqual((stats["slow"]["queued"], stats["slow"]["dropped"], stats["slow"]["depth"]), (4, 2, 3))
+        self.assertGreaterEqual(stats["fast"]["latency_max_ms"], 0.0)
+        # Counters restart after each report
+        self.assertEqual(fanout.get_stats()["fast"]["sent"], 0)
+
+        await fanout.stop(timeout=0.01)
+        self.assertTrue(fast.stopped and slow.stopped)
+
+    async def test_batches_pass_through(self):
+        sink = RecordingSink()
+        fanout = FanoutEgress({"a": sink})
+        await fanout.start()
+        points = [("m", {}, {"v": 1}, 1), ("m", {}, {"v": 2}, 2)]
+        await fanout.send_batch(points)
+        await fanout.send_batch([])
+        await fanout.stop()
+        self.assertEqual(sink.batches, [points])
+        self.assertEqual(fanout.get_stats()["a"]["sent"], 2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,22 +1,88 @@
 import unittest
 import asyncio
-from knx_sentinel.bus_monitor import BusLoadMonitor
+from knx_sentinel.bus_monitor import BusLoadMonitor, SpaceSaving
 from knx_sentinel.anomaly_engine import AnomalyEngine
 from knx_sentinel.autoconfig import AutoConfigurator
+from knx_sentinel.telegram import KnxTelegram
 
 class TestLogicCore(unittest.IsolatedAsyncioTestCase):
-    async def test_bus_monitor(self):
+    def test_bus_monitor(self):
         monitor = BusLoadMonitor()
-        await monitor.process_event({})
-        await monitor.process_event({})
-        await monitor.process_event({})
+        monitor.process_event({})
+        monitor.process_event({})
+        monitor.process_event({})
         
-        count = await monitor.get_and_reset()
+        count = monitor.get_and_reset()
         self.assertEqual(count, 3)
         
-        count_after = await monitor.get_and_reset()
+        count_after = monitor.get_and_reset()
         self.assertEqual(count_after, 0)
 
+    def test_bus_monitor_rates(self):
+        monitor = BusLoadMonitor(window=60)
+        # 1 telegram/sec for a minute with a 50 telegram burst at t=130
+        for second in range(100, 160):
+            for _ in range(50 if second == 130 else 1):
+                monitor.process_event({}, now=second + 0.5)
+        # Telegrams in the current, incomplete second are not reported yet
+        monitor.process_event({}, now=160.2)
+
+        rates = monitor.get_rates(now=160.5)
+        self.assertEqual(rates["rate_1s"], 1.0)
+        self.assertEqual(rates["rate_10s"], 1.0)
+        self.assertAlmostEqual(rates["rate_60s"], 109 / 60)
+        self.assertEqual(rates["peak_per_sec"], 50)
+        self.assertEqual(rates["p95_per_sec"], 1)
+        self.assertEqual(rates["p99_per_sec"], 50)
+
+        # Buckets older than the window are ignored, not double counted
+        rates = monitor.get_rates(now=300)
+        self.assertEqual(rates["peak_per_sec"], 0)
+
+    def test_bus_monitor_utilisation(self):
+        # 1-bit switch telegram: 50 + 9 * 13 + 26 = 193 bit times (~20 ms)
+        self.assertEqual(BusLoadMonitor.telegram_bit_times(KnxTelegram(payload=1)), 193)
+        # 2-byte float (DPT 9) adds two characters
+        self.assertEqual(BusLoadMonitor.telegram_bit_times(KnxTelegram(payload=[12, 34])), 219)
+
+        monitor = BusLoadMonitor(alarm_threshold=50.0)
+        for _ in range(30):
+            monitor.process_event({"data": {"data": 1}}, now=10.5)
+        monitor.process_event({"data": {"data": 1}}, now=11.5)
+
+        rates = monitor.get_rates(now=12)
+        self.assertAlmostEqual(rates["utilisation_1s_pct"], 193 / 96)
+        self.assertAlmostEqual(rates["peak_utilisation_pct"], 30 * 193 / 96)
+        self.assertAlmostEqual(rates["utilisation_60s_pct"], 31 * 193 / 9600 / 60 * 100)
+        self.assertEqual(rates["overload_seconds"], 1)
+
+    def test_space_saving_bounded(self):
+        tracker = SpaceSaving(capacity=8)
+        for i in range(5000):
+            tracker.add("1.1.1")
+            if i % 2 == 0:
+                tracker.add("1.1.2")
+            tracker.add(f"2.0.{i}")  # one-off addresses
+        self.assertLessEqual(len(tracker.counts), 8)
+        top = tracker.top(2)
+        self.assertEqual([key for key, _, _ in top], ["1.1.1", "1.1.2"])
+        # Counts never underestimate and error bounds the overestimate
+        for key, count, error in top:
+            true_count = 5000 if key == "1.1.1" else 2500
+            self.assertGreaterEqual(count, true_count)
+            self.assertLessEqual(count - error, true_count)
+
+    def test_bus_monitor_top_talkers(self):
+        monitor = BusLoadMonitor()
+        for _ in range(5):
+            monitor.process_event({"data": {"source": "1.1.5", "destination": "1/2/3"}})
+        monitor.process_event({"data": {"source": "1.1.7", "destination": "1/2/4"}})
+
+        talkers = monitor.get_top_talkers(1)
+        self.assertEqual(talkers["source"], [("1.1.5", 5, 0)])
+        self.assertEqual(talkers["destination"], [("1/2/3", 5, 0)])
+        self.assertEqual(monitor.get_top_talkers(1), {"source": [], "destination": []})
+
     def test_anomaly_engine_z_score(self):
         engine = AnomalyEngine()
         engine.register_sensor("sensor.temp", {"method": "z_score", "threshold": 2.0})
@@ -38,6 +104,37 @@ class TestLogicCore(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(res["type"], "anomaly")
         self.assertEqual(res["subtype"], "z_score")
 
+    def test_anomaly_engine_capacity_eviction(self):
+        engine = AnomalyEngine({"max_sensors": 2, "idle_ttl": 100})
+        engine.register_sensor("sensor.pinned", {"method": "range", "max": 10}, pinned=True, now=0)
+        engine.register_sensor("sensor.a", now=0)
+        engine.register_sensor("sensor.b", now=1)
+        # Touch a so b becomes least recently used
+        engine.process_value("sensor.a", 1, now=2)
+        engine.register_sensor("sensor.c", now=3)
+
+        self.assertIn("sensor.a", engine.sensors)
+        self.assertNotIn("sensor.b", engine.sensors)
+        self.assertIn("sensor.c", engine.sensors)
+        self.assertIn("sensor.pinned", engine.sensors)
+        self.assertEqual(engine.get_stats()["evictions"], 1)
+
+        engine.register_sensor("sensor.a", now=4)
+        stats = engine.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 4)
+        self.assertEqual(stats["pinned"], 1)
+
+    def test_anomaly_engine_idle_eviction(self):
+        engine = AnomalyEngine({"idle_ttl": 100})
+        engine.register_sensor("sensor.pinned", {"method": "range"}, pinned=True, now=0)
+        engine.register_sensor("sensor.idle", now=0)
+        engine.register_sensor("sensor.busy", now=0)
+        engine.process_value("sensor.busy", 1, now=150)
+
+        self.assertEqual(engine.evict_idle(now=200), 1)
+        self.assertEqual(sorted(engine.sensors), ["sensor.busy", "sensor.pinned"])
+
     def test_autoconfig_analysis(self):
         # Test Voltage
         entry = {"platform": "knx", "entity_id": "sensor.voltage", "device_class": "voltage"}
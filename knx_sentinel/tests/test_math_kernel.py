@@ -1,7 +1,11 @@
 import unittest
 import math
-from datetime import datetime, timezone
-from knx_sentinel.math_kernel import MathKernel
+import random
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from knx_sentinel import math_kernel
+from knx_sentinel.diagnostics import DiagnosticsEngine
+from knx_sentinel.math_kernel import MathKernel, RollingRegression, RollingStats, SolarElevationCache
 
 class TestMathKernel(unittest.TestCase):
     def test_mean(self):
@@ -51,5 +55,117 @@ class TestMathKernel(unittest.TestCase):
         print(f"Midnight Elevation: {el_night}")
         self.assertTrue(el_night < -80.0)
 
+    def test_solar_elevations_batch(self):
+        """The batch API matches the scalar one, with and without NumPy."""
+        start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+        times = [start + timedelta(minutes=17 * i) for i in range(200)]
+        expected = [MathKernel.calculate_solar_elevation(48.1, 11.6, t) for t in times]
+        timestamps = [t.timestamp() for t in times]
+        backends = [math_kernel.np, None] if math_kernel.np is not None else [None]
+        for backend in backends:
+            with self.subTest(numpy=backend is not None), mock.patch.object(math_kernel, "np", backend):
+                elevations = MathKernel.calculate_solar_elevations(48.1, 11.6, timestamps)
+                for got, want in zip(elevations, expected):
+                    self.assertAlmostEqual(got, want, places=6)
+                # One site per timestamp
+                sites = MathKernel.calculate_solar_elevations([48.1, -33.9], [11.6, 151.2], timestamps[:2])
+                self.assertAlmostEqual(sites[0], expected[0], places=6)
+                self.assertAlmostEqual(sites[1], MathKernel.calculate_solar_elevation(-33.9, 151.2, times[1]),
+                                       places=6)
+
+    def test_solar_elevation_cache(self):
+        cache = SolarElevationCache(48.1, 11.6, step=60)
+        start = datetime(2024, 6, 1, 6, 0, tzinfo=timezone.utc).timestamp()
+        for second in range(0, 3600, 7):
+            exact = MathKernel.calculate_solar_elevations(48.1, 11.6, [start + second])[0]
+            self.assertAlmostEqual(cache.elevation(start + second), exact, delta=0.13)
+        self.assertEqual(cache.misses, 60)
+
+        # Batch lookups reuse cached steps and fill the missing ones at once
+        batch = cache.elevations([start + 10, start + 7200, start + 7210])
+        self.assertEqual(batch[0], cache.elevation(start + 10))
+        self.assertEqual(batch[1], batch[2])
+        self.assertEqual(cache.misses, 61)
+
+    def test_check_solar_sensors(self):
+        diagnostics = DiagnosticsEngine(lat=0.0, lon=0.0)
+        noon = datetime(2024, 3, 20, 12, 0, tzinfo=timezone.utc)
+        faults = diagnostics.check_solar_sensors({"sensor.lux_ok": 50000, "sensor.lux_dark": 2}, noon)
+        self.assertEqual([f["entity_id"] for f in faults], ["sensor.lux_dark"])
+        self.assertIsNone(diagnostics.check_solar_sensor("sensor.lux_dark", 2, noon - timedelta(hours=12)))
+        self.assertEqual(diagnostics.solar.misses, 2)
+
+    def test_rolling_regression_matches_batch(self):
+        """Sliding-window slope equals the batch slope, also with epoch timestamps."""
+        regression = RollingRegression(10)
+        xs, ys = [], []
+        for i in range(95):
+            x = 1_700_000_000 + i * 60.0 + (i % 7)
+            y = 20.0 + 0.001 * i + math.sin(i)
+            regression.push(x, y)
+            xs.append(x)
+            ys.append(y)
+            window_x = [v - xs[0] for v in xs[-10:]]
+            expected = MathKernel.calculate_linear_regression_slope(window_x, ys[-10:])
+            self.assertEqual(len(regression), min(i + 1, 10))
+            self.assertAlmostEqual(regression.slope, expected, places=9)
+            self.assertEqual(regression.span, xs[-1] - xs[-min(i + 1, 10)])
+
+    def test_rolling_regression_stderr(self):
+        regression = RollingRegression(20)
+        for i in range(20):
+            regression.push(i, 2.0 * i + (0.5 if i % 2 else -0.5))
+        # Residuals of +-0.5 around the line
+        self.assertAlmostEqual(regression.slope, 2.0, delta=0.01)
+        self.assertAlmostEqual(regression.slope_stderr,
+                               math.sqrt(sum(0.25 for _ in range(20)) / 18 / 665), delta=0.002)
+
+    def test_rolling_regression_degenerate(self):
+        regression = RollingRegression(5)
+        self.assertEqual(regression.slope, 0.0)
+        for _ in range(7):
+            regression.push(100.0, 1.0)
+        self.assertEqual(regression.slope, 0.0)
+        self.assertFalse(hasattr(regression, "__dict__"))
+
+    def test_rolling_stats_matches_batch(self):
+        stats = RollingStats(5)
+        data = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5]
+        for i, value in enumerate(data):
+            stats.push(value)
+            window = data[max(0, i - 4):i + 1]
+            self.assertEqual(len(stats), len(window))
+            self.assertAlmostEqual(stats.mean, MathKernel.calculate_mean(window))
+            self.assertAlmostEqual(stats.variance, MathKernel.calculate_variance(window))
+            self.assertAlmostEqual(stats.std_dev, MathKernel.calculate_std_dev(window))
+
+    def test_rolling_stats_constant(self):
+        stats = RollingStats(10)
+        for _ in range(50):
+            stats.push(20.1)
+        self.assertAlmostEqual(stats.mean, 20.1)
+        self.assertEqual(stats.std_dev, 0.0)
+
+    def test_rolling_stats_no_drift(self):
+        # Spikes mixed into normal readings, then a flat sensor
+        rng = random.Random(0)
+        stats = RollingStats(60)
+        for _ in range(100000):
+            stats.push(rng.gauss(0, 1e5) if rng.random() < 0.5 else rng.gauss(20, 1))
+        for _ in range(60):
+            stats.push(21.5)
+        self.assertAlmostEqual(stats.mean, 21.5, places=9)
+        self.assertLess(stats.std_dev, 1e-12)
+
+    def test_rolling_stats_ring_order(self):
+        stats = RollingStats(3)
+        for value in [1, 2]:
+            stats.push(value)
+        self.assertEqual(list(stats), [1.0, 2.0])
+        for value in [3, 4, 5]:
+            stats.push(value)
+        self.assertEqual(list(stats), [3.0, 4.0, 5.0])
+        self.assertFalse(hasattr(stats, "__dict__"))
+
 if __name__ == '__main__':
     unittest.main()
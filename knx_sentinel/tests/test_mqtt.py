@@ -0,0 +1,173 @@
+import unittest
+import asyncio
+import json
+from unittest import mock
+from knx_sentinel import egress
+from knx_sentinel.egress import AsyncMQTTProvider, MQTTProvider, get_payload_encoder, _cbor_encode
+from knx_sentinel.mqtt_client import MQTTClient, encode_length
+from knx_sentinel.simulator import MQTTBrokerStub
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+class TestMQTTClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.broker = MQTTBrokerStub()
+        await self.broker.start()
+
+    async def asyncTearDown(self):
+        await self.broker.stop()
+
+    def test_encode_length(self):
+        self.assertEqual(encode_length(0), b"\x00")
+        self.assertEqual(encode_length(127), b"\x7f")
+        self.assertEqual(encode_length(128), b"\x80\x01")
+        self.assertEqual(encode_length(16384), b"\x80\x80\x01")
+
+    async def test_publish_pipelined(self):
+        """QoS 1 publishes are pipelined and all acknowledged."""
+        client = MQTTClient("127.0.0.1", self.broker.port, max_inflight=10)
+        await client.start()
+        for i in range(100):
+            await client.publish("knx/test", str(i).encode())
+        await client.wait_acked(timeout=2)
+        await client.stop()
+
+        self.assertEqual(client.acked, 100)
+        self.assertEqual(client.inflight, 0)
+        self.assertEqual([m[1] for m in self.broker.messages], [str(i).encode() for i in range(100)])
+        self.assertTrue(all(m[0] == "knx/test" and m[2] == 1 for m in self.broker.messages))
+
+    async def test_reconnect_resends_unacked(self):
+        """Messages unacknowledged when the connection drops are re-sent with DUP."""
+        self.broker.drop_after = 5
+        client = MQTTClient("127.0.0.1", self.broker.port, reconnect_min=0.01)
+        await client.start()
+        for i in range(12):
+            await client.publish("knx/test", str(i).encode())
+        await client.wait_acked(timeout=5)
+        await client.stop()
+
+        self.assertGreater(client.connects, 1)
+        payloads = {m[1] for m in self.broker.messages}
+        self.assertEqual(payloads, {str(i).encode() for i in range(12)})
+        self.assertTrue(any(m[3] for m in self.broker.messages))
+
+class TestAsyncMQTTProvider(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.broker = MQTTBrokerStub()
+        await self.broker.start()
+
+    async def asyncTearDown(self):
+        await self.broker.stop()
+
+    async def test_send_metric_json(self):
+        provider = AsyncMQTTProvider("127.0.0.1", self.broker.port, "knx")
+        await provider.start()
+        await provider.send_metric("knx_metrics", {"site_id": "s1"}, {"value": 1.5}, 123)
+        await provider.stop()
+
+        self.assertEqual(len(self.broker.messages), 1)
+        topic, payload, qos, _ = self.broker.messages[0]
+        self.assertEqual(topic, "knx/s1/knx_metrics")
+        self.assertEqual(qos, 1)
+        self.assertEqual(json.loads(payload), {
+            "measurement": "knx_metrics", "tags": {"site_id": "s1"},
+            "fields": {"value": 1.5}, "timestamp": 123
+        })
+
+    @unittest.skipUnless(msgspec, "msgspec not installed")
+    async def test_batched_msgpack(self):
+        """Batch mode packs metrics into one message per site."""
+        provider = AsyncMQTTProvider("127.0.0.1", self.broker.port, "knx", encoding="msgpack",
+                                     batch_size=10, batch_interval=60)
+        await provider.start()
+        for i in range(25):
+            await provider.send_metric("knx_metrics", {"site_id": "s1"}, {"value": i}, i)
+        await provider.stop()
+
+        self.assertEqual(len(self.broker.messages), 3)
+        points = []
+        for topic, payload, _, _ in self.broker.messages:
+            self.assertEqual(topic, "knx/s1/batch")
+            points.extend(msgspec.msgpack.decode(payload))
+        self.assertEqual([p["fields"]["value"] for p in points], list(range(25)))
+
+    async def test_spool_while_disconnected(self):
+        spooled = []
+        class ListSpool:
+            def append(self, records):
+                spooled.extend(records)
+
+        await self.broker.stop()
+        provider = AsyncMQTTProvider("127.0.0.1", self.broker.port, "knx", spool=ListSpool())
+        await provider.start()
+        await provider.send_metric("knx_metrics", {"site_id": "s1"}, {"value": 1}, 1)
+        self.assertEqual(len(spooled), 1)
+        self.assertTrue(spooled[0].startswith(b"knx/s1/knx_metrics\0"))
+        self.assertFalse(await provider.replay_records(spooled))
+        await provider.stop(timeout=0.1)
+
+    async def test_paho_provider_follows_link_state(self):
+        """The paho provider spools until the broker is up and notices drops."""
+        spooled = []
+        class ListSpool:
+            def append(self, records):
+                spooled.extend(records)
+
+        async def wait_for(condition):
+            for _ in range(200):
+                if condition():
+                    return
+                await asyncio.sleep(0.02)
+
+        port = self.broker.port
+        await self.broker.stop()
+        provider = MQTTProvider("127.0.0.1", port, "knx", spool=ListSpool())
+        await provider.start()
+        try:
+            await provider.send_metric("knx_metrics", {"site_id": "s1"}, {"value": 1}, 1)
+            self.assertEqual(len(spooled), 1)
+            self.assertFalse(await provider.replay_records(spooled))
+
+            # Broker comes up after the add-on: paho reconnects and replay succeeds
+            self.broker = MQTTBrokerStub(port=port)
+            await self.broker.start()
+            await wait_for(lambda: provider.connected)
+            self.assertTrue(await provider.replay_records(spooled))
+            await wait_for(lambda: self.broker.messages)
+            self.assertEqual(self.broker.messages[0][0], "knx/s1/knx_metrics")
+
+            await self.broker.stop()
+            await wait_for(lambda: not provider.connected)
+            self.assertFalse(provider.connected)
+        finally:
+            await provider.stop()
+
+class TestPayloadEncoders(unittest.TestCase):
+    def test_cbor_encoding(self):
+        # RFC 8949 Appendix A examples
+        self.assertEqual(_cbor_encode(0), b"\x00")
+        self.assertEqual(_cbor_encode(1000000), bytes.fromhex("1a000f4240"))
+        self.assertEqual(_cbor_encode(-100), bytes.fromhex("3863"))
+        self.assertEqual(_cbor_encode(1.1), bytes.fromhex("fb3ff199999999999a"))
+        self.assertEqual(_cbor_encode("IETF"), bytes.fromhex("6449455446"))
+        self.assertEqual(_cbor_encode([1, [2, 3]]), bytes.fromhex("8201820203"))
+        self.assertEqual(_cbor_encode({"a": 1, "b": [2, 3]}), bytes.fromhex("a26161016162820203"))
+        self.assertEqual(_cbor_encode([None, True, False]), bytes.fromhex("83f6f5f4"))
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            get_payload_encoder("xml")
+
+    def test_missing_encoder_falls_back_to_json(self):
+        with mock.patch.object(egress, "msgpack", None), mock.patch.object(egress, "msgspec", None):
+            with self.assertLogs("knx_sentinel.egress", "ERROR"):
+                provider = AsyncMQTTProvider("127.0.0.1", 1883, "knx", encoding="msgpack")
+        self.assertEqual(provider.encoding, "json")
+        self.assertEqual(json.loads(provider.encode({"a": 1})), {"a": 1})
+
+if __name__ == '__main__':
+    unittest.main()
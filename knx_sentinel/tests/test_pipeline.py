@@ -0,0 +1,99 @@
+import unittest
+import asyncio
+from unittest.mock import AsyncMock
+from knx_sentinel.anomaly_engine import AnomalyEngine
+from knx_sentinel.bus_monitor import BusLoadMonitor
+from knx_sentinel.pipeline import EventPipeline
+
+def knx_event(destination, value):
+    return {"data": {"destination": destination, "source": "1.1.1", "value": value}}
+
+class TestEventPipeline(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.engine = AnomalyEngine({"max_sensors": 2})
+        self.egress = AsyncMock()
+        self.pipeline = EventPipeline(BusLoadMonitor(), self.engine, self.egress,
+                                      {"client_id": "c", "site_id": "s"})
+
+    async def test_routes_are_cached(self):
+        await self.pipeline.handle_event(knx_event("1/2/3", 20.0))
+        await self.pipeline.handle_event(knx_event("1/2/3", 20.1))
+
+        route = self.pipeline.routes.routes["1/2/3"]
+        self.assertEqual(route.entity_id, "sensor.knx_1_2_3")
+        self.assertIs(route.state, self.engine.sensors["sensor.knx_1_2_3"])
+        self.assertEqual(route.tags, {"client_id": "c", "site_id": "s",
+                                      "entity_id": "sensor.knx_1_2_3", "type": "anomaly"})
+        self.assertEqual(self.pipeline.routes.get_stats(),
+                         {"routes": 1, "route_hits": 1, "route_misses": 1})
+
+    async def test_eviction_drops_route(self):
+        for ga in ("1/0/1", "1/0/2", "1/0/3"):
+            await self.pipeline.handle_event(knx_event(ga, 1))
+        self.assertNotIn("1/0/1", self.pipeline.routes.routes)
+        self.assertEqual(len(self.pipeline.routes.routes), 2)
+
+        # A returning address gets a fresh route and sensor
+        await self.pipeline.handle_event(knx_event("1/0/1", 1))
+        self.assertIs(self.pipeline.routes.routes["1/0/1"].state,
+                      self.engine.sensors["sensor.knx_1_0_1"])
+
+    async def test_eviction_drops_all_routes_of_entity(self):
+        resolver = lambda ga: ("light.hall", None) if ga in ("1/0/1", "1/0/2") else (f"sensor.{ga}", None)
+        pipeline = EventPipeline(BusLoadMonitor(), self.engine, self.egress,
+                                 {"client_id": "c", "site_id": "s"}, resolver=resolver)
+        await pipeline.handle_event(knx_event("1/0/1", 1))
+        await pipeline.handle_event(knx_event("1/0/2", 1))
+        await pipeline.handle_event(knx_event("2/0/1", 1))
+        await pipeline.handle_event(knx_event("2/0/2", 1))
+        self.assertNotIn("light.hall", self.engine.sensors)
+        self.assertNotIn("1/0/1", pipeline.routes.routes)
+        self.assertNotIn("1/0/2", pipeline.routes.routes)
+
+        # Both addresses re-register the entity instead of using the evicted state
+        await pipeline.handle_event(knx_event("1/0/2", 1))
+        await pipeline.handle_event(knx_event("1/0/1", 1))
+        state = self.engine.sensors["light.hall"]
+        self.assertIs(pipeline.routes.routes["1/0/1"].state, state)
+        self.assertIs(pipeline.routes.routes["1/0/2"].state, state)
+
+    async def test_state_updates_keep_arrival_order(self):
+        class SlowCompressor:
+            async def add(self, route, value):
+                await asyncio.sleep(0.02 if value == 1 else 0)
+        pipeline = EventPipeline(BusLoadMonitor(), self.engine, self.egress,
+                                 {"client_id": "c", "site_id": "s"}, compressor=SlowCompressor())
+        processed = []
+        process_state = self.engine.process_state
+        def record(entity_id, state, value, now=None):
+            processed.append(value)
+            return process_state(entity_id, state, value, now)
+        self.engine.process_state = record
+
+        # Two queue workers handling consecutive telegrams of one address
+        await asyncio.gather(pipeline.handle_event(knx_event("1/2/3", 1)),
+                             pipeline.handle_event(knx_event("1/2/3", 2)))
+        self.assertEqual(processed, [1, 2])
+
+    async def test_anomaly_egress(self):
+        for i in range(40):
+            await self.pipeline.handle_event(knx_event("1/2/3", 20 + (i % 2) * 0.1))
+        self.egress.send_metric.assert_not_called()
+        await self.pipeline.handle_event(knx_event("1/2/3", 80))
+
+        measurement, tags, fields = self.egress.send_metric.call_args[0]
+        self.assertEqual(measurement, "knx_diagnostics")
+        self.assertEqual(tags["subtype"], "z_score")
+        self.assertEqual(tags["entity_id"], "sensor.knx_1_2_3")
+        self.assertEqual(fields["value"], 80.0)
+        # The cached tag dict is not mutated
+        self.assertNotIn("subtype", self.pipeline.routes.routes["1/2/3"].tags)
+
+    async def test_events_without_value(self):
+        await self.pipeline.handle_event({"data": {"destination": "1/2/3", "value": None}})
+        await self.pipeline.handle_event({})
+        self.assertEqual(self.pipeline.routes.routes, {})
+        self.assertEqual(self.pipeline.bus_monitor.get_and_reset(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
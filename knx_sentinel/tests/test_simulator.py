@@ -0,0 +1,94 @@
+import unittest
+import asyncio
+import tempfile
+from knx_sentinel.capture import CaptureWriter, read_capture
+from knx_sentinel.ha_client import HAWebSocketClient
+from knx_sentinel.simulator import HASimulator, TelegramGenerator
+
+class TestHASimulator(unittest.IsolatedAsyncioTestCase):
+    async def run_client(self, simulator, subscription="knx_event", capture=None):
+        received = []
+        client = HAWebSocketClient(simulator.url, token="test_token", subscription=subscription,
+                                   capture=capture)
+        client.set_callback(received.append)
+        task = asyncio.create_task(client.start())
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if len(received) >= (simulator.count or 0) and client.processed:
+                break
+        await client.stop()
+        await task
+        return received
+
+    async def test_stream_both_subscriptions(self):
+        """The real client receives every simulated telegram in both modes."""
+        for subscription in ("knx_event", "telegrams"):
+            with self.subTest(subscription=subscription):
+                generator = TelegramGenerator(group_addresses=10, seed=1)
+                simulator = HASimulator(generator, rate=0, count=200, token="test_token")
+                await simulator.start()
+                try:
+                    received = await self.run_client(simulator, subscription)
+                finally:
+                    await simulator.stop()
+                self.assertEqual(len(received), 200)
+                self.assertEqual(len(simulator.sent_at), 200)
+                self.assertIn(received[0].destination, generator.destinations)
+                self.assertIsInstance(received[0].value, float)
+                self.assertEqual(len(received[0].payload), 2)
+
+    async def test_capture_tap(self):
+        """Telegrams read from the socket are recorded by the capture sink."""
+        simulator = HASimulator(rate=0, count=50)
+        await simulator.start()
+        with tempfile.TemporaryDirectory() as tmp:
+            capture = CaptureWriter(tmp)
+            try:
+                received = await self.run_client(simulator, capture=capture)
+            finally:
+                await simulator.stop()
+            capture.close()
+            captured = [telegram for _, telegram in read_capture(tmp)]
+        self.assertEqual(len(captured), 50)
+        self.assertEqual([t.value for t in captured], [t.value for t in received])
+
+    async def test_capture_error_keeps_stream(self):
+        """A failing capture sink is disabled; telegrams keep flowing."""
+        class FullDisk:
+            writes = 0
+            def write(self, telegram):
+                self.writes += 1
+                raise OSError(28, "No space left on device")
+            def close(self):
+                pass
+        capture = FullDisk()
+        simulator = HASimulator(rate=0, count=50)
+        await simulator.start()
+        try:
+            with self.assertLogs("knx_sentinel.ha_client", "ERROR"):
+                received = await self.run_client(simulator, capture=capture)
+        finally:
+            await simulator.stop()
+        self.assertEqual(len(received), 50)
+        self.assertEqual(capture.writes, 1)
+
+    async def test_rejects_bad_token(self):
+        simulator = HASimulator(rate=0, count=10, token="secret")
+        await simulator.start()
+        try:
+            received = await self.run_client(simulator)
+        finally:
+            await simulator.stop()
+        self.assertEqual(received, [])
+        self.assertEqual(simulator.sent, 0)
+
+    def test_anomaly_injection(self):
+        generator = TelegramGenerator(group_addresses=1, anomaly_rate=0.5, seed=2)
+        values = [generator.next()[2] for _ in range(1000)]
+        mean, spread = generator.means[0], generator.spreads[0]
+        spikes = sum(1 for v in values if abs(v - mean) > 10 * spread)
+        self.assertEqual(spikes, generator.anomalies)
+        self.assertGreater(spikes, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from knx_sentinel.anomaly_engine import AnomalyEngine
+from knx_sentinel.snapshot import load_snapshot, save_snapshot
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "anomaly_state.bin")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip_skips_cold_start(self):
+        engine = AnomalyEngine()
+        engine.register_sensor("sensor.auto")
+        engine.register_sensor("sensor.cusum", {"method": "cusum"}, pinned=True)
+        engine.register_sensor("sensor.removed", {"method": "range", "max": 1}, pinned=True)
+        for i in range(40):
+            engine.process_value("sensor.auto", 20 + (i % 3) * 0.1)
+            engine.process_value("sensor.cusum", 20 + (i % 3) * 0.1)
+        self.assertEqual(save_snapshot(engine, self.path), 3)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+        restored = AnomalyEngine()
+        restored.register_sensor("sensor.cusum", {"method": "cusum"}, pinned=True)
+        self.assertEqual(load_snapshot(restored, self.path), 2)
+        self.assertNotIn("sensor.removed", restored.sensors)
+
+        old_stats = engine.sensors["sensor.auto"].stats
+        new_stats = restored.sensors["sensor.auto"].stats
+        self.assertEqual(list(new_stats), list(old_stats))
+        self.assertAlmostEqual(new_stats.std_dev, old_stats.std_dev)
+        self.assertEqual(
+            restored.sensors["sensor.cusum"].detector.get_state(),
+            engine.sensors["sensor.cusum"].detector.get_state()
+        )
+
+        # No 30-sample warm-up after restore
+        res = restored.process_value("sensor.auto", 100)
+        self.assertEqual(res["subtype"], "z_score")
+
+    def test_method_change_discards_state(self):
+        engine = AnomalyEngine()
+        engine.register_sensor("sensor.a", {"method": "ewma"}, pinned=True)
+        for i in range(40):
+            engine.process_value("sensor.a", i)
+        save_snapshot(engine, self.path)
+
+        restored = AnomalyEngine()
+        restored.register_sensor("sensor.a", {"method": "cusum"}, pinned=True)
+        self.assertEqual(load_snapshot(restored, self.path), 0)
+
+    def test_long_entity_id_is_logged(self):
+        engine = AnomalyEngine()
+        long_id = "sensor." + "x" * 100
+        engine.register_sensor(long_id)
+        engine.register_sensor("sensor.short")
+        with self.assertLogs("knx_sentinel.snapshot", "WARNING") as logs:
+            self.assertEqual(save_snapshot(engine, self.path), 1)
+        self.assertIn(long_id, logs.output[0])
+
+    def test_missing_or_corrupt_file(self):
+        engine = AnomalyEngine()
+        self.assertEqual(load_snapshot(engine, self.path), 0)
+        with open(self.path, "wb") as f:
+            f.write(b"garbage-data-here")
+        self.assertEqual(load_snapshot(engine, self.path), 0)
+
+if __name__ == '__main__':
+    unittest.main()
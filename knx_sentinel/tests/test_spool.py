@@ -0,0 +1,110 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from knx_sentinel.egress import InfluxDBProvider
+from knx_sentinel.spool import DiskSpool, SpoolDrainer
+
+class TestSpool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_segments_and_quota(self):
+        spool = DiskSpool(self.path, segment_bytes=100, quota_bytes=250)
+        for i in range(10):
+            spool.append([b"x" * 46, b"%d" % i])
+        spool.sync()
+        # Appends of 55 bytes, two per 110-byte segment; the quota drops the oldest
+        self.assertLessEqual(spool.size, 250)
+        self.assertGreater(spool.evicted_bytes, 0)
+
+        seq, records = spool.oldest()
+        self.assertEqual(len(records), 4)
+        spool.remove(seq)
+        remaining = []
+        while (segment := spool.oldest()) is not None:
+            remaining.extend(segment[1])
+            spool.remove(segment[0])
+        self.assertEqual(remaining[-1], b"9")
+        self.assertEqual(len(spool), 0)
+
+    def test_survives_restart_and_torn_tail(self):
+        spool = DiskSpool(self.path)
+        spool.append([b"a", b"b"])
+        spool.close()
+        # Simulate a crash during the next append
+        with open(os.path.join(self.path, os.listdir(self.path)[0]), "ab") as f:
+            f.write(b"\x10\x00\x00\x00abc")
+
+        reopened = DiskSpool(self.path)
+        reopened.append([b"c"])
+        seen = []
+        while (segment := reopened.oldest()) is not None:
+            seen.extend(segment[1])
+            reopened.remove(segment[0])
+        self.assertEqual(seen, [b"a", b"b", b"c"])
+        reopened.close()
+
+    async def test_append_does_not_block_loop(self):
+        spool = DiskSpool(self.path)
+        written = threading.Event()
+        write = spool._write
+        def slow_write(data):
+            time.sleep(0.2)
+            write(data)
+            written.set()
+        spool._write = slow_write
+        start = time.perf_counter()
+        spool.append([b"a"])
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertFalse(written.is_set())
+        self.assertEqual((await spool.read_oldest())[1], [b"a"])
+        spool.close()
+
+    async def test_drainer_waits_for_sink(self):
+        spool = DiskSpool(self.path, segment_bytes=10)
+        spool.append([b"one", b"two"])
+        spool.append([b"three"])
+        delivered = []
+        sink_up = False
+
+        async def replay(records):
+            if not sink_up:
+                return False
+            delivered.extend(records)
+            return True
+
+        drainer = SpoolDrainer(spool, replay, batch_records=1)
+        self.assertFalse(await drainer.drain())
+        self.assertEqual(len(spool), 2)
+
+        sink_up = True
+        self.assertTrue(await drainer.drain())
+        self.assertEqual(delivered, [b"one", b"two", b"three"])
+        self.assertEqual(drainer.replayed, 3)
+        self.assertEqual(len(spool), 0)
+
+    async def test_influxdb_spools_on_connection_error(self):
+        spool = DiskSpool(self.path)
+        provider = InfluxDBProvider("http://localhost", "token", "org", "bucket",
+                                    compress=False, spool=spool)
+        mock_session = MagicMock()
+        mock_session.post.side_effect = OSError("unreachable")
+
+        with patch('aiohttp.ClientSession', return_value=mock_session):
+            await provider.send_metric("m", {}, {"v": 1}, 1)
+            await provider.flush()
+
+        self.assertEqual(provider._buffer, [])
+        self.assertEqual(spool.oldest()[1], [b"m v=1i 1"])
+        # Still backing off, so the drainer must not replay yet
+        self.assertFalse(await provider.replay_records([b"m v=1i 1"]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import AsyncMock
+from knx_sentinel.anomaly_engine import AnomalyEngine
+from knx_sentinel.bus_monitor import BusLoadMonitor
+from knx_sentinel.pipeline import EventPipeline
+from knx_sentinel.stale import StaleMonitor
+from knx_sentinel.telegram import KnxTelegram
+
+class TestStaleMonitor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.egress = AsyncMock()
+        self.monitor = StaleMonitor(self.egress, {"site_id": "s1"}, factor=3, min_timeout=10)
+
+    def feed(self, entity_id, times):
+        for t in times:
+            self.monitor.seen(entity_id, now=t)
+
+    async def test_learns_interval_and_fires_once(self):
+        self.feed("sensor.cyclic", range(0, 600, 60))
+        self.assertEqual(self.monitor.expire(now=700), [])
+        # Silent for 3 intervals after the last telegram at 540
+        self.assertEqual(self.monitor.expire(now=719), [])
+        stale = await self.monitor.check(now=721)
+        self.assertEqual([s[0] for s in stale], ["sensor.cyclic"])
+        self.assertAlmostEqual(stale[0][2], 60.0)
+        ((measurement, tags, fields, _),) = self.egress.send_batch.call_args[0][0]
+        self.assertEqual(measurement, "knx_diagnostics")
+        self.assertEqual(tags, {"site_id": "s1", "entity_id": "sensor.cyclic",
+                                "type": "diagnostic", "subtype": "stale"})
+        self.assertEqual(fields["silent_s"], 181)
+
+        # Not reported again during the same outage
+        self.assertEqual(self.monitor.expire(now=5000), [])
+
+        # Recovery re-arms it without learning the outage as an interval
+        self.feed("sensor.cyclic", [5000, 5060])
+        self.assertEqual(self.monitor.recovered, 1)
+        self.assertEqual(self.monitor.expire(now=5200), [])
+        self.assertEqual([s[0] for s in self.monitor.expire(now=5241)], ["sensor.cyclic"])
+
+    def test_change_driven_telegrams_keep_cyclic_period(self):
+        """Bursts between cyclic sends do not shrink the learned interval much."""
+        times = []
+        for cycle in range(10):
+            base = cycle * 600
+            times += [base, base + 1, base + 2, base + 3]
+        self.feed("sensor.mixed", times)
+        self.assertEqual(self.monitor.expire(now=5403 + 900), [])
+
+    def test_lazy_rescheduling_and_forget(self):
+        self.feed("sensor.a", range(0, 100, 10))
+        self.feed("sensor.b", range(0, 100, 10))
+        self.assertEqual(len(self.monitor._heap), 2)
+        # Telegrams after arming do not touch the heap
+        self.feed("sensor.a", range(100, 1000, 10))
+        self.assertEqual(len(self.monitor._heap), 2)
+        self.monitor.forget("sensor.b")
+        self.assertEqual(self.monitor.expire(now=1000), [])
+        self.assertEqual(len(self.monitor._heap), 1)
+        self.assertEqual([s[0] for s in self.monitor.expire(now=1031)], ["sensor.a"])
+
+    def test_not_armed_before_min_samples(self):
+        self.feed("sensor.new", [0, 60])
+        self.assertEqual(self.monitor.expire(now=10000), [])
+
+    async def test_pipeline_feeds_monitor(self):
+        monitor = StaleMonitor(self.egress, {})
+        engine = AnomalyEngine({})
+        def resolver(destination):
+            return "sensor.office_temperature", {"method": "z_score"}
+        pipeline = EventPipeline(BusLoadMonitor(), engine, self.egress, {},
+                                 resolver=resolver, stale_monitor=monitor)
+        await pipeline.handle_telegram(KnxTelegram(destination="1/2/3", value=1.0))
+        self.assertIn("sensor.office_temperature", monitor._arrivals)
+
+    async def test_event_driven_addresses_do_not_fire(self):
+        monitor = StaleMonitor(self.egress, {}, min_timeout=10)
+        pipeline = EventPipeline(BusLoadMonitor(), AnomalyEngine({}), self.egress, {},
+                                 resolver=lambda ga: ("light.kitchen", None), stale_monitor=monitor)
+        # A light toggled a few times, then left alone
+        for _ in range(4):
+            await pipeline.handle_telegram(KnxTelegram(destination="1/0/1", value=1))
+        self.assertNotIn("light.kitchen", monitor._arrivals)
+        self.assertEqual(monitor.expire(now=10**9), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import json
+import unittest
+from knx_sentinel import telegram as telegram_module
+from knx_sentinel.telegram import FrameDecoder, KnxTelegram
+
+KNX_EVENT_FRAME = json.dumps({
+    "id": 1,
+    "type": "event",
+    "event": {
+        "event_type": "knx_event",
+        "data": {
+            "data": [12, 34],
+            "destination": "1/2/3",
+            "direction": "Incoming",
+            "source": "1.1.5",
+            "telegramtype": "GroupValueWrite",
+            "value": 21.5
+        },
+        "origin": "LOCAL",
+        "time_fired": "2024-03-20T12:00:00.000000+00:00",
+        "context": {"id": "01HS", "parent_id": None, "user_id": None}
+    }
+})
+
+BUS_TELEGRAM_FRAME = json.dumps({
+    "id": 1,
+    "type": "event",
+    "event": {
+        "destination": "1/2/3",
+        "destination_name": "Living room temperature",
+        "direction": "Incoming",
+        "dpt_main": 9,
+        "dpt_sub": 1,
+        "dpt_name": "temperature",
+        "payload": [12, 34],
+        "source": "1.1.5",
+        "source_name": "",
+        "telegramtype": "GroupValueWrite",
+        "timestamp": "2024-03-20T12:00:00.000000+00:00",
+        "unit": "°C",
+        "value": 21.5
+    }
+})
+
+def available_backends():
+    backends = ["json"]
+    if telegram_module.orjson is not None:
+        backends.append("orjson")
+    if telegram_module.msgspec is not None:
+        backends.append("msgspec")
+    return backends
+
+class TestFrameDecoder(unittest.TestCase):
+    def test_event_frame(self):
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                msg_type, msg_id, telegram, message = FrameDecoder(backend).decode(KNX_EVENT_FRAME)
+                self.assertEqual((msg_type, msg_id, message), ("event", 1, None))
+                self.assertEqual(telegram.destination, "1/2/3")
+                self.assertEqual(telegram.source, "1.1.5")
+                self.assertEqual(telegram.value, 21.5)
+                self.assertEqual(telegram.payload, [12, 34])
+                self.assertEqual(telegram.telegramtype, "GroupValueWrite")
+                self.assertEqual(telegram.direction, "Incoming")
+
+    def test_subscribe_telegrams_frame(self):
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                decoder = FrameDecoder(backend, subscription="telegrams")
+                msg_type, _, telegram, _ = decoder.decode(BUS_TELEGRAM_FRAME)
+                self.assertEqual(msg_type, "event")
+                self.assertEqual(telegram.destination, "1/2/3")
+                self.assertEqual(telegram.source, "1.1.5")
+                self.assertEqual(telegram.value, 21.5)
+                self.assertEqual(telegram.payload, [12, 34])
+                self.assertEqual(telegram.telegramtype, "GroupValueWrite")
+
+    def test_unknown_subscription(self):
+        with self.assertRaises(ValueError):
+            FrameDecoder(subscription="state_changed")
+
+    def test_result_frame(self):
+        raw = '{"id": 2, "type": "result", "success": true, "result": [{"entity_id": "sensor.a"}]}'
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                msg_type, msg_id, telegram, message = FrameDecoder(backend).decode(raw)
+                self.assertEqual((msg_type, msg_id, telegram), ("result", 2, None))
+                self.assertEqual(message["result"], [{"entity_id": "sensor.a"}])
+
+    def test_unexpected_event_data(self):
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                _, _, telegram, _ = FrameDecoder(backend).decode('{"type": "event", "event": {"data": "test"}}')
+                self.assertIsNone(telegram.destination)
+                self.assertIsNone(telegram.value)
+
+    def test_from_event(self):
+        telegram = KnxTelegram.from_event({"data": {"destination": "1/2/3", "value": 1, "data": 1}})
+        self.assertEqual(telegram.destination, "1/2/3")
+        self.assertEqual(telegram.payload, 1)
+        self.assertIsNone(KnxTelegram.from_event({}).destination)
+
+if __name__ == '__main__':
+    unittest.main()